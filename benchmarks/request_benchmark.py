@@ -0,0 +1,36 @@
+import timeit
+
+from whodat.http import *
+
+HEADERS = {
+    'HTTP_ACCEPT': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'HTTP_ACCEPT_CHARSET': 'utf-8,iso-8859-1;q=0.5',
+    'HTTP_ACCEPT_ENCODING': 'gzip, deflate, br',
+    'HTTP_ACCEPT_LANGUAGE': 'en-US,en;q=0.8,de;q=0.6',
+    'HTTP_COOKIE': 'session=abcdef0123456789; theme=dark',
+    'HTTP_USER_AGENT': 'Mozilla/5.0',
+}
+
+def read_path(request_class, environ):
+    """Build a request and read its path."""
+    request = request_class(dict(environ))
+    return request.path
+
+def read_all(request_class, environ):
+    """Build a request and read every parsed attribute."""
+    request = request_class(dict(environ))
+    return (request.method, request.path, request.GET, request.POST, request.headers, request.cookies,
+            request.accept, request.accept_charset, request.accept_encoding, request.accept_language)
+
+def main():
+    """Print the per-request cost of reading only the path and of reading every attribute."""
+    request_classes = [HTTPRequest, NativeHTTPRequest]
+    environ = HTTPRequest.get(path_info='/posts/42/', query_string='page=2&sort=date', headers=HEADERS)._request.environ
+    print('%20s %16s %16s' % ('request class', 'path only (us)', 'all attrs (us)'))
+    for request_class in request_classes:
+        path_only = min(timeit.repeat(lambda: read_path(request_class, environ), number=10000, repeat=3)) * 100
+        all_attrs = min(timeit.repeat(lambda: read_all(request_class, environ), number=10000, repeat=3)) * 100
+        print('%20s %16.2f %16.2f' % (request_class.__name__, path_only, all_attrs))
+
+if __name__ == '__main__':
+    main()
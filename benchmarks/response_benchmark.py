@@ -0,0 +1,28 @@
+import timeit
+
+from whodat.http import *
+
+ENVIRON = {'REQUEST_METHOD': 'GET'}
+
+def start_response(status, headerlist):
+    """Discard the status and headers."""
+    pass
+
+def send(response):
+    """Send a response through the WSGI interface and return its body."""
+    return b''.join(response(ENVIRON, start_response))
+
+def main():
+    """Print the per-response cost of building and sending a constant response."""
+    frozen = FrozenResponse('OK')
+    cases = [
+        ('HTTPResponse(str)', lambda: send(HTTPResponse('OK'))),
+        ('HTTPResponse(bytes)', lambda: send(HTTPResponse(b'OK'))),
+        ('FrozenResponse', lambda: send(frozen)),
+    ]
+    print('%20s %16s' % ('response', 'per call (us)'))
+    for name, case in cases:
+        print('%20s %16.2f' % (name, min(timeit.repeat(case, number=10000, repeat=3)) * 100))
+
+if __name__ == '__main__':
+    main()
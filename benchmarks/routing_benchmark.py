@@ -0,0 +1,33 @@
+import timeit
+
+from whodat.handler import *
+from whodat.routing import *
+
+def build_router(route_count):
+    """Return a Router with half literal and half placeholder routes."""
+    router = Router()
+    for i in range(route_count):
+        if i % 2:
+            router.add(Handler('/resource%d/_/items/_/' % i))
+        else:
+            router.add(Handler('/page%d/' % i))
+    router.compile()
+    return router
+
+def main():
+    """Print the cost of resolving a path by scanning every route and by the compiled Router."""
+    print('%8s %10s %14s %14s' % ('routes', 'path', 'scan (us)', 'router (us)'))
+    for route_count in (10, 100, 500, 1000):
+        router = build_router(route_count)
+        paths = {
+            'literal': '/page%d/' % (route_count - 2),
+            'param': '/resource%d/abc/items/def/' % (route_count - 1),
+            'miss': '/missing/path/',
+        }
+        for name, path in paths.items():
+            scan = min(timeit.repeat(lambda: router.scan(path), number=1000, repeat=3)) * 1000
+            match = min(timeit.repeat(lambda: router.match(path), number=1000, repeat=3)) * 1000
+            print('%8d %10s %14.2f %14.2f' % (route_count, name, scan, match))
+
+if __name__ == '__main__':
+    main()
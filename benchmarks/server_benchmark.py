@@ -0,0 +1,138 @@
+import asyncio
+import os
+import signal
+import socket
+import time
+
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+from whodat.handler import *
+from whodat.http import *
+from whodat.server import *
+from whodat.wsgi import *
+
+@url('/')
+class RootHandler:
+    def get(self, request):
+        return HTTPResponse('Hello, world!')
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def wsgiref_server(app, port):
+    """Return the wsgiref server."""
+    return make_server('127.0.0.1', port, app, handler_class=QuietHandler)
+
+def asyncio_server(app, port):
+    """Return the asyncio server."""
+    return AsyncioServer(app, port=port, threads=4)
+
+def prefork_server(app, port):
+    """Return the pre-fork server."""
+    return PreforkServer(app, port=port, workers=2, threads=4)
+
+def start(server_factory):
+    """Start a server in a child process and return its pid and port."""
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    app = WSGIApplication(False)
+    app.add_handler(RootHandler)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            server_factory(app, port).serve_forever()
+        finally:
+            os._exit(0)
+    for i in range(50):
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return pid, port
+
+async def fetch(port, connection):
+    """Send a GET request, reusing the connection if the server keeps it open, and return the connection."""
+    if connection is None:
+        connection = await asyncio.open_connection('127.0.0.1', port)
+    reader, writer = connection
+    writer.write(b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n')
+    head = await reader.readuntil(b'\r\n\r\n')
+    headers = head.lower()
+    length = int(headers.split(b'content-length:')[1].split(b'\r\n')[0])
+    await reader.readexactly(length)
+    if b'connection: close' in headers or head.startswith(b'HTTP/1.0'):
+        writer.close()
+        return None
+    return connection
+
+async def client(port, requests, latencies):
+    """Send requests one after another and record their latencies."""
+    connection = None
+    for i in range(requests):
+        start = time.perf_counter()
+        connection = await fetch(port, connection)
+        latencies.append(time.perf_counter() - start)
+    if connection is not None:
+        connection[1].close()
+
+async def load(port, clients, requests):
+    """Return the requests per second and the latencies of concurrent clients."""
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(port, requests, latencies) for i in range(clients)])
+    return len(latencies) / (time.perf_counter() - start), sorted(latencies)
+
+async def open_idle(port):
+    """Return an open connection that sends nothing, or None if it cannot be opened within a second."""
+    try:
+        return await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), 1)
+    except OSError:
+        return None
+
+async def idle(port, connections):
+    """Return the number of idle connections the server accepted and the latency of a request while they are open,
+    or None if it times out."""
+    opened = await asyncio.gather(*[open_idle(port) for i in range(connections)])
+    idle_connections = [connection for connection in opened if connection is not None]
+    await asyncio.sleep(0.2)
+    start = time.perf_counter()
+    try:
+        connection = await asyncio.wait_for(fetch(port, None), 2)
+        if connection is not None:
+            connection[1].close()
+        return len(idle_connections), time.perf_counter() - start
+    except OSError:
+        return len(idle_connections), None
+    finally:
+        for reader, writer in idle_connections:
+            writer.close()
+
+def main():
+    """Print the throughput and latency of each server under concurrent load, and its latency with idle
+    connections open."""
+    print('%10s %8s %12s %10s %10s %12s %18s' % ('server', 'clients', 'requests/s', 'p50 (ms)', 'p99 (ms)',
+                                                 'idle conns', 'idle latency (ms)'))
+    for name, server_factory in [('wsgiref', wsgiref_server), ('asyncio', asyncio_server),
+                                 ('prefork', prefork_server)]:
+        for clients in (1, 50):
+            pid, port = start(server_factory)
+            try:
+                throughput, latencies = asyncio.run(load(port, clients, 2000 // clients))
+                idle_count, idle_latency = asyncio.run(idle(port, 1000)) if clients > 1 else (0, None)
+            finally:
+                os.kill(pid, signal.SIGTERM)
+                time.sleep(0.5)
+                if os.waitpid(pid, os.WNOHANG)[0] == 0:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[len(latencies) * 99 // 100] * 1000
+            idle_text = '' if clients == 1 else 'timeout' if idle_latency is None else '%.2f' % (idle_latency * 1000)
+            print('%10s %8d %12.0f %10.2f %10.2f %12s %18s' % (name, clients, throughput, p50, p99,
+                                                              idle_count or '', idle_text))
+
+if __name__ == '__main__':
+    main()
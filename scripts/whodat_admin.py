@@ -7,12 +7,25 @@ from argparse import ArgumentParser
 from subprocess import call
 
 def runserver(args):
-    """Start the WSGI server on the specified port."""
+    """Start the WSGI server on the specified address, with asyncio or pre-forked workers if requested."""
     sys.path.insert(0, args.path)
     from main import application
-    from wsgiref.simple_server import make_server
-    server = make_server('127.0.0.1', args.port, application)
-    server.serve_forever()
+    if args.asyncio:
+        from whodat.server import AsyncioServer
+        server = AsyncioServer(application, args.host, args.port, threads=args.threads)
+    elif args.workers:
+        from whodat.server import PreforkServer
+        server = PreforkServer(application, args.host, args.port, workers=args.workers, threads=args.threads,
+                               reuse_port=args.reuse_port)
+    else:
+        from wsgiref.simple_server import make_server
+        server = make_server(args.host, args.port, application)
+    try:
+        server.serve_forever()
+    finally:
+        shutdown = getattr(application, 'shutdown', None)
+        if shutdown is not None:
+            shutdown()
 
 def startproject(args):
     """Copy whodat sample project structure to the current directory."""
@@ -28,6 +41,16 @@ def main():
     runserver_parser = subparsers.add_parser('runserver')
     runserver_parser.add_argument('-p', '--port', type=int, dest='port', default=8000,
                                   help='run server on the specified port')
+    runserver_parser.add_argument('-H', '--host', type=str, dest='host', default='127.0.0.1',
+                                  help='run server on the specified address')
+    runserver_parser.add_argument('-w', '--workers', type=int, dest='workers', default=0,
+                                  help='number of pre-forked worker processes, 0 runs the development server')
+    runserver_parser.add_argument('-t', '--threads', type=int, dest='threads', default=8,
+                                  help='number of threads of each worker process, or of the asyncio server')
+    runserver_parser.add_argument('--reuse-port', action='store_true', dest='reuse_port',
+                                  help='bind a socket per worker process with SO_REUSEPORT')
+    runserver_parser.add_argument('--asyncio', action='store_true', dest='asyncio',
+                                  help='run a single-process asyncio server')
     runserver_parser.add_argument('-P', '--path', type=str, dest='path', default='.',
                                   help='path of whodat project directory')
     runserver_parser.set_defaults(func=runserver)
@@ -6,6 +6,7 @@ setup(
     packages=['whodat'],
     package_dir={'': 'src'},
     install_requires=['WebOb==1.5.0'],
+    extras_require={'json': ['orjson']},
     author='Rodrigo A. Lima',
     description='A lightweight web framework that encourages clean design.',
     license='BSD',
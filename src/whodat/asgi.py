@@ -0,0 +1,173 @@
+import asyncio
+import functools
+import inspect
+import io
+import sys
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from whodat.http import *
+from whodat.wsgi import *
+
+def scope_environ(scope, body):
+    """Return the WSGI environment for an ASGI HTTP connection scope and a file-like object with the request body."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'asgi.scope': scope,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        value = value.decode('latin-1')
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+class ASGIApplication(WSGIApplication):
+    """ASGI application interface.
+
+    It takes the same arguments as WSGIApplication and serves the same Handlers, ErrorHandler and extensions. Handler
+    methods declared with 'async def' are awaited in the event loop, while other methods, as well as streamed bodies,
+    run in a bounded pool of threads. Extensions are called in the event loop.
+    """
+
+    def __init__(self, *args, max_threads=None, spool_size=1024 * 1024, **kwargs):
+        """Set attributes like WSGIApplication.
+
+        max_threads -- integer that specifies the maximum number of threads that run synchronous Handler methods. None
+                       uses the default of ThreadPoolExecutor. None by default.
+        spool_size -- integer that specifies the size in bytes above which a request body is written to a temporary
+                      file instead of memory. 1 MiB by default.
+        """
+        super(ASGIApplication, self).__init__(*args, **kwargs)
+        self._executor = ThreadPoolExecutor(max_threads, thread_name_prefix='whodat')
+        self._spool_size = spool_size
+
+    async def _call_handler(self, handler, request, args):
+        """Return the HTTPResponse of a Handler, awaiting coroutine methods and running other methods in the pool."""
+        handler_method = handler._handler_method(request)
+        if inspect.iscoroutinefunction(handler_method):
+            response = await handler_method(request, *args)
+        else:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self._executor, functools.partial(handler_method, request, *args))
+        return self._move_tasks(request, handler._make_response(request, response))
+
+    async def _read_body(self, receive, max_body_size):
+        """Return a file-like object with the request body, or raise an HTTPRequestEntityTooLarge exception."""
+        body = tempfile.SpooledTemporaryFile(max_size=self._spool_size)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if max_body_size is not None and size > max_body_size:
+                body.close()
+                raise HTTPRequestEntityTooLarge()
+            body.write(chunk)
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    async def handle_request_async(self, request, receive):
+        """Return an HTTPResponse like handle_request, reading the request body from an ASGI receive callable once the
+        Handler, and so the body size limit, is known. The body is then a complete file, so its length is set in the
+        environment when the client did not send one."""
+        try:
+            route = self._route(request)
+            if isinstance(route, HTTPResponse):
+                return route
+            handler, args = route
+            body = await self._read_body(receive, request.max_body_size)
+            request.environ['wsgi.input'] = body
+            request.environ['wsgi.input_terminated'] = True
+            if 'CONTENT_LENGTH' not in request.environ:
+                request.environ['CONTENT_LENGTH'] = str(body.seek(0, io.SEEK_END))
+                body.seek(0)
+            request_extensions, response_extensions = self._pipeline(handler)
+            response = None
+            for extension in request_extensions:
+                response = extension.process_request(request)
+                if response is not None:
+                    break
+            if response is None:
+                response = await self._call_handler(handler, request, args)
+            for extension in response_extensions:
+                response = extension.process_response(request, response) or response
+            return response
+        except Exception as error:
+            return self._handle_exception(request, error)
+
+    async def _send_response(self, response, environ, send):
+        """Send an HTTPResponse through an ASGI send callable."""
+        started = []
+        app_iter = response(environ, lambda status, headerlist, exc_info=None: started.append((status, headerlist)))
+        try:
+            status, headerlist = started[0]
+            headers = [(key.lower().encode('latin-1'), value.encode('latin-1')) for key, value in headerlist]
+            await send({'type': 'http.response.start', 'status': int(status[:3]), 'headers': headers})
+            if isinstance(app_iter, list):
+                await send({'type': 'http.response.body', 'body': b''.join(app_iter)})
+                return
+            loop = asyncio.get_running_loop()
+            iterator = iter(app_iter)
+            while True:
+                chunk = await loop.run_in_executor(self._executor, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(app_iter, 'close', None)
+            if close is not None:
+                close()
+
+    async def _lifespan(self, receive, send):
+        """Answer the startup and shutdown messages of the ASGI lifespan protocol."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=True)
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        """ASGI interface."""
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported ASGI scope type: %s' % scope['type'])
+        environ = scope_environ(scope, None)
+        request = self._request_class(environ)
+        response = await self.handle_request_async(request, receive)
+        try:
+            await self._send_response(response, environ, send)
+        finally:
+            if environ['wsgi.input'] is not None:
+                environ['wsgi.input'].close()
+        tasks = list(request.tasks) + list(response.tasks)
+        if tasks:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._tasks.run, tasks)
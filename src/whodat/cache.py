@@ -0,0 +1,196 @@
+import json
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from whodat.extension import *
+from whodat.http import *
+
+class MemoryCacheBackend:
+    """In-process LRU store of cached responses."""
+
+    def __init__(self, max_size=1024):
+        """Set the maximum number of entries."""
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, variant):
+        """Return the (status, headerlist, body) tuple stored for a path and variant, or None if it is missing or
+        expired."""
+        key = (path, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, path, variant, value, ttl):
+        """Store a (status, headerlist, body) tuple for a path and variant for ttl seconds."""
+        with self._lock:
+            self._entries[(path, variant)] = (time.time() + ttl, value)
+            self._entries.move_to_end((path, variant))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, path):
+        """Remove every entry of a path."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        """Return the number of entries."""
+        return len(self._entries)
+
+class SQLiteCacheBackend:
+    """Store of cached responses in an SQLite database, shared by every process that opens the same file.
+
+    When it is full, the entries that expire first are evicted.
+    """
+
+    def __init__(self, filename, max_size=1024):
+        """Set the database file and the maximum number of entries, and create the table if it does not exist."""
+        self.max_size = max_size
+        self._filename = filename
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS whodat_cache (path TEXT, variant TEXT, expires REAL, '
+                               'status TEXT, headerlist TEXT, body BLOB, PRIMARY KEY (path, variant))')
+            connection.execute('CREATE INDEX IF NOT EXISTS whodat_cache_expires ON whodat_cache (expires)')
+
+    def _connection(self):
+        """Return the connection of the current thread."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._filename, timeout=10)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, path, variant):
+        """Return the (status, headerlist, body) tuple stored for a path and variant, or None if it is missing or
+        expired."""
+        row = self._connection().execute(
+            'SELECT status, headerlist, body FROM whodat_cache WHERE path = ? AND variant = ? AND expires > ?',
+            (path, variant, time.time())).fetchone()
+        if row is None:
+            return None
+        status, headerlist, body = row
+        return status, [tuple(header) for header in json.loads(headerlist)], bytes(body)
+
+    def set(self, path, variant, value, ttl):
+        """Store a (status, headerlist, body) tuple for a path and variant for ttl seconds."""
+        status, headerlist, body = value
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO whodat_cache VALUES (?, ?, ?, ?, ?, ?)',
+                               (path, variant, time.time() + ttl, status, json.dumps(headerlist), body))
+            connection.execute('DELETE FROM whodat_cache WHERE expires <= ?', (time.time(),))
+            connection.execute('DELETE FROM whodat_cache WHERE rowid IN (SELECT rowid FROM whodat_cache '
+                               'ORDER BY expires DESC LIMIT -1 OFFSET ?)', (self.max_size,))
+
+    def invalidate(self, path):
+        """Remove every entry of a path."""
+        with self._connection() as connection:
+            connection.execute('DELETE FROM whodat_cache WHERE path = ?', (path,))
+
+    def clear(self):
+        """Remove every entry."""
+        with self._connection() as connection:
+            connection.execute('DELETE FROM whodat_cache')
+
+    def size(self):
+        """Return the number of entries that have not expired."""
+        return self._connection().execute('SELECT COUNT(*) FROM whodat_cache WHERE expires > ?',
+                                          (time.time(),)).fetchone()[0]
+
+class CacheExtension(Extension):
+    """Cache the responses to GET requests, so identical requests are answered without calling the handler.
+
+    Responses are cached for the Handlers with a cache_ttl, or for every Handler if the extension has a TTL. A response
+    is cached only if its status is 200, its body is not streamed, and it neither sets cookies nor has a 'Cache-Control'
+    header with 'no-store' or 'private'. The process_response of every extension is still called for cached responses,
+    so extensions listed after this one, such as CompressionExtension, see the same response as on a miss.
+    """
+
+    def __init__(self, backend=None, ttl=None, vary=()):
+        """Set the options of the cache.
+
+        backend -- object that stores the entries, such as a MemoryCacheBackend or a SQLiteCacheBackend. None uses a
+                   MemoryCacheBackend. None by default.
+        ttl -- number that specifies for how many seconds responses are cached for Handlers without a cache_ttl. None
+               caches only the responses of Handlers with a cache_ttl. None by default.
+        vary -- sequence of strings that specifies the request headers, such as 'Accept-Language', whose values are part
+                of the cache key, besides the path and the query string. Empty tuple by default.
+        """
+        self.backend = backend or MemoryCacheBackend()
+        self._ttl = ttl
+        self._vary = tuple(vary)
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_ttl(self, request):
+        """Return the TTL for the request, or None if it is not cached."""
+        if request.method != 'GET' or request.handler is None:
+            return None
+        return self._ttl if request.handler._cache_ttl is None else request.handler._cache_ttl
+
+    def _variant(self, request):
+        """Return the string that identifies the cached variant of a path for the request."""
+        return '\n'.join([request.query_string] + [request.headers.get(header, '') for header in self._vary])
+
+    def process_request(self, request):
+        """Return the cached response for the request, or None."""
+        if not self._cache_ttl(request):
+            return None
+        value = self.backend.get(request.path, self._variant(request))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        request.cache_hit = True
+        status, headerlist, body = value
+        return HTTPResponse(body, status, headerlist=list(headerlist))
+
+    def process_response(self, request, response):
+        """Store the response if it may be cached."""
+        cache_ttl = self._cache_ttl(request)
+        if not cache_ttl or getattr(request, 'cache_hit', False):
+            return None
+        if response.status[:3] != '200' or response.streaming:
+            return None
+        headerlist = []
+        for key, value in response.headerlist:
+            if key.lower() == 'set-cookie':
+                return None
+            if key.lower() == 'cache-control' and ('no-store' in value or 'private' in value):
+                return None
+            if key.lower() != 'content-length':
+                headerlist.append((key, value))
+        self.backend.set(request.path, self._variant(request), (response.status, headerlist, response.body), cache_ttl)
+        return None
+
+    def invalidate(self, path):
+        """Remove the cached responses of a path."""
+        self.backend.invalidate(path)
+
+    def clear(self):
+        """Remove every cached response."""
+        self.backend.clear()
+
+    def info(self):
+        """Return a dict with the statistics of the cache."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': self.backend.size(),
+                'max_size': self.backend.max_size}
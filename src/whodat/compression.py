@@ -0,0 +1,108 @@
+import zlib
+
+from whodat.extension import *
+from whodat.http import *
+
+# content types compressed by default, matched as prefixes
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+# window bits of the zlib compressor for each content coding
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+class CompressedIterator:
+    """Iterator that compresses the chunks of another iterable as they are produced."""
+
+    def __init__(self, iterable, compressor):
+        """Set the iterable and the zlib compressor."""
+        self._iterable = iterable
+        self._iterator = iter(iterable)
+        self._compressor = compressor
+        self._finished = False
+
+    def __iter__(self):
+        """Return this iterator."""
+        return self
+
+    def __next__(self):
+        """Return the next compressed chunk.
+
+        Each chunk is flushed, so a client receives data as soon as the wrapped iterable produces it.
+        """
+        if self._finished:
+            raise StopIteration()
+        for chunk in self._iterator:
+            if chunk:
+                return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self._finished = True
+        return self._compressor.flush()
+
+    def close(self):
+        """Close the wrapped iterable, if it can be closed."""
+        close = getattr(self._iterable, 'close', None)
+        if close is not None:
+            close()
+
+class CompressionExtension(Extension):
+    """Compress response bodies with gzip or deflate when the request accepts it."""
+
+    def __init__(self, min_size=500, content_types=COMPRESSIBLE_TYPES, level=6, encodings=('gzip', 'deflate')):
+        """Set the options of the compression.
+
+        min_size -- integer that specifies the minimum size in bytes of a body to be compressed. Streamed bodies are
+                    always compressed. 500 by default.
+        content_types -- sequence of strings that specifies the prefixes of the compressed content types.
+                         COMPRESSIBLE_TYPES by default.
+        level -- integer from 1 to 9 that specifies the zlib compression level. 6 by default.
+        encodings -- sequence of strings that specifies the offered content codings, 'gzip' and 'deflate', in order of
+                     preference. ('gzip', 'deflate') by default.
+        """
+        for encoding in encodings:
+            if encoding not in _WBITS:
+                raise ValueError('Unsupported content coding: %s' % encoding)
+        self._min_size = min_size
+        self._content_types = tuple(content_types)
+        self._level = level
+        self._offers = tuple(encodings) + ('identity',)
+
+    def _compressible(self, request, response):
+        """Return wheter the response may be compressed."""
+        if isinstance(response, FileResponse) or not 200 <= int(response.status[:3]) < 300:
+            return False
+        if response.status[:3] == '204' or not (response.content_type or '').startswith(self._content_types):
+            return False
+        if any(key.lower() == 'content-encoding' for key, value in response.headerlist):
+            return False
+        return response.streaming or (response.content_length or 0) >= self._min_size
+
+    def process_response(self, request, response):
+        """Return a compressed copy of the response, or None to keep it.
+
+        A FrozenResponse is copied before its 'Vary' header is set. A response to a HEAD request gets the 'Vary' header
+        of the response to the GET request but is not compressed, since it has no body.
+        """
+        if not self._compressible(request, response):
+            return None
+        vary = [value for key, value in response.headerlist if key.lower() == 'vary']
+        if not any('accept-encoding' in value.lower() or value.strip() == '*' for value in vary):
+            if isinstance(response, FrozenResponse):
+                response = response.thaw()
+            response.headerlist.append(('Vary', 'Accept-Encoding'))
+        if request.method == 'HEAD' or request.headers.get('Accept-Encoding') is None:
+            return response
+        encoding = request.best_accept_encoding(self._offers)
+        if encoding not in _WBITS:
+            return response
+        headerlist = []
+        for key, value in response.headerlist:
+            if key.lower() == 'content-length':
+                continue
+            if key.lower() == 'etag' and not value.startswith('W/'):
+                value = 'W/' + value
+            headerlist.append((key, value))
+        headerlist.append(('Content-Encoding', encoding))
+        compressor = zlib.compressobj(self._level, zlib.DEFLATED, _WBITS[encoding])
+        if response.streaming:
+            return HTTPResponse(CompressedIterator(response.app_iter, compressor), response.status, charset=None,
+                                headerlist=headerlist)
+        return HTTPResponse(compressor.compress(response.body) + compressor.flush(), response.status,
+                            headerlist=headerlist)
@@ -0,0 +1,50 @@
+import hashlib
+
+from whodat.extension import *
+from whodat.http import *
+from whodat.http import _not_modified
+
+# headers kept by a 304 response
+_NOT_MODIFIED_HEADERS = ('cache-control', 'content-location', 'date', 'etag', 'expires', 'last-modified', 'vary')
+
+class ETagExtension(Extension):
+    """Set an 'ETag' header on responses and answer conditional requests with 304 Not Modified."""
+
+    def __init__(self, weak=False, digest_size=8):
+        """Set the options of the ETags.
+
+        weak -- bool that specifies wheter computed ETags are weak. False by default.
+        digest_size -- integer that specifies the size in bytes of the BLAKE2b digest of the body used as ETag. 8 by
+                       default.
+        """
+        self._weak = weak
+        self._digest_size = digest_size
+
+    def etag(self, body):
+        """Return the ETag of a body."""
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=self._digest_size).hexdigest()
+        return 'W/' + etag if self._weak else etag
+
+    def process_response(self, request, response):
+        """Return an empty 304 response if the request's validators match the response, or the response otherwise.
+
+        An 'ETag' header set by the handler is kept. Otherwise, it is computed from the body, or for a HEAD request
+        from the body that a GET request would get, unless the body is streamed, and a FrozenResponse is copied before
+        it is set. 'If-Modified-Since' is honoured for responses with a 'Last-Modified' header.
+        """
+        if request.method not in ('GET', 'HEAD') or response.status[:3] != '200':
+            return None
+        headers = {key.lower(): value for key, value in response.headerlist}
+        etag = headers.get('etag')
+        if etag is None and not response.streaming:
+            body = response.body if request.method == 'GET' else response.discarded_body
+            if body is not None:
+                etag = self.etag(body)
+                if isinstance(response, FrozenResponse):
+                    response = response.thaw()
+                response.headerlist.append(('ETag', etag))
+        if not _not_modified(request, etag, headers.get('last-modified')):
+            return response
+        response.close()
+        headerlist = [(key, value) for key, value in response.headerlist if key.lower() in _NOT_MODIFIED_HEADERS]
+        return HTTPResponse('', 304, headerlist=headerlist)
@@ -1,14 +1,32 @@
 class Extension:
-    """Plugin system for WSGIApplication."""
+    """Plugin system for WSGIApplication.
+
+    Only the extensions that override a hook are called for it, so an extension pays nothing for the hooks it does not
+    define.
+    """
+
+    # URL patterns of the Handlers the extension applies to, None applies it to every Handler
+    routes = None
 
     def __call__(self, app):
         """It is called before any request is accepted by the server."""
         pass
 
     def process_request(self, request):
-        """It is called before each request is processed by a handler."""
+        """It is called before each request is processed by a handler. It may return an HTTPResponse, in which case
+        neither the handler nor the process_request of the following extensions are called."""
         pass
 
     def process_response(self, request, response):
-        """It is called after each request is processed by a handler."""
+        """It is called after each request is processed by a handler. It may return an HTTPResponse that replaces the
+        response."""
         pass
+
+    def process_exception(self, request, exception):
+        """It is called when the handler or an extension raises an exception while processing a request routed to a
+        handler. It may return an HTTPResponse, in which case the error handler is not called."""
+        pass
+
+def overrides(extension, hook):
+    """Return wheter an extension defines its own method for a hook, such as 'process_request'."""
+    return getattr(type(extension), hook, None) not in (None, getattr(Extension, hook))
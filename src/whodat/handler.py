@@ -1,44 +1,186 @@
+import asyncio
+import inspect
 import re
+import uuid
 
+from types import MappingProxyType
 from whodat.http import *
 
+HTTP_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+
+class Converter:
+    """Typed URL placeholder."""
+
+    def __init__(self, regex, convert=str, segment=True):
+        """Set the attributes of a typed URL placeholder.
+
+        regex -- string that specifies the regular expression matched by the placeholder. It must not contain capturing
+                 groups.
+        convert -- function that receives the matched string and returns the value passed to the handler method. It may
+                   raise a ValueError to reject the URL. str by default.
+        segment -- bool that specifies wheter the regular expression never matches a slash. True by default.
+        """
+        self.regex = regex
+        self.convert = convert
+        self.segment = segment
+
+# typed URL placeholders, written as '<name>' in URL patterns
+converters = {
+    'int': Converter(r'[0-9]+', int),
+    'uuid': Converter(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}', uuid.UUID),
+    'slug': Converter(r'[-a-zA-Z0-9_]+'),
+    'path': Converter(r'.+', segment=False),
+}
+
+_untyped_converter = Converter(r'[^/]+')
+
+def _converter(name):
+    """Return the Converter of a typed URL placeholder, or raise a ValueError."""
+    try:
+        return converters[name]
+    except KeyError:
+        raise ValueError('Unknown URL placeholder type: %s' % name)
+
+def url_converters(url_pattern):
+    """Return the list of Converters for the placeholders of the URL pattern, in order."""
+    url_converters = []
+    for i, part in enumerate(re.split(r'<(\w+)>', url_pattern)):
+        if i % 2:
+            url_converters.append(_converter(part))
+        else:
+            url_converters.extend([_untyped_converter] * part.count('_'))
+    return url_converters
+
+def url_regex(url_pattern):
+    """Return the regular expression, without anchors, that matches the URL pattern.
+
+    Each '_' matches a non-empty path segment and each '<name>' matches the regular expression of a typed placeholder.
+    """
+    parts = re.split(r'<(\w+)>', url_pattern)
+    for i, part in enumerate(parts):
+        if i % 2:
+            parts[i] = '(%s)' % _converter(part).regex
+        else:
+            parts[i] = re.escape(part).replace('_', '([^/]+)')
+    return ''.join(parts)
+
 class Handler:
     """Handle requests."""
 
-    def __init__(self, url_pattern):
-        """Set the regular expression for the URL pattern."""
-        self._url_regex = re.compile(r'^%s$' % re.escape(url_pattern).replace('_', '([^/]+)'))
+    def __init__(self, url_pattern, max_body_size=None, max_part_size=None, cache_ttl=None):
+        """Set the regular expression for the URL pattern and the table of methods for each HTTP method. Every public
+        method of the class handles the HTTP method with its name in upper case, such as 'propfind' for PROPFIND.
 
-    def __call__(self, request, *args):
-        """Call the appropriate method and return an HTTPResponse, or raise an HTTPMethodNotAllowed exception."""
-        http_method = request.method.lower()
-        if http_method == 'head':
-            http_method = 'get'
+        max_body_size -- integer that specifies the maximum request body size in bytes for this Handler. None uses the
+                         limit of the application. None by default.
+        max_part_size -- integer that specifies the maximum multipart part size in bytes for this Handler. None uses
+                         the limit of the application. None by default.
+        cache_ttl -- number that specifies for how many seconds the responses to GET requests are kept by a
+                     CacheExtension. None uses the TTL of the extension. None by default.
+        """
+        self._url_pattern = url_pattern
+        self._max_body_size = max_body_size
+        self._max_part_size = max_part_size
+        self._cache_ttl = cache_ttl
+        self._url_regex = re.compile(r'^%s$' % url_regex(url_pattern))
+        self._url_converters = url_converters(url_pattern)
+        if all(converter.convert is str for converter in self._url_converters):
+            self._convert = None
+        else:
+            self._convert = tuple(converter.convert for converter in self._url_converters)
+        methods = {}
+        for name in dir(type(self)):
+            if name.startswith('_') or hasattr(Handler, name):
+                continue
+            handler_method = getattr(self, name)
+            if inspect.ismethod(handler_method) or inspect.isfunction(handler_method):
+                methods[name.upper()] = handler_method
+        if 'HEAD' not in methods and 'GET' in methods:
+            methods['HEAD'] = methods['GET']
+        if 'OPTIONS' not in methods:
+            methods['OPTIONS'] = self._options
+        self._methods = MappingProxyType(methods)
+        extensions = sorted(http_method for http_method in methods if http_method not in HTTP_METHODS)
+        self._allow = ', '.join([http_method for http_method in HTTP_METHODS if http_method in methods] + extensions)
+
+    def convert_args(self, args):
+        """Return the arguments captured from the URL converted by the typed placeholders, or raise a ValueError."""
+        if self._convert is None:
+            return args
+        return tuple(convert(arg) for convert, arg in zip(self._convert, args))
+
+    def _options(self, request, *args):
+        """Return an empty HTTPResponse listing the allowed HTTP methods."""
+        return HTTPResponse(headerlist=[('Allow', self._allow)])
+
+    def _handler_method(self, request):
+        """Return the method for the HTTP method of the request, or raise an HTTPMethodNotAllowed exception."""
         try:
-            handler_method = getattr(self, http_method)
-        except:
-            raise HTTPMethodNotAllowed()
-        response = handler_method(request, *args)
-        if isinstance(response, str):
+            return self._methods[request.method]
+        except KeyError:
+            raise HTTPMethodNotAllowed(self._allow)
+
+    def _make_response(self, request, response):
+        """Return the HTTPResponse for the value returned by a method."""
+        if isinstance(response, (str, bytes)) or hasattr(response, '__next__'):
             response = HTTPResponse(response)
-        if request.method.lower() == 'head':
-            response = HTTPResponse('', response.status, response.content_type, response.charset, response.headerlist)
+        elif isinstance(response, (dict, list)):
+            response = JSONResponse(response)
+        if request.method == 'HEAD':
+            if isinstance(response, FrozenResponse):
+                response = response.head
+            else:
+                response.discard_body()
         return response
 
+    def __call__(self, request, *args):
+        """Call the appropriate method and return an HTTPResponse, or raise an HTTPMethodNotAllowed exception.
+
+        Methods may return an HTTPResponse, a string, bytes, an iterator, such as a generator, of strings or bytes that
+        is streamed as the response body, or a dict or a list that is sent as a JSONResponse. Methods may also be
+        coroutine functions, declared with 'async def', which are run to completion in a new event loop here and
+        awaited directly by ASGIApplication.
+
+        HEAD requests are handled by a 'head' method if there is one, or by the 'get' method otherwise. The body is
+        discarded but the headers, including 'Content-Length', are kept. A 'get' method that returns a generator is
+        never iterated for HEAD requests, so its body is not rendered.
+        """
+        response = self._handler_method(request)(request, *args)
+        if inspect.iscoroutine(response):
+            response = asyncio.run(response)
+        return self._make_response(request, response)
+
 class url:
     """Decorator to transform a class into a Handler instance."""
 
-    def __init__(self, url_pattern):
-        """Set the URL pattern."""
+    def __init__(self, url_pattern, max_body_size=None, max_part_size=None, cache_ttl=None):
+        """Set the URL pattern and the options of the Handler."""
         self._url_pattern = url_pattern
+        self._max_body_size = max_body_size
+        self._max_part_size = max_part_size
+        self._cache_ttl = cache_ttl
 
     def __call__(self, cls):
         """Return an instance of a new type inherited from Handler."""
         handler = type('handler', (Handler,), dict(cls.__dict__))
-        return handler(self._url_pattern)
+        return handler(self._url_pattern, self._max_body_size, self._max_part_size, self._cache_ttl)
+
+# general-purpose error responses, by status code
+_error_responses = {}
+
+def _frozen_error(http_error):
+    """Return the general-purpose FrozenResponse shared by the errors with the status code of an HTTPError."""
+    response = _error_responses.get(http_error.status)
+    if response is None:
+        response = _error_responses[http_error.status] = FrozenResponse(str(http_error), http_error.status)
+    return response
 
 class ErrorHandler:
-    """Handle HTTPErrors."""
+    """Handle HTTPErrors.
+
+    When the error method is not overridden, errors without headers of their own share a FrozenResponse for each
+    status code.
+    """
 
     def error(self, http_error):
         """Return a general-purpose HTTPResponse."""
@@ -51,6 +193,12 @@ class ErrorHandler:
             handler_method = getattr(self, 'error%s' % http_error_status)
         elif hasattr(self, 'error%sxx' % http_error_status[0]):
             handler_method = getattr(self, 'error%sxx' % http_error_status[0])
+        elif type(self).error is ErrorHandler.error and not http_error.headerlist:
+            return _frozen_error(http_error)
         else:
             handler_method = self.error
-        return handler_method(http_error)
+        response = handler_method(http_error)
+        if http_error.headerlist:
+            response = response.copy()
+            response.headerlist.extend(http_error.headerlist)
+        return response
@@ -1,44 +1,222 @@
 import io
+import json
+import mimetypes
+import re
 import sys
 
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from urllib.parse import parse_qsl, quote
 from webob import Request, Response
 from webob.compat import url_encode
 from webob.request import _encode_multipart
 
-class HTTPRequest:
-    """Wrap the WebOb's Request class."""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from whodat.negotiation import *
+
+class lazy_property:
+    """Property computed on first access and then cached in the instance."""
+
+    def __init__(self, function):
+        """Set the function that computes the property."""
+        self._function = function
+        self.__doc__ = function.__doc__
+
+    def __set_name__(self, owner, name):
+        """Set the name of the instance attribute where the value is cached."""
+        self._name = name
+
+    def __get__(self, instance, owner):
+        """Return the cached value, computing it on first access."""
+        if instance is None:
+            return self
+        value = instance.__dict__[self._name] = self._function(instance)
+        return value
+
+_PATH_SAFE = "/~!$&'()*+,;=:@"
+
+class slot_property:
+    """Property computed on first access and then cached in the slot with the same name prefixed by an underscore."""
+
+    def __init__(self, function):
+        """Set the function that computes the property."""
+        self._function = function
+        self.__doc__ = function.__doc__
+
+    def __set_name__(self, owner, name):
+        """Set the slot where the value is cached."""
+        self._slot = owner.__dict__['_' + name]
+
+    def __get__(self, instance, owner):
+        """Return the cached value, computing it on first access."""
+        if instance is None:
+            return self
+        try:
+            return self._slot.__get__(instance, owner)
+        except AttributeError:
+            value = self._function(instance)
+            self._slot.__set__(instance, value)
+            return value
+
+def _parse_query_string(query_string):
+    """Return a list of (name, value) tuples from a query string."""
+    return parse_qsl(query_string, keep_blank_values=True)
+
+def _parse_environ_headers(environ):
+    """Return a dict of the HTTP headers in a WSGI environment."""
+    headers = {}
+    for key, value in environ.items():
+        if key.startswith('HTTP_'):
+            headers[key[5:].replace('_', '-').title()] = value
+        elif key in ('CONTENT_TYPE', 'CONTENT_LENGTH') and value:
+            headers[key.replace('_', '-').title()] = value
+    return headers
+
+def _parse_cookies(cookie_header):
+    """Return a dict of the cookies in a 'Cookie' header."""
+    cookies = {}
+    for cookie in cookie_header.split(';'):
+        name, separator, value = cookie.partition('=')
+        name = name.strip()
+        if separator and name:
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] == '"':
+                value = value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+            cookies[name] = value
+    return cookies
+
+class BodyStream:
+    """File-like object that reads a request body from the WSGI input without buffering it."""
+
+    def __init__(self, wsgi_input, content_length, max_size=None, chunk_size=65536):
+        """Set the attributes of the stream.
+
+        wsgi_input -- file-like object that specifies the WSGI input.
+        content_length -- integer that specifies the body size. None reads until the end of the input.
+        max_size -- integer that specifies the maximum number of bytes that may be read. If more bytes are sent, an
+                    HTTPRequestEntityTooLarge exception is raised. None does not limit the body size. None by default.
+        chunk_size -- integer that specifies the size of the chunks returned by iteration. 65536 by default.
+        """
+        self._input = wsgi_input
+        self._remaining = content_length
+        self._max_size = max_size
+        self._chunk_size = chunk_size
+        self._read_size = 0
+
+    def read(self, size=-1):
+        """Return at most size bytes of the body, or the rest of the body if size is negative."""
+        if self._remaining is not None:
+            size = self._remaining if size < 0 else min(size, self._remaining)
+        elif size < 0 and self._max_size is not None:
+            size = self._max_size - self._read_size + 1
+        data = self._input.read(size) if size >= 0 else self._input.read()
+        self._read_size += len(data)
+        if self._remaining is not None:
+            self._remaining -= len(data)
+        if self._max_size is not None and self._read_size > self._max_size:
+            raise HTTPRequestEntityTooLarge()
+        return data
+
+    def __iter__(self):
+        """Return an iterator over the chunks of the body."""
+        while True:
+            chunk = self.read(self._chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def _parse_header(value):
+    """Return the value of a header without its parameters and a dict of its parameters."""
+    parts = value.split(';')
+    params = {}
+    for param in parts[1:]:
+        name, _, param_value = param.partition('=')
+        param_value = param_value.strip()
+        if len(param_value) >= 2 and param_value[0] == param_value[-1] == '"':
+            param_value = param_value[1:-1]
+        params[name.strip().lower()] = param_value
+    return parts[0].strip().lower(), params
+
+def _not_modified(request, etag, last_modified=None):
+    """Return wheter the 'If-None-Match' or, without it, the 'If-Modified-Since' header of a request matches the
+    validators of a response."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        etags = [value.strip() for value in if_none_match.split(',')]
+        return '*' in etags or etag.replace('W/', '', 1) in [value.replace('W/', '', 1) for value in etags]
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+class BaseHTTPRequest:
+    """Constructors and body streaming shared by HTTPRequest and NativeHTTPRequest."""
+
+    __slots__ = ()
+
+    # maximum body and multipart part sizes in bytes, set by WSGIApplication for the Handler serving the request
+    max_body_size = None
+    max_part_size = None
+
+    # Handler serving the request, set by WSGIApplication once the path is resolved
+    handler = None
+
+    # (function, args, kwargs) tuples called by WSGIApplication after the response is sent
+    tasks = ()
+
+    def add_task(self, function, *args, **kwargs):
+        """Add a function to be called with the arguments after the response to this request is sent."""
+        self.tasks = list(self.tasks) + [(function, args, kwargs)]
+
+    def _open_stream(self):
+        """Return a BodyStream over the request body, limited to max_body_size bytes."""
+        environ = self.environ
+        content_length = self.content_length
+        if content_length is None and not environ.get('wsgi.input_terminated'):
+            content_length = 0
+        if content_length is not None and self.max_body_size is not None and content_length > self.max_body_size:
+            raise HTTPRequestEntityTooLarge()
+        return BodyStream(environ.get('wsgi.input', io.BytesIO()), content_length, self.max_body_size)
+
+    def multipart(self, spool_size=1024 * 1024, max_part_size=None):
+        """Return an iterator over the parts of a multipart/form-data body, read from the stream.
+
+        spool_size -- integer that specifies the size in bytes above which a part is written to a temporary file
+                      instead of memory. 1 MiB by default.
+        max_part_size -- integer that specifies the maximum size in bytes of a part. If a part is larger, an
+                         HTTPRequestEntityTooLarge exception is raised. None uses max_part_size of the request. None by
+                         default.
+        """
+        from whodat.multipart import MultipartParser
+        content_type, params = _parse_header(self.environ.get('CONTENT_TYPE', ''))
+        if content_type != 'multipart/form-data' or not params.get('boundary'):
+            raise HTTPBadRequest()
+        max_part_size = self.max_part_size if max_part_size is None else max_part_size
+        return iter(MultipartParser(self.stream, params['boundary'], spool_size, max_part_size))
 
-    method = property(lambda self: self._request.method.upper())
-    http_version = property(lambda self: self._request.http_version)
-    charset = property(lambda self: self._request.charset)
-    host_name = property(lambda self: self._request.host_url)
-    host_port = property(lambda self: int(self._request.host_port))
-    host = property(lambda self: self._request.host)
-    path = property(lambda self: self._request.path)
-    query_string = property(lambda self: self._request.query_string)
-    url = property(lambda self: self._request.url)
-    body = property(lambda self: self._request.body)
-    text = property(lambda self: self._request.text)
-    GET = property(lambda self: self._GET)
-    POST = property(lambda self: self._POST)
-    headers = property(lambda self: self._headers)
-    cookies = property(lambda self: self._cookies)
-    accept = property(lambda self: self._accept)
-    accept_charset = property(lambda self: self._accept_charset)
-    accept_encoding = property(lambda self: self._accept_encoding)
-    accept_language = property(lambda self: self._accept_language)
+    def best_accept(self, offers, default=None):
+        """Return the media type among the offers that best matches the 'Accept' header, or default."""
+        return best_match(self.environ.get('HTTP_ACCEPT'), offers, 'accept', default)
 
-    def __init__(self, environ):
-        """Set attributes from a dictionary containing CGI-style environment variables."""
-        self._request = Request(environ)
-        self._GET = dict(self._request.GET.items())
-        self._POST = dict(self._request.POST.items())
-        self._headers = dict(self._request.headers.items())
-        self._cookies = dict(self._request.cookies.items())
-        self._accept = list(self._request.accept)
-        self._accept_charset = list(self._request.accept_charset)
-        self._accept_encoding = list(self._request.accept_encoding)
-        self._accept_language = list(self._request.accept_language)
+    def best_accept_charset(self, offers, default=None):
+        """Return the charset among the offers that best matches the 'Accept-Charset' header, or default."""
+        return best_match(self.environ.get('HTTP_ACCEPT_CHARSET'), offers, 'charset', default)
+
+    def best_accept_encoding(self, offers, default=None):
+        """Return the content coding among the offers that best matches the 'Accept-Encoding' header, or default."""
+        return best_match(self.environ.get('HTTP_ACCEPT_ENCODING'), offers, 'encoding', default)
+
+    def best_accept_language(self, offers, default=None):
+        """Return the language among the offers that best matches the 'Accept-Language' header, or default."""
+        return best_match(self.environ.get('HTTP_ACCEPT_LANGUAGE'), offers, 'language', default)
 
     @classmethod
     def get(cls, http_version='HTTP/1.1', server_name='localhost', server_port=8000, script_name='', path_info='',
@@ -263,6 +441,182 @@ class HTTPRequest:
         environ.update(headers or {})
         return cls(environ)
 
+class HTTPRequest(BaseHTTPRequest):
+    """Wrap the WebOb's Request class.
+
+    Attributes are parsed from the environment on first access and then cached, so a request only pays for what its
+    handler reads.
+    """
+
+    method = lazy_property(lambda self: self._request.method.upper())
+    http_version = property(lambda self: self._request.http_version)
+    charset = property(lambda self: self._request.charset)
+    host_name = property(lambda self: self._request.host_url)
+    host_port = property(lambda self: int(self._request.host_port))
+    host = property(lambda self: self._request.host)
+    path = lazy_property(lambda self: self._request.path)
+    query_string = property(lambda self: self._request.query_string)
+    url = property(lambda self: self._request.url)
+    body = property(lambda self: self._request.body)
+    text = property(lambda self: self._request.text)
+    GET = lazy_property(lambda self: dict(self._request.GET.items()))
+    POST = lazy_property(lambda self: dict(self._request.POST.items()))
+    headers = lazy_property(lambda self: dict(self._request.headers.items()))
+    cookies = lazy_property(lambda self: dict(self._request.cookies.items()))
+    accept = lazy_property(lambda self: list(self._request.accept))
+    accept_charset = lazy_property(lambda self: list(self._request.accept_charset))
+    accept_encoding = lazy_property(lambda self: list(self._request.accept_encoding))
+    accept_language = lazy_property(lambda self: list(self._request.accept_language))
+    environ = property(lambda self: self._request.environ)
+    content_length = lazy_property(lambda self: self._request.content_length)
+    stream = lazy_property(BaseHTTPRequest._open_stream)
+
+    def __init__(self, environ):
+        """Set attributes from a dictionary containing CGI-style environment variables."""
+        self._request = Request(environ)
+
+class NativeHTTPRequest(BaseHTTPRequest):
+    """HTTP request read directly from the WSGI environment, without WebOb.
+
+    It has the same attributes as HTTPRequest. Attributes are parsed on first access and cached in slots.
+    """
+
+    __slots__ = ('_environ', '_method', '_path', '_body', '_GET', '_POST', '_headers', '_cookies', '_accept',
+                 '_accept_charset', '_accept_encoding', '_accept_language', '_content_length', '_stream',
+                 'max_body_size', 'max_part_size', 'handler', '__dict__')
+
+    environ = property(lambda self: self._environ)
+    method = slot_property(lambda self: self._environ.get('REQUEST_METHOD', 'GET').upper())
+    http_version = property(lambda self: self._environ.get('SERVER_PROTOCOL'))
+    query_string = property(lambda self: self._environ.get('QUERY_STRING', ''))
+    text = property(lambda self: self.body.decode(self.charset))
+    GET = slot_property(lambda self: dict(_parse_query_string(self.query_string)))
+    headers = slot_property(lambda self: _parse_environ_headers(self._environ))
+    cookies = slot_property(lambda self: _parse_cookies(self._environ.get('HTTP_COOKIE', '')))
+    accept = slot_property(lambda self: list(accept_values(self._environ.get('HTTP_ACCEPT'))))
+    accept_charset = slot_property(
+        lambda self: list(accept_values(self._environ.get('HTTP_ACCEPT_CHARSET'), 'iso-8859-1')))
+    accept_encoding = slot_property(lambda self: list(accept_values(self._environ.get('HTTP_ACCEPT_ENCODING'))))
+    accept_language = slot_property(lambda self: list(accept_values(self._environ.get('HTTP_ACCEPT_LANGUAGE'))))
+    stream = slot_property(BaseHTTPRequest._open_stream)
+
+    def __init__(self, environ):
+        """Set attributes from a dictionary containing CGI-style environment variables."""
+        self._environ = environ
+        self.max_body_size = None
+        self.max_part_size = None
+        self.handler = None
+
+    @property
+    def charset(self):
+        """Return the charset of the body, 'UTF-8' by default."""
+        charset = _parse_header(self._environ.get('CONTENT_TYPE', ''))[1].get('charset', 'UTF-8')
+        return 'UTF-8' if charset.lower().replace('-', '') == 'utf8' else charset
+
+    @property
+    def host_name(self):
+        """Return the URL of the host, without a default port."""
+        environ = self._environ
+        scheme = environ['wsgi.url_scheme']
+        host = environ.get('HTTP_HOST')
+        if host is not None:
+            port = None
+            if ':' in host and host[-1] != ']':
+                host, port = host.rsplit(':', 1)
+        else:
+            host = environ['SERVER_NAME']
+            port = environ['SERVER_PORT']
+        if (scheme, port) in (('http', '80'), ('https', '443')):
+            port = None
+        return '%s://%s:%s' % (scheme, host, port) if port else '%s://%s' % (scheme, host)
+
+    @property
+    def host_port(self):
+        """Return the port of the host."""
+        environ = self._environ
+        host = environ.get('HTTP_HOST')
+        if host is None:
+            return int(environ['SERVER_PORT'])
+        if ':' in host and host[-1] != ']':
+            return int(host.rsplit(':', 1)[1])
+        return 443 if environ['wsgi.url_scheme'] == 'https' else 80
+
+    @property
+    def host(self):
+        """Return the host from the 'Host' header, or the server name and port."""
+        environ = self._environ
+        return environ.get('HTTP_HOST') or '%s:%s' % (environ['SERVER_NAME'], environ['SERVER_PORT'])
+
+    @slot_property
+    def path(self):
+        """Return the quoted script name and path info."""
+        environ = self._environ
+        return (quote(environ.get('SCRIPT_NAME', '').encode('latin-1'), _PATH_SAFE) +
+                quote(environ.get('PATH_INFO', '').encode('latin-1'), _PATH_SAFE))
+
+    @property
+    def url(self):
+        """Return the full URL, including the query string."""
+        query_string = self.query_string
+        return self.host_name + self.path + ('?' + query_string if query_string else '')
+
+    @slot_property
+    def content_length(self):
+        """Return the body size from the 'Content-Length' header, or None."""
+        try:
+            return int(self._environ['CONTENT_LENGTH'])
+        except (KeyError, ValueError):
+            return None
+
+    @slot_property
+    def body(self):
+        """Return the body, read from the stream."""
+        return self.stream.read()
+
+    @slot_property
+    def POST(self):
+        """Return a dict of the fields of a form body, with a MultipartPart for each uploaded file."""
+        if self.method not in ('POST', 'PUT', 'PATCH', 'DELETE'):
+            return {}
+        content_type, params = _parse_header(self._environ.get('CONTENT_TYPE', ''))
+        if content_type == 'application/x-www-form-urlencoded':
+            return dict(_parse_query_string(self.body.decode(self.charset)))
+        if content_type == 'multipart/form-data' and params.get('boundary'):
+            from whodat.multipart import MultipartParser
+            parser = MultipartParser(io.BytesIO(self.body), params['boundary'], max_part_size=self.max_part_size)
+            return {part.name: part if part.filename else part.value.decode(self.charset) for part in parser}
+        return {}
+
+class BodyIterator:
+    """Iterator over the chunks of a streaming response body, encoding text chunks with the response charset."""
+
+    def __init__(self, iterable, charset):
+        """Set the iterable that produces the chunks and the charset used to encode text chunks."""
+        self._iterable = iterable
+        self._iterator = iter(iterable)
+        self._charset = charset or 'UTF-8'
+
+    def __iter__(self):
+        """Return this iterator."""
+        return self
+
+    def __next__(self):
+        """Return the next chunk as bytes."""
+        chunk = next(self._iterator)
+        return chunk.encode(self._charset) if isinstance(chunk, str) else chunk
+
+    def close(self):
+        """Close the iterable, if it can be closed."""
+        close = getattr(self._iterable, 'close', None)
+        if close is not None:
+            close()
+
+@lru_cache(maxsize=64)
+def _content_type_header(content_type, charset):
+    """Return the value of the 'Content-Type' header for a content type and a charset, built once by the installed
+    WebOb, since versions differ on which content types get the charset."""
+    return Response(content_type=content_type, charset=charset).headers['Content-Type']
+
 class HTTPResponse:
     """Wrap the WebOb's Response class."""
 
@@ -272,10 +626,59 @@ class HTTPResponse:
     status = property(lambda self: self._response.status)
     charset = property(lambda self: self._response.charset)
     headerlist = property(lambda self: self._response.headerlist)
+    app_iter = property(lambda self: self._response.app_iter)
+    content_length = property(lambda self: self._response.content_length)
+    streaming = property(lambda self: not isinstance(self._response.app_iter, list))
+    discarded_body = property(lambda self: self._discarded_body)
+
+    # (function, args, kwargs) tuples called by WSGIApplication after the response is sent
+    tasks = ()
+
+    # body replaced by discard_body, if it was not streamed, so that extensions can validate responses to HEAD requests
+    _discarded_body = None
 
     def __init__(self, body='', status=200, content_type='text/html', charset='UTF-8', headerlist=None):
-        """Set attributes for a Webob Response."""
-        self._response = Response(body, status, headerlist, content_type=content_type, charset=charset)
+        """Set attributes for a Webob Response.
+
+        A body that is neither a string nor bytes is streamed: it is an iterable of strings or bytes that is consumed
+        only when the response is sent, and no 'Content-Length' header is set.
+        """
+        if type(body) is bytes and status == 200 and headerlist is None and content_type:
+            headerlist = [('Content-Type', _content_type_header(content_type, charset)),
+                          ('Content-Length', str(len(body)))]
+            self._response = Response(status=status, headerlist=headerlist, app_iter=[body])
+        elif isinstance(body, (str, bytes)):
+            self._response = Response(body, status, headerlist, content_type=content_type, charset=charset)
+        else:
+            self._response = Response(status=status, headerlist=headerlist, app_iter=BodyIterator(body, charset),
+                                      content_type=content_type, charset=charset)
+
+    def close(self):
+        """Close the body iterable, if it can be closed."""
+        close = getattr(self._response.app_iter, 'close', None)
+        if close is not None:
+            close()
+
+    def add_task(self, function, *args, **kwargs):
+        """Add a function to be called with the arguments after the response is sent."""
+        self.tasks = list(self.tasks) + [(function, args, kwargs)]
+
+    def copy(self):
+        """Return a copy of the response whose headers can be changed without changing this one."""
+        response = type(self).__new__(type(self))
+        response.__dict__.update(self.__dict__)
+        response._response = self._response.copy()
+        return response
+
+    def discard_body(self):
+        """Close the body and replace it with an empty one, keeping the 'Content-Length' header, as required by a
+        response to a HEAD request. A body that is not streamed is kept as discarded_body."""
+        content_length = self._response.content_length
+        if not self.streaming:
+            self._discarded_body = self._response.body
+        self.close()
+        self._response.app_iter = [b'']
+        self._response.content_length = content_length
 
     def cache_expires(self, seconds):
         """Set the response to expire in the specified seconds."""
@@ -314,6 +717,226 @@ class HTTPResponse:
         """WSGI application interface."""
         return self._response(environ, start_response)
 
+def _json_encoder(data):
+    """Return the JSON representation of an object as UTF-8 bytes."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _json_array(iterable, encoder, chunk_size):
+    """Return a generator of the JSON representation of an array with the items of an iterable, in chunks of about
+    chunk_size bytes."""
+    try:
+        chunk = bytearray(b'[')
+        separator = b''
+        for item in iterable:
+            chunk += separator
+            chunk += encoder(item)
+            separator = b','
+            if len(chunk) >= chunk_size:
+                yield bytes(chunk)
+                chunk = bytearray()
+        chunk += b']'
+        yield bytes(chunk)
+    finally:
+        close = getattr(iterable, 'close', None)
+        if close is not None:
+            close()
+
+class JSONResponse(HTTPResponse):
+    """HTTP response with a JSON body."""
+
+    # function that returns the JSON representation of an object as bytes, orjson.dumps if orjson is installed
+    encoder = staticmethod(orjson.dumps if orjson else _json_encoder)
+
+    def __init__(self, data, status=200, headerlist=None, encoder=None, chunk_size=65536):
+        """Set attributes for a JSON response.
+
+        data -- object that specifies the content of the body. An iterator, such as a generator, is streamed as a JSON
+                array, one item at a time, without a 'Content-Length' header.
+        encoder -- function that returns the JSON representation of an object as bytes. None uses the encoder
+                   attribute of the class. None by default.
+        chunk_size -- integer that specifies the approximate size in bytes of the chunks of a streamed array. 65536 by
+                      default.
+        """
+        encoder = encoder or self.encoder
+        if hasattr(data, '__next__'):
+            body = _json_array(data, encoder, chunk_size)
+        else:
+            body = encoder(data)
+        super(JSONResponse, self).__init__(body, status, 'application/json', None, headerlist)
+
+class FrozenResponse(HTTPResponse):
+    """HTTP response whose status, headers and body are serialized once, so the same instance can be returned for any
+    number of requests.
+
+    It cannot be modified: methods that would change it raise a TypeError, and thaw returns a modifiable copy.
+    """
+
+    body = property(lambda self: self._body)
+    text = property(lambda self: self._body.decode(self._charset or 'UTF-8'))
+    content_type = property(lambda self: self._content_type)
+    status = property(lambda self: self._status)
+    charset = property(lambda self: self._charset)
+    headerlist = property(lambda self: self._headerlist)
+    app_iter = property(lambda self: [self._body])
+    content_length = property(lambda self: self._content_length)
+    streaming = False
+
+    def __init__(self, body='', status=200, content_type='text/html', charset='UTF-8', headerlist=None):
+        """Set attributes for a frozen response. The body must be a string or bytes."""
+        if not isinstance(body, (str, bytes)):
+            raise TypeError('The body of a FrozenResponse must be a string or bytes')
+        response = HTTPResponse(body, status, content_type, charset, headerlist)
+        self._body = response.body
+        self._status = response.status
+        self._headerlist = tuple(response.headerlist)
+        self._content_type = response.content_type
+        self._charset = response.charset
+        self._content_length = response.content_length
+        self._head = None
+
+    @property
+    def head(self):
+        """Return the FrozenResponse to a HEAD request, with the same headers and an empty body."""
+        if self._head is None:
+            head = FrozenResponse.__new__(FrozenResponse)
+            head.__dict__.update(self.__dict__)
+            head._body = b''
+            head._discarded_body = self._body
+            head._head = head
+            self._head = head
+        return self._head
+
+    def thaw(self):
+        """Return an HTTPResponse with the same status, headers and body that can be modified."""
+        headerlist = [(key, value) for key, value in self._headerlist if key.lower() != 'content-length']
+        if self._discarded_body is None:
+            return HTTPResponse(self._body, self._status, headerlist=headerlist)
+        response = HTTPResponse(self._discarded_body, self._status, headerlist=headerlist)
+        response.discard_body()
+        return response
+
+    copy = thaw
+
+    def _frozen(self, *args, **kwargs):
+        """Raise a TypeError."""
+        raise TypeError('A FrozenResponse cannot be modified, use thaw to get a copy')
+
+    cache_expires = set_cookie = unset_cookie = delete_cookie = discard_body = add_task = _frozen
+
+    def close(self):
+        """Do nothing, since the body is not an iterable to close."""
+        pass
+
+    def __call__(self, environ, start_response):
+        """WSGI application interface."""
+        start_response(self._status, list(self._headerlist))
+        return [b''] if environ['REQUEST_METHOD'] == 'HEAD' else [self._body]
+
+class FileIterator:
+    """Iterator over the chunks of a file, optionally limited to a number of bytes."""
+
+    def __init__(self, file, chunk_size=65536, length=None):
+        """Set the file, the size of the chunks and the number of bytes to read. None reads until the end of the
+        file."""
+        self._file = file
+        self._chunk_size = chunk_size
+        self._remaining = length
+
+    def __iter__(self):
+        """Return this iterator."""
+        return self
+
+    def __next__(self):
+        """Return the next chunk of the file."""
+        size = self._chunk_size if self._remaining is None else min(self._chunk_size, self._remaining)
+        chunk = self._file.read(size) if size > 0 else b''
+        if not chunk:
+            raise StopIteration()
+        if self._remaining is not None:
+            self._remaining -= len(chunk)
+        return chunk
+
+    def close(self):
+        """Close the file."""
+        self._file.close()
+
+class FileResponse(HTTPResponse):
+    """HTTP response that streams a file.
+
+    The file is sent through the server's wsgi.file_wrapper when it offers one, so it may use sendfile, or read in
+    chunks otherwise. A single byte range requested with a 'Range' header is answered with a 206 response.
+    """
+
+    _range_regex = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+    def __init__(self, file, content_type=None, charset=None, headerlist=None, chunk_size=65536):
+        """Set attributes for a file response.
+
+        file -- file object opened in binary mode, or string that specifies the path of the file.
+        content_type -- string that specifies the content type. None guesses it from the file name. None by default.
+        charset -- string that specifies the charset. None by default.
+        headerlist -- list of HTTP headers. None by default.
+        chunk_size -- integer that specifies how many bytes are read at once. 65536 by default.
+        """
+        if isinstance(file, str):
+            file = open(file, 'rb')
+        if content_type is None:
+            content_type = mimetypes.guess_type(str(getattr(file, 'name', '')))[0] or 'application/octet-stream'
+        self._file = file
+        self._offset = file.tell()
+        self._size = file.seek(0, io.SEEK_END) - self._offset
+        file.seek(self._offset)
+        self._chunk_size = chunk_size
+        self._response = Response(status=200, app_iter=FileIterator(file, chunk_size), content_type=content_type,
+                                  charset=charset)
+        self._response.content_length = self._size
+        self._response.headerlist.extend(headerlist or [])
+        self._response.headerlist.append(('Accept-Ranges', 'bytes'))
+
+    def _range(self, environ):
+        """Return the (start, end) byte range requested by the environment, None to send the whole file, or False if
+        the range cannot be satisfied."""
+        match = self._range_regex.match(environ.get('HTTP_RANGE', '').replace(' ', ''))
+        if match is None or environ['REQUEST_METHOD'] != 'GET' or self._response.status_code != 200:
+            return None
+        if_range = environ.get('HTTP_IF_RANGE')
+        if if_range is not None:
+            validators = [value for key, value in self._response.headerlist if key.lower() in ('etag', 'last-modified')]
+            if if_range not in validators:
+                return None
+        first, last = match.groups()
+        if not first:
+            if not last or int(last) == 0:
+                return False
+            return max(self._size - int(last), 0), self._size - 1
+        start = int(first)
+        end = min(int(last), self._size - 1) if last else self._size - 1
+        if start >= self._size or start > end:
+            return False
+        return start, end
+
+    def __call__(self, environ, start_response):
+        """WSGI application interface."""
+        byte_range = self._range(environ) if 'HTTP_RANGE' in environ else None
+        if byte_range is None:
+            file_wrapper = environ.get('wsgi.file_wrapper')
+            if file_wrapper is None or environ['REQUEST_METHOD'] == 'HEAD':
+                return self._response(environ, start_response)
+            start_response(self._response.status, self._response.headerlist)
+            return file_wrapper(self._file, self._chunk_size)
+        headerlist = [(key, value) for (key, value) in self._response.headerlist if key.lower() != 'content-length']
+        if byte_range is False:
+            self._file.close()
+            start_response('416 Requested Range Not Satisfiable',
+                           headerlist + [('Content-Range', 'bytes */%d' % self._size), ('Content-Length', '0')])
+            return []
+        start, end = byte_range
+        headerlist.append(('Content-Range', 'bytes %d-%d/%d' % (start, end, self._size)))
+        headerlist.append(('Content-Length', str(end - start + 1)))
+        start_response('206 Partial Content', headerlist)
+        self._file.seek(self._offset + start)
+        return FileIterator(self._file, self._chunk_size, end - start + 1)
+
 class HTTPRedirect(HTTPResponse):
     """HTTP 301 or 302 response."""
 
@@ -328,11 +951,19 @@ class HTTPError(Exception):
         """Set an HTTP error with the specified status code."""
         super(HTTPError, self).__init__()
         self.status = status
+        self.headerlist = []
 
     def __str__(self):
         """Return the string representation of the HTTP error."""
         return 'Error %s' % str(self.status)
 
+class HTTPBadRequest(HTTPError):
+    """HTTP 400 response."""
+
+    def __init__(self):
+        """Set a 'Bad Request' HTTP error."""
+        super(HTTPBadRequest, self).__init__(400)
+
 class HTTPNotFound(HTTPError):
     """HTTP 404 response."""
 
@@ -343,9 +974,18 @@ class HTTPNotFound(HTTPError):
 class HTTPMethodNotAllowed(HTTPError):
     """HTTP 405 response."""
 
-    def __init__(self):
-        """Set a 'Method Not Allowed' HTTP error."""
+    def __init__(self, allow=None):
+        """Set a 'Method Not Allowed' HTTP error, listing the allowed HTTP methods in the 'Allow' header if given."""
         super(HTTPMethodNotAllowed, self).__init__(405)
+        if allow is not None:
+            self.headerlist.append(('Allow', allow))
+
+class HTTPRequestEntityTooLarge(HTTPError):
+    """HTTP 413 response."""
+
+    def __init__(self):
+        """Set a 'Request Entity Too Large' HTTP error."""
+        super(HTTPRequestEntityTooLarge, self).__init__(413)
 
 class HTTPInternalServerError(HTTPError):
     """HTTP 500 response."""
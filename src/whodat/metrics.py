@@ -0,0 +1,212 @@
+import json
+import os
+import threading
+import time
+
+from bisect import bisect_left
+from whodat.extension import *
+from whodat.handler import *
+from whodat.http import *
+
+# upper bounds in seconds of the buckets of the latency histograms
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+# positions in the row of counters of a route: requests in flight, requests, sum of latencies, requests by status class
+# from 1xx to 5xx, then requests by latency bucket
+_IN_FLIGHT, _COUNT, _SUM, _STATUS, _BUCKETS = 0, 1, 2, 3, 8
+
+_STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+
+def _label(value):
+    """Return a string escaped as the value of a Prometheus label."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _add_rows(totals, rows):
+    """Add the rows of counters of a dict, by route, to the rows of another."""
+    for route, row in rows.items():
+        total = totals.get(route)
+        if total is None:
+            totals[route] = list(row)
+        else:
+            for i, value in enumerate(row):
+                total[i] += value
+
+class MetricsExtension(Extension):
+    """Count the requests of each Handler by status class, the requests in flight and their latencies, and serve them
+    in the Prometheus text format.
+
+    Each thread updates its own counters, without locks, and they are summed when the metrics are served. The latency
+    of a request is measured from its process_request to its process_response, so it does not include sending a
+    streamed body. The extension should come first in the list of extensions, since requests answered by the
+    process_request of an earlier extension are not counted.
+
+    With a directory, each process writes its counters to a file there every flush_interval seconds, and the metrics
+    served by any process are the sum of every file, so the workers of a PreforkServer report the same totals. The
+    directory should be emptied before the server starts.
+    """
+
+    def __init__(self, path='/metrics', buckets=DEFAULT_BUCKETS, directory=None, flush_interval=1):
+        """Set the options of the metrics.
+
+        path -- string that specifies the URL pattern where the metrics are served. '/metrics' by default.
+        buckets -- sequence of numbers that specifies the upper bounds in seconds of the buckets of the latency
+                   histograms. DEFAULT_BUCKETS by default.
+        directory -- string that specifies the directory where the counters of each process are shared. None serves
+                     only the counters of the current process. None by default.
+        flush_interval -- number that specifies how often in seconds each process writes its counters to the
+                          directory. 1 by default.
+        """
+        self.path = path
+        self._buckets = tuple(sorted(buckets))
+        self._row_size = _BUCKETS + len(self._buckets) + 1
+        self._directory = directory
+        self._flush_interval = flush_interval
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """Forget the counters of every thread, as in a new process."""
+        self._local = threading.local()
+        self._tables = []
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def __call__(self, app):
+        """Add the Handler that serves the metrics to the app."""
+        extension = self
+
+        @url(self.path)
+        class MetricsHandler:
+            def get(self, request):
+                return HTTPResponse(extension.render(), content_type=CONTENT_TYPE, charset='utf-8')
+
+        app.add_handler(MetricsHandler)
+
+    def _table(self):
+        """Return the dict of rows of counters, by route, of the current thread."""
+        try:
+            return self._local.table
+        except AttributeError:
+            table = self._local.table = {}
+            with self._lock:
+                self._tables.append(table)
+                if self._directory is not None and self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_forever, name='whodat-metrics', daemon=True)
+                    self._flusher.start()
+            return table
+
+    def process_request(self, request):
+        """Count the request as in flight and record when it started."""
+        table = self._table()
+        row = table.get(request.handler._url_pattern)
+        if row is None:
+            row = table[request.handler._url_pattern] = [0] * self._row_size
+        row[_IN_FLIGHT] += 1
+        request.metrics = (row, time.perf_counter())
+
+    def _observe(self, request, status):
+        """Count a finished request with its status code and latency."""
+        row, start = request.metrics
+        request.metrics = None
+        latency = time.perf_counter() - start
+        row[_IN_FLIGHT] -= 1
+        row[_COUNT] += 1
+        row[_SUM] += latency
+        row[_STATUS + min(max(status // 100, 1), 5) - 1] += 1
+        row[_BUCKETS + bisect_left(self._buckets, latency)] += 1
+
+    def process_response(self, request, response):
+        """Count the request with the status of the response."""
+        if getattr(request, 'metrics', None) is not None:
+            self._observe(request, int(response.status[:3]))
+
+    def process_exception(self, request, exception):
+        """Count the request with the status of the error response."""
+        if getattr(request, 'metrics', None) is not None:
+            self._observe(request, exception.status if isinstance(exception, HTTPError) else 500)
+
+    def snapshot(self):
+        """Return a dict of the rows of counters of the current process, by route."""
+        totals = {}
+        for table in list(self._tables):
+            _add_rows(totals, dict(table))
+        return totals
+
+    def _filename(self, pid):
+        """Return the path of the file with the counters of a process."""
+        return os.path.join(self._directory, 'whodat-metrics-%d.json' % pid)
+
+    def flush(self):
+        """Write the counters of the current process to its file in the directory."""
+        filename = self._filename(os.getpid())
+        with open(filename + '.tmp', 'w') as counters_file:
+            json.dump(self.snapshot(), counters_file)
+        os.replace(filename + '.tmp', filename)
+
+    def _flush_forever(self):
+        """Write the counters of the current process to the directory every flush_interval seconds."""
+        while True:
+            time.sleep(self._flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def collect(self):
+        """Return a dict of the rows of counters, by route, summed over every process sharing the directory.
+
+        The requests in flight of processes that no longer exist are not counted.
+        """
+        if self._directory is None:
+            return self.snapshot()
+        self.flush()
+        totals = {}
+        for name in os.listdir(self._directory):
+            if not name.startswith('whodat-metrics-') or not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self._directory, name)) as counters_file:
+                    rows = json.load(counters_file)
+                pid = int(name[15:-5])
+            except (OSError, ValueError):
+                continue
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                for row in rows.values():
+                    row[_IN_FLIGHT] = 0
+            except PermissionError:
+                pass
+            _add_rows(totals, rows)
+        return totals
+
+    def render(self):
+        """Return the metrics in the Prometheus text format."""
+        rows = self.collect()
+        routes = sorted(rows)
+        lines = ['# HELP whodat_requests_total Requests handled, by route and status class.',
+                 '# TYPE whodat_requests_total counter']
+        for route in routes:
+            for i, status_class in enumerate(_STATUS_CLASSES):
+                if rows[route][_STATUS + i]:
+                    lines.append('whodat_requests_total{route="%s",status="%s"} %d' %
+                                 (_label(route), status_class, rows[route][_STATUS + i]))
+        lines += ['# HELP whodat_requests_in_flight Requests being handled, by route.',
+                  '# TYPE whodat_requests_in_flight gauge']
+        for route in routes:
+            lines.append('whodat_requests_in_flight{route="%s"} %d' % (_label(route), rows[route][_IN_FLIGHT]))
+        lines += ['# HELP whodat_request_duration_seconds Latency of the requests, by route.',
+                  '# TYPE whodat_request_duration_seconds histogram']
+        for route in routes:
+            row = rows[route]
+            cumulative = 0
+            for bound, count in zip(self._buckets + ('+Inf',), row[_BUCKETS:]):
+                cumulative += count
+                lines.append('whodat_request_duration_seconds_bucket{route="%s",le="%s"} %d' %
+                             (_label(route), bound, cumulative))
+            lines.append('whodat_request_duration_seconds_sum{route="%s"} %r' % (_label(route), float(row[_SUM])))
+            lines.append('whodat_request_duration_seconds_count{route="%s"} %d' % (_label(route), row[_COUNT]))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,116 @@
+import tempfile
+
+from whodat.http import *
+from whodat.http import _parse_header
+
+class MultipartPart:
+    """Part of a multipart/form-data body."""
+
+    def __init__(self, headers, file, size):
+        """Set the headers, the file holding the content and the size of the part."""
+        disposition, params = _parse_header(headers.get('Content-Disposition', ''))
+        self.headers = headers
+        self.name = params.get('name')
+        self.filename = params.get('filename')
+        self.content_type = headers.get('Content-Type', 'text/plain')
+        self.file = file
+        self.size = size
+
+    @property
+    def value(self):
+        """Return the content of the part."""
+        self.file.seek(0)
+        value = self.file.read()
+        self.file.seek(0)
+        return value
+
+class MultipartParser:
+    """Incremental parser of multipart/form-data bodies.
+
+    The body is read in chunks and each part is written to a SpooledTemporaryFile, so parts larger than the spool size
+    are kept on disk instead of memory.
+    """
+
+    def __init__(self, stream, boundary, spool_size=1024 * 1024, max_part_size=None, max_header_size=16384,
+                 chunk_size=65536):
+        """Set the attributes of the parser.
+
+        stream -- file-like object that specifies the body.
+        boundary -- string that specifies the multipart boundary.
+        spool_size -- integer that specifies the size in bytes above which a part is written to a temporary file. 1 MiB
+                      by default.
+        max_part_size -- integer that specifies the maximum size in bytes of a part. If a part is larger, an
+                         HTTPRequestEntityTooLarge exception is raised. None does not limit the part size. None by
+                         default.
+        max_header_size -- integer that specifies the maximum size in bytes of the headers of a part. If they are
+                           larger, an HTTPBadRequest exception is raised. 16384 by default.
+        chunk_size -- integer that specifies how many bytes are read from the stream at once. 65536 by default.
+        """
+        self._stream = stream
+        self._boundary = b'--' + boundary.encode('latin-1')
+        self._spool_size = spool_size
+        self._max_part_size = max_part_size
+        self._max_header_size = max_header_size
+        self._chunk_size = chunk_size
+
+    def _read(self, buffer):
+        """Return the buffer with the next chunk of the stream appended, or raise an HTTPBadRequest exception."""
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            raise HTTPBadRequest()
+        return buffer + chunk
+
+    def _scan(self, buffer, marker, write):
+        """Pass everything before the marker to write and return what follows the marker."""
+        while True:
+            index = buffer.find(marker)
+            if index >= 0:
+                write(buffer[:index])
+                return buffer[index + len(marker):]
+            keep = len(marker) - 1
+            if len(buffer) > keep:
+                write(buffer[:-keep])
+                buffer = buffer[-keep:]
+            buffer = self._read(buffer)
+
+    def _parse_headers(self, data):
+        """Return a dict of the headers of a part."""
+        headers = {}
+        for line in data.decode('utf-8', 'replace').split('\r\n'):
+            name, separator, value = line.partition(':')
+            if separator:
+                headers[name.strip().title()] = value.strip()
+        return headers
+
+    def __iter__(self):
+        """Return an iterator over the MultipartParts of the body."""
+        delimiter = b'\r\n' + self._boundary
+        buffer = self._scan(b'\r\n', delimiter, lambda data: None)
+        while True:
+            while len(buffer) < 2:
+                buffer = self._read(buffer)
+            if buffer[:2] == b'--':
+                return
+            if buffer[:2] != b'\r\n':
+                raise HTTPBadRequest()
+            header_data = bytearray()
+
+            def write_headers(data):
+                header_data.extend(data)
+                if len(header_data) > self._max_header_size:
+                    raise HTTPBadRequest()
+
+            buffer = self._scan(buffer, b'\r\n\r\n', write_headers)
+            headers = self._parse_headers(bytes(header_data[2:]))
+            part_file = tempfile.SpooledTemporaryFile(max_size=self._spool_size)
+            part_size = [0]
+
+            def write_data(data):
+                part_size[0] += len(data)
+                if self._max_part_size is not None and part_size[0] > self._max_part_size:
+                    raise HTTPRequestEntityTooLarge()
+                part_file.write(data)
+
+            buffer = self._scan(buffer, delimiter, write_data)
+            part_file.seek(0)
+            yield MultipartPart(headers, part_file, part_size[0])
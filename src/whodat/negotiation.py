@@ -0,0 +1,93 @@
+from functools import lru_cache
+
+# number of distinct header values whose parsed form and best matches are cached
+CACHE_SIZE = 512
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_accept(value):
+    """Return a tuple of (value, quality) tuples from an 'Accept*' header, in the order they appear."""
+    parsed = []
+    for item in value.split(','):
+        item, _, params = item.strip().partition(';')
+        if not item:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, param_value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        parsed.append((item.strip(), quality))
+    return tuple(parsed)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def accept_values(value, implicit=None):
+    """Return a tuple of the values accepted by an 'Accept*' header, sorted by quality.
+
+    value -- string that specifies the header. None returns an empty tuple.
+    implicit -- string that specifies a value accepted with quality 1 if neither it nor '*' appear in the header. None
+                by default.
+    """
+    if value is None:
+        return ()
+    parsed = list(parse_accept(value))
+    if implicit is not None and not any(item.lower() in (implicit, '*') for item, quality in parsed):
+        parsed.append((implicit, 1.0))
+    return tuple(item for item, quality in sorted(parsed, key=lambda item: item[1], reverse=True) if quality > 0)
+
+def _specificity(kind, offer, value):
+    """Return how specifically a value of an 'Accept*' header matches an offer, or -1 if it does not match."""
+    offer = offer.lower()
+    value = value.lower()
+    if kind == 'accept':
+        if value == '*/*':
+            return 0
+        offer_type = offer.split(';')[0].strip()
+        if value.endswith('/*'):
+            return 1 if offer_type.split('/')[0] == value[:-2] else -1
+        return 2 if offer_type == value else -1
+    if value == '*':
+        return 0
+    if offer == value:
+        return len(value) + 1
+    if kind == 'language' and offer.startswith(value + '-'):
+        return len(value)
+    return -1
+
+def _quality(kind, offer, parsed):
+    """Return the quality of an offer for the parsed values of an 'Accept*' header."""
+    specificity, quality = max(((_specificity(kind, offer, value), quality) for value, quality in parsed),
+                               key=lambda item: item[0], default=(-1, 0.0))
+    if specificity < 0:
+        return 1.0 if kind == 'encoding' and offer.lower() == 'identity' else 0.0
+    return quality
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _best_match(value, offers, kind):
+    """Return the offer with the highest quality for an 'Accept*' header, or None."""
+    parsed = parse_accept(value)
+    best_offer, best_quality = None, 0.0
+    for offer in offers:
+        quality = _quality(kind, offer, parsed)
+        if quality > best_quality:
+            best_offer, best_quality = offer, quality
+    return best_offer
+
+def best_match(value, offers, kind='accept', default=None):
+    """Return the offer that best matches an 'Accept*' header.
+
+    Offers with the same quality are preferred in the order they are given. Results are cached for each distinct header
+    value and offers.
+
+    value -- string that specifies the header. None accepts the first offer.
+    offers -- sequence of strings that specifies the available media types, charsets, encodings or languages.
+    kind -- string that specifies the header: 'accept', 'charset', 'encoding' or 'language'. 'accept' by default.
+    default -- value returned if no offer is acceptable. None by default.
+    """
+    offers = tuple(offers)
+    if value is None:
+        return offers[0] if offers else default
+    match = _best_match(value, offers, kind)
+    return default if match is None else match
@@ -0,0 +1,206 @@
+import cProfile
+import hmac
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+
+from collections import defaultdict
+from whodat.extension import *
+from whodat.handler import *
+from whodat.http import *
+
+def _frame_name(function):
+    """Return the name of a function of a pstats table, as shown in a collapsed stack."""
+    filename, lineno, name = function
+    if filename == '~':
+        return name
+    return '%s (%s:%d)' % (name, os.path.basename(filename), lineno)
+
+def collapsed_stacks(stats, prefix='', max_depth=64):
+    """Return a dict of the microseconds spent in each stack of a pstats.Stats, by stack in the collapsed format read
+    by flamegraph.pl, with frames separated by semicolons.
+
+    cProfile records only the callers of each function, not whole stacks, so the time of a function called from
+    several places is split between its stacks in proportion to the time spent in it from each caller.
+    """
+    table = stats.stats
+    children = defaultdict(list)
+    for function, (cc, nc, tt, ct, callers) in table.items():
+        for caller in callers:
+            if caller in table:
+                children[caller].append(function)
+    stacks = defaultdict(float)
+
+    def visit(function, stack, path, fraction):
+        stacks[stack] += table[function][2] * fraction * 1000000
+        if len(path) >= max_depth:
+            return
+        for child in children[function]:
+            child_ct = table[child][3]
+            if child in path or not child_ct:
+                continue
+            edge_ct = table[child][4][function][3]
+            visit(child, stack + ';' + _frame_name(child), path | {child}, fraction * edge_ct / child_ct)
+
+    for function, (cc, nc, tt, ct, callers) in table.items():
+        if not any(caller in table for caller in callers):
+            name = _frame_name(function)
+            visit(function, prefix + ';' + name if prefix else name, {function}, 1.0)
+    return {stack: int(round(time)) for stack, time in stacks.items() if round(time) > 0}
+
+class ProfilerExtension(Extension):
+    """Profile a sample of the requests with cProfile and aggregate the statistics by route.
+
+    A request is profiled with probability sample_rate, or when its trigger header carries the secret. The profiler
+    runs from the process_request to the process_response of the extension, in the thread that calls them, so with
+    ASGIApplication the synchronous Handler methods, which run in other threads, are not profiled. When neither
+    sampling nor the header is enabled, process_request costs a single branch.
+
+    With a path and a secret, the statistics are also served at the path to requests that carry the secret in the
+    trigger header: the 'route' query parameter selects a route, and the 'format' parameter selects 'collapsed'
+    stacks for flame graphs, 'pstats' data for pstats.Stats, or 'text' by default.
+    """
+
+    def __init__(self, sample_rate=0, header='X-Whodat-Profile', secret=None, path=None):
+        """Set the options of the profiler.
+
+        sample_rate -- number between 0 and 1 that specifies the fraction of the requests that are profiled. 0 by
+                       default.
+        header -- string that specifies the request header that triggers profiling when its value is the secret.
+                  'X-Whodat-Profile' by default.
+        secret -- string that specifies the value of the trigger header. None disables the header. None by default.
+        path -- string that specifies the URL pattern where the statistics are served. None does not serve them. None
+                by default.
+        """
+        self._sample_rate = sample_rate
+        self._environ_key = 'HTTP_' + header.upper().replace('-', '_')
+        self._secret = secret
+        self._secret_bytes = secret.encode('latin-1') if secret is not None else None
+        self._path = path
+        self._enabled = bool(sample_rate or secret)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def set_sample_rate(self, sample_rate):
+        """Set the fraction of the requests that are profiled, such as 0 to stop sampling."""
+        self._sample_rate = sample_rate
+        self._enabled = bool(sample_rate or self._secret)
+
+    def __call__(self, app):
+        """Add the Handler that serves the statistics to the app, if a path and a secret are set."""
+        if self._path is None or self._secret is None:
+            return
+        extension = self
+
+        @url(self._path)
+        class ProfileHandler:
+            def get(self, request):
+                if not extension._triggered(request):
+                    raise HTTPNotFound()
+                return extension._stats_response(request.GET.get('route'), request.GET.get('format', 'text'))
+
+        app.add_handler(ProfileHandler)
+
+    def _triggered(self, request):
+        """Return wheter the request carries the secret in the trigger header."""
+        value = request.environ.get(self._environ_key)
+        if value is None or self._secret_bytes is None:
+            return False
+        return hmac.compare_digest(value.encode('latin-1', 'replace'), self._secret_bytes)
+
+    def process_request(self, request):
+        """Start profiling the request if it is sampled or triggered."""
+        if not self._enabled:
+            return None
+        if (self._sample_rate and random.random() < self._sample_rate) or self._triggered(request):
+            if request.handler._url_pattern != self._path:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Since Python 3.12 only one profiler can be active at once, so concurrent requests are skipped.
+                    return None
+                request.profile = profile
+        return None
+
+    def _finish(self, request):
+        """Stop profiling a request and add its statistics to those of its route."""
+        profile = request.profile
+        request.profile = None
+        profile.disable()
+        route = request.handler._url_pattern
+        with self._lock:
+            if route in self._stats:
+                self._stats[route].add(profile)
+            else:
+                self._stats[route] = pstats.Stats(profile)
+
+    def process_response(self, request, response):
+        """Stop profiling the request, if it is profiled."""
+        if getattr(request, 'profile', None) is not None:
+            self._finish(request)
+
+    def process_exception(self, request, exception):
+        """Stop profiling the request, if it is profiled."""
+        if getattr(request, 'profile', None) is not None:
+            self._finish(request)
+
+    def routes_profiled(self):
+        """Return the sorted list of the routes with statistics."""
+        with self._lock:
+            return sorted(self._stats)
+
+    def stats(self, route=None):
+        """Return a pstats.Stats with the statistics of a route, or of every route if it is None, or None if there are
+        no statistics."""
+        with self._lock:
+            tables = [stats for key, stats in self._stats.items() if route is None or key == route]
+            if not tables:
+                return None
+            stats = pstats.Stats()
+            stats.add(*tables)
+            return stats
+
+    def dump_stats(self, filename, route=None):
+        """Write the statistics of a route, or of every route if it is None, to a file that pstats.Stats can read."""
+        stats = self.stats(route)
+        if stats is not None:
+            stats.dump_stats(filename)
+
+    def collapsed(self, route=None):
+        """Return the collapsed stacks of a route, or of every route under a frame named after each route if it is
+        None, as lines of text for flamegraph.pl."""
+        with self._lock:
+            routes = [key for key in self._stats if route is None or key == route]
+        lines = []
+        for key in sorted(routes):
+            stacks = collapsed_stacks(self.stats(key), key if route is None else '')
+            lines += ['%s %d' % (stack, time) for stack, time in sorted(stacks.items())]
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def reset(self, route=None):
+        """Forget the statistics of a route, or of every route if it is None."""
+        with self._lock:
+            if route is None:
+                self._stats.clear()
+            else:
+                self._stats.pop(route, None)
+
+    def _stats_response(self, route, output_format):
+        """Return the HTTPResponse with the statistics of a route in a format."""
+        if output_format == 'collapsed':
+            return HTTPResponse(self.collapsed(route), content_type='text/plain')
+        stats = self.stats(route)
+        if output_format == 'pstats':
+            return HTTPResponse(marshal.dumps(stats.stats if stats else {}), content_type='application/octet-stream')
+        if output_format != 'text':
+            raise HTTPBadRequest()
+        if stats is None:
+            return HTTPResponse('', content_type='text/plain')
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats('cumulative').print_stats(50)
+        return HTTPResponse(stream.getvalue(), content_type='text/plain')
@@ -0,0 +1,207 @@
+import re
+import threading
+
+from collections import OrderedDict
+from whodat.handler import *
+
+REDIRECT = 'redirect'
+
+class RouteNode:
+    """Node of the segment trie used by Router."""
+
+    def __init__(self):
+        """Set an empty node."""
+        self.literals = {}
+        self.dynamics = []
+        self.route = None
+        self.min_order = None
+
+    def insert(self, segments, order, handler):
+        """Insert a Handler below this node, given the segments of its URL pattern and the order it was added in."""
+        node = self
+        for segment in segments:
+            node.min_order = order if node.min_order is None else min(node.min_order, order)
+            segment_regex = url_regex(segment)
+            if segment_regex == re.escape(segment):
+                node = node.literals.setdefault(segment, RouteNode())
+            else:
+                for regex, child in node.dynamics:
+                    if regex.pattern == r'%s\Z' % segment_regex:
+                        node = child
+                        break
+                else:
+                    child = RouteNode()
+                    node.dynamics.append((re.compile(r'%s\Z' % segment_regex), child))
+                    node = child
+        node.min_order = order if node.min_order is None else min(node.min_order, order)
+        if node.route is None:
+            node.route = (order, handler)
+
+    def search(self, segments, index=0):
+        """Return an (order, handler, args) tuple for the first added Handler below this node that matches the
+        segments, or None."""
+        if index == len(segments):
+            return self.route and (self.route[0], self.route[1], ())
+        segment = segments[index]
+        best = None
+        child = self.literals.get(segment)
+        if child is not None:
+            best = child.search(segments, index + 1)
+        for regex, child in self.dynamics:
+            if best is not None and child.min_order >= best[0]:
+                continue
+            match = regex.match(segment)
+            if match is not None:
+                found = child.search(segments, index + 1)
+                if found is not None and (best is None or found[0] < best[0]):
+                    best = (found[0], found[1], match.groups() + found[2])
+        return best
+
+class Router:
+    """Resolve request paths to Handlers.
+
+    Literal URL patterns are resolved with a dict lookup and URL patterns with placeholders are resolved with a trie of
+    path segments. URL patterns with placeholders that may match a slash are tried one by one after the trie. The tables
+    are compiled lazily, the first time a path is resolved after a Handler is added, and give the same results as trying
+    each Handler's regex in the order the Handlers were added. Paths that only match once a slash is appended are
+    indexed at the same time, so they are found without another pass over the Handlers.
+
+    Arguments captured by typed placeholders are converted before they are returned, and a path whose arguments fail to
+    convert does not match.
+    """
+
+    def __init__(self):
+        """Set an empty routing table."""
+        self._handlers = {}
+        self._literals = None
+        self._redirects = None
+        self._trie = None
+        self._fallback = None
+        self._lock = threading.Lock()
+
+    def add(self, handler):
+        """Add a Handler, replacing any Handler previously added with the same URL pattern."""
+        with self._lock:
+            self._handlers[handler._url_pattern] = handler
+            self._literals = None
+
+    def scan(self, path):
+        """Return a (handler, args) tuple for the first Handler whose regex matches the path, or None."""
+        for handler in self._handlers.values():
+            match = handler._url_regex.match(path)
+            if match is not None:
+                return handler, match.groups()
+        return None
+
+    def compile(self):
+        """Build the literal lookup table and the segment trie from the added Handlers."""
+        with self._lock:
+            literals = {}
+            redirects = set()
+            trie = RouteNode()
+            fallback = []
+            orders = {}
+            for order, handler in enumerate(self._handlers.values()):
+                orders[handler] = order
+                if not all(converter.segment for converter in handler._url_converters):
+                    fallback.append((order, handler))
+                elif handler._url_regex.groups:
+                    trie.insert(handler._url_pattern.split('/'), order, handler)
+            for handler in self._handlers.values():
+                if not handler._url_regex.groups and handler._url_pattern not in literals:
+                    first_handler, args = self.scan(handler._url_pattern)
+                    literals[handler._url_pattern] = (orders[first_handler], first_handler, args)
+                    if handler._url_pattern.endswith('/'):
+                        redirects.add(handler._url_pattern[:-1])
+            self._trie = trie
+            self._fallback = fallback
+            self._redirects = redirects
+            self._literals = literals
+
+    def _search(self, path, segments):
+        """Return an (order, handler, args) tuple for the first added Handler with placeholders that matches the path,
+        or None."""
+        route = self._trie.search(segments)
+        for order, handler in self._fallback:
+            if route is not None and order >= route[0]:
+                break
+            match = handler._url_regex.match(path)
+            if match is not None:
+                return order, handler, match.groups()
+        return route
+
+    def _resolve(self, path):
+        """Return an (order, handler, args) tuple for the Handler that matches the whole path, or None."""
+        try:
+            return self._literals[path]
+        except KeyError:
+            return self._search(path, path.split('/'))
+
+    def match(self, path):
+        """Return a (handler, args) tuple for the Handler that matches the path, or None."""
+        if self._literals is None:
+            self.compile()
+        route = self._resolve(path)
+        if path.endswith('\n'):
+            # '$' also matches before a trailing newline.
+            stripped_route = self._resolve(path[:-1])
+            if stripped_route is not None and (route is None or stripped_route[0] < route[0]):
+                route = stripped_route
+        if route is None:
+            return None
+        try:
+            return route[1], route[1].convert_args(route[2])
+        except ValueError:
+            return None
+
+    def resolve(self, path):
+        """Return a (handler, args) tuple for the Handler that matches the path, REDIRECT if a Handler matches the path
+        with a slash appended, or None."""
+        route = self.match(path)
+        if route is not None:
+            return route
+        if path in self._redirects or self._search(path + '/', path.split('/') + ['']) is not None:
+            return REDIRECT
+        return None
+
+class RouteCache:
+    """Bounded LRU cache of Router.resolve results keyed by path."""
+
+    def __init__(self, router, max_size):
+        """Set the Router whose results are cached and the maximum number of cached paths."""
+        self._router = router
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, path):
+        """Return the cached result of Router.resolve for the path, resolving and caching it on a miss."""
+        with self._lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return self._entries[path]
+            self.misses += 1
+            generation = self._generation
+        result = self._router.resolve(path)
+        with self._lock:
+            # Results computed before a clear may come from a stale routing table.
+            if generation == self._generation:
+                self._entries[path] = result
+                if len(self._entries) > self._max_size:
+                    self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Remove every cached result."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def info(self):
+        """Return a dict with the hits, misses, current size and maximum size of the cache."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries), 'max_size': self._max_size}
@@ -0,0 +1,888 @@
+import asyncio
+import inspect
+import io
+import os
+import selectors
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.client import responses
+from urllib.parse import unquote_to_bytes
+from whodat.http import *
+
+# value of the 'Server' response header
+SERVER_NAME = 'whodat'
+
+_date_cache = [0, '']
+
+def _http_date():
+    """Return the value of the 'Date' header for the current second."""
+    now = int(time.time())
+    if _date_cache[0] != now:
+        _date_cache[:] = [now, formatdate(now, usegmt=True)]
+    return _date_cache[1]
+
+def error_response(status):
+    """Return the bytes of a minimal response for an HTTP error that closes the connection."""
+    body = ('Error %d' % status).encode('latin-1')
+    return ('HTTP/1.1 %d %s\r\nContent-Type: text/plain\r\nContent-Length: %d\r\nConnection: close\r\n\r\n' %
+            (status, responses.get(status, ''), len(body))).encode('latin-1') + body
+
+def parse_request_head(data):
+    """Return the method, target, version and list of (name, value) headers of a request head, or raise an
+    HTTPError, such as for a repeated 'Content-Length' header."""
+    lines = data.decode('latin-1').split('\r\n')
+    parts = lines[0].split(' ')
+    if len(parts) != 3 or not parts[0].isalpha() or not parts[1]:
+        raise HTTPBadRequest()
+    method, target, version = parts
+    if version not in ('HTTP/1.0', 'HTTP/1.1'):
+        raise HTTPError(505)
+    headers = []
+    content_lengths = 0
+    for line in lines[1:]:
+        name, separator, value = line.partition(':')
+        if not separator or not name or name != name.strip():
+            raise HTTPBadRequest()
+        if name.lower() == 'content-length':
+            content_lengths += 1
+            if content_lengths > 1 or ',' in value:
+                raise HTTPBadRequest()
+        headers.append((name, value.strip()))
+    return method, target, version, headers
+
+def header_value(headers, name):
+    """Return the value of a header from a list of (name, value) headers, or None."""
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+def keep_alive(version, headers):
+    """Return wheter the client of a request wants to keep the connection open."""
+    connection = (header_value(headers, 'Connection') or '').lower()
+    if version == 'HTTP/1.1':
+        return 'close' not in connection
+    return 'keep-alive' in connection
+
+def request_environ(method, target, version, headers, server, client, body, multiprocess=False):
+    """Return the WSGI environment of a request. Headers whose names contain underscores are dropped, like wsgiref
+    does, since they would be indistinguishable from their dashed forms.
+
+    server -- (host, port) tuple that specifies the address of the server.
+    client -- (host, port) tuple that specifies the address of the client.
+    body -- file-like object that specifies the request body.
+    """
+    if target.startswith(('http://', 'https://')):
+        target = '/' + target.split('/', 3)[3] if target.count('/') >= 3 else '/'
+    path, _, query_string = target.partition('?')
+    environ = {
+        'REQUEST_METHOD': method,
+        'SCRIPT_NAME': '',
+        'PATH_INFO': unquote_to_bytes(path).decode('latin-1'),
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': version,
+        'REMOTE_ADDR': str(client[0]),
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': multiprocess,
+        'wsgi.run_once': False,
+        'wsgi.file_wrapper': FileWrapper,
+    }
+    for name, value in headers:
+        if '_' in name:
+            continue
+        key = name.upper().replace('-', '_')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+class FileWrapper:
+    """wsgi.file_wrapper that lets the server send the file with sendfile."""
+
+    def __init__(self, file, chunk_size=65536):
+        """Set the file and the size of the chunks read when sendfile is not used."""
+        self.file = file
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        """Return an iterator over the chunks of the file."""
+        return iter(lambda: self.file.read(self.chunk_size), b'')
+
+    def close(self):
+        """Close the file."""
+        self.file.close()
+
+class ResponseFramer:
+    """Serialize the status line, headers and body of a response, choosing how its body is delimited.
+
+    A body without a 'Content-Length' header is sent with the chunked transfer coding to HTTP/1.1 clients, and by
+    closing the connection to HTTP/1.0 clients.
+    """
+
+    def __init__(self, method, version, keep_alive):
+        """Set the method and HTTP version of the request and wheter the connection may be kept open."""
+        self.method = method
+        self.version = version
+        self.keep_alive = keep_alive
+        self.chunked = False
+        self.body_allowed = True
+
+    def head(self, status, headerlist):
+        """Return the bytes of the status line and headers."""
+        code = int(status[:3])
+        self.body_allowed = self.method != 'HEAD' and code >= 200 and code not in (204, 304)
+        headerlist = [(name, value) for name, value in headerlist
+                      if name.lower() not in ('connection', 'keep-alive', 'transfer-encoding')]
+        if header_value(headerlist, 'Content-Length') is None and self.body_allowed and code >= 200:
+            if self.version == 'HTTP/1.1':
+                self.chunked = True
+                headerlist.append(('Transfer-Encoding', 'chunked'))
+            else:
+                self.keep_alive = False
+        if not self.keep_alive:
+            headerlist.append(('Connection', 'close'))
+        elif self.version == 'HTTP/1.0':
+            headerlist.append(('Connection', 'keep-alive'))
+        headerlist.append(('Date', _http_date()))
+        headerlist.append(('Server', SERVER_NAME))
+        lines = ['HTTP/1.1 %s\r\n' % status] + ['%s: %s\r\n' % header for header in headerlist] + ['\r\n']
+        return ''.join(lines).encode('latin-1')
+
+    def body(self, data):
+        """Return the bytes that send a chunk of the body."""
+        if not data or not self.body_allowed:
+            return b''
+        if self.chunked:
+            return b'%x\r\n%s\r\n' % (len(data), data)
+        return data
+
+    def end(self):
+        """Return the bytes that end the body."""
+        return b'0\r\n\r\n' if self.chunked and self.body_allowed else b''
+
+class Connection:
+    """Client connection of a blocking server, with the bytes received but not parsed yet."""
+
+    def __init__(self, sock, client):
+        """Set the socket and the address of the client."""
+        self.sock = sock
+        self.client = client
+        self.buffer = bytearray()
+        self.last_active = time.monotonic()
+
+    def fill(self):
+        """Receive more bytes into the buffer and return wheter the client has not closed the connection."""
+        chunk = self.sock.recv(65536)
+        self.buffer += chunk
+        return bool(chunk)
+
+    def read_head(self, max_header_size):
+        """Return the head of the next request, None if the connection was closed before it, or raise an
+        HTTPError."""
+        while True:
+            while self.buffer[:2] == b'\r\n':
+                del self.buffer[:2]
+            index = self.buffer.find(b'\r\n\r\n')
+            if index >= 0:
+                if index > max_header_size:
+                    raise HTTPError(431)
+                head = bytes(self.buffer[:index])
+                del self.buffer[:index + 4]
+                return head
+            if len(self.buffer) > max_header_size:
+                raise HTTPError(431)
+            if not self.fill():
+                if self.buffer:
+                    raise HTTPBadRequest()
+                return None
+
+    def read(self, size):
+        """Return up to size bytes, fewer only if the connection was closed."""
+        while len(self.buffer) < size and self.fill():
+            pass
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def read_line(self, max_size):
+        """Return the next line, including its line break, or raise an HTTPBadRequest exception."""
+        while True:
+            index = self.buffer.find(b'\n')
+            if index >= 0:
+                line = bytes(self.buffer[:index + 1])
+                del self.buffer[:index + 1]
+                return line
+            if len(self.buffer) > max_size or not self.fill():
+                raise HTTPBadRequest()
+
+    def send(self, data):
+        """Send bytes to the client."""
+        if data:
+            self.sock.sendall(data)
+
+class RequestBody:
+    """File-like object that reads a request body of known length from a Connection, as it is consumed."""
+
+    def __init__(self, connection, length):
+        """Set the connection and the length of the body."""
+        self._connection = connection
+        self._remaining = length
+
+    def read(self, size=-1):
+        """Return up to size bytes of the body, or the rest of it."""
+        size = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        data = self._connection.read(size) if size else b''
+        self._remaining -= len(data)
+        if len(data) < size:
+            self._remaining = 0
+        return data
+
+    def readline(self, size=-1):
+        """Return the next line of the body."""
+        limit = self._remaining if size is None or size < 0 else min(size, self._remaining)
+        buffer = self._connection.buffer
+        while b'\n' not in buffer[:limit] and len(buffer) < limit and self._connection.fill():
+            pass
+        index = buffer.find(b'\n', 0, limit)
+        return self.read(limit if index < 0 else index + 1)
+
+    def readlines(self, hint=-1):
+        """Return the list of the remaining lines of the body."""
+        return list(self)
+
+    def __iter__(self):
+        """Return an iterator over the lines of the body."""
+        return iter(self.readline, b'')
+
+    def drain(self, max_size):
+        """Discard the unread body if it is at most max_size bytes and return wheter it was discarded."""
+        if self._remaining > max_size:
+            return False
+        while self._remaining:
+            if not self.read(65536):
+                return False
+        return True
+
+def read_chunked_body(connection, max_body_size, spool_size=1024 * 1024):
+    """Return a file-like object with a body sent with the chunked transfer coding, and its size."""
+    body = tempfile.SpooledTemporaryFile(max_size=spool_size)
+    size = 0
+    while True:
+        line = connection.read_line(1024)
+        try:
+            chunk_size = int(line.split(b';')[0].strip(), 16)
+        except ValueError:
+            raise HTTPBadRequest()
+        if chunk_size == 0:
+            break
+        size += chunk_size
+        if max_body_size is not None and size > max_body_size:
+            raise HTTPRequestEntityTooLarge()
+        chunk = connection.read(chunk_size)
+        if len(chunk) < chunk_size or connection.read(2) != b'\r\n':
+            raise HTTPBadRequest()
+        body.write(chunk)
+    while connection.read_line(8192) not in (b'\r\n', b'\n'):
+        pass
+    body.seek(0)
+    return body, size
+
+class PreforkServer:
+    """HTTP/1.1 server with pre-forked worker processes, each of which serves requests with a pool of threads.
+
+    Workers accept connections from a listening socket shared with the master process or, with reuse_port, from their
+    own socket bound with SO_REUSEPORT. Idle keep-alive connections wait in a selector instead of holding a thread.
+
+    The master process handles signals: SIGTERM and SIGINT shut the server down gracefully, letting workers finish the
+    requests in progress, and SIGHUP replaces the workers with new ones. Workers that die are replaced.
+    """
+
+    def __init__(self, app, host='127.0.0.1', port=8000, workers=2, threads=8, reuse_port=False, backlog=1024,
+                 keep_alive_timeout=5, max_header_size=65536, max_body_size=None, graceful_timeout=30):
+        """Set the options of the server.
+
+        app -- WSGI application.
+        host -- string that specifies the address the server binds to. '127.0.0.1' by default.
+        port -- integer that specifies the port the server binds to. 8000 by default.
+        workers -- integer that specifies the number of worker processes. 2 by default.
+        threads -- integer that specifies the number of threads of each worker. 8 by default.
+        reuse_port -- bool that specifies wheter each worker binds its own socket with SO_REUSEPORT, so the kernel
+                      balances connections between them. False by default.
+        backlog -- integer that specifies the size of the queue of pending connections. 1024 by default.
+        keep_alive_timeout -- number that specifies for how many seconds an idle connection is kept open. 5 by default.
+        max_header_size -- integer that specifies the maximum size in bytes of the head of a request. 65536 by default.
+        max_body_size -- integer that specifies the maximum size in bytes of a request body. None does not limit it.
+                         None by default.
+        graceful_timeout -- number that specifies for how many seconds workers may finish their requests on shutdown
+                            before they are killed. 30 by default.
+        """
+        if reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+            raise ValueError('SO_REUSEPORT is not supported on this platform')
+        self._app = app
+        self._host = host
+        self._port = port
+        self._workers = workers
+        self._threads = threads
+        self._reuse_port = reuse_port
+        self._backlog = backlog
+        self._keep_alive_timeout = keep_alive_timeout
+        self._max_header_size = max_header_size
+        self._max_body_size = max_body_size
+        self._graceful_timeout = graceful_timeout
+        self._socket = None
+        self._pids = {}
+        self._generation = 0
+        self._running = False
+        self._restart = False
+        self._stopping = False
+
+    def _listen(self, reuse_port):
+        """Return a non-blocking listening socket bound to the address of the server."""
+        family = socket.AF_INET6 if ':' in self._host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self._host, self._port))
+        sock.listen(self._backlog)
+        sock.setblocking(False)
+        return sock
+
+    def _signal(self, signum, frame):
+        """Record a signal received by the master process."""
+        if signum == signal.SIGHUP:
+            self._restart = True
+        elif signum in (signal.SIGTERM, signal.SIGINT):
+            self._running = False
+
+    def _spawn_worker(self):
+        """Fork a worker process."""
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._run_worker()
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        self._pids[pid] = self._generation
+
+    def _stop_workers(self, pids, timeout):
+        """Ask workers to shut down gracefully and kill those still running after the timeout."""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        while any(pid in self._pids for pid in pids) and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in pids:
+            if pid in self._pids:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                except (ProcessLookupError, ChildProcessError):
+                    pass
+                self._pids.pop(pid, None)
+
+    def _reap(self):
+        """Forget the workers that have exited."""
+        while self._pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self._pids.clear()
+                return
+            if pid == 0:
+                return
+            self._pids.pop(pid, None)
+
+    def serve_forever(self):
+        """Start the workers and supervise them until the server is shut down."""
+        if not self._reuse_port:
+            self._socket = self._listen(False)
+        self._running = True
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, self._signal)
+        try:
+            while self._running:
+                if self._restart:
+                    self._restart = False
+                    old_pids = list(self._pids)
+                    self._generation += 1
+                    for i in range(self._workers):
+                        self._spawn_worker()
+                    self._stop_workers(old_pids, self._graceful_timeout)
+                self._reap()
+                while len(self._pids) < self._workers and self._running:
+                    self._spawn_worker()
+                time.sleep(0.1)
+        finally:
+            self._stop_workers(list(self._pids), self._graceful_timeout)
+            if self._socket is not None:
+                self._socket.close()
+
+    def _run_worker(self):
+        """Accept connections and serve them with a pool of threads until a SIGTERM is received."""
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        listening = self._listen(True) if self._reuse_port else self._socket
+        selector = selectors.DefaultSelector()
+        wake_reader, wake_writer = socket.socketpair()
+        wake_reader.setblocking(False)
+        idle = deque()
+        idle_lock = threading.Lock()
+
+        def stop(signum, frame):
+            self._stopping = True
+            wake_writer.send(b'\0')
+
+        def keep(connection):
+            connection.last_active = time.monotonic()
+            with idle_lock:
+                idle.append(connection)
+            try:
+                wake_writer.send(b'\0')
+            except OSError:
+                pass
+
+        signal.signal(signal.SIGTERM, stop)
+        selector.register(listening, selectors.EVENT_READ)
+        selector.register(wake_reader, selectors.EVENT_READ)
+        executor = ThreadPoolExecutor(self._threads, thread_name_prefix='whodat')
+        waiting = {}
+        while not self._stopping:
+            for key, events in selector.select(timeout=1):
+                if key.fileobj is listening:
+                    try:
+                        sock, client = listening.accept()
+                    except (BlockingIOError, InterruptedError):
+                        continue
+                    sock.setblocking(True)
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    connection = Connection(sock, client)
+                    waiting[sock] = connection
+                    selector.register(sock, selectors.EVENT_READ, connection)
+                elif key.fileobj is wake_reader:
+                    try:
+                        wake_reader.recv(4096)
+                    except BlockingIOError:
+                        pass
+                else:
+                    selector.unregister(key.fileobj)
+                    del waiting[key.fileobj]
+                    executor.submit(self._serve_connection, key.data, keep)
+            with idle_lock:
+                returned = list(idle)
+                idle.clear()
+            for connection in returned:
+                waiting[connection.sock] = connection
+                selector.register(connection.sock, selectors.EVENT_READ, connection)
+            deadline = time.monotonic() - self._keep_alive_timeout
+            for sock, connection in list(waiting.items()):
+                if connection.last_active < deadline:
+                    selector.unregister(sock)
+                    del waiting[sock]
+                    sock.close()
+        selector.unregister(listening)
+        if self._reuse_port:
+            listening.close()
+        executor.shutdown(wait=True)
+        for sock in list(waiting) + [connection.sock for connection in idle]:
+            sock.close()
+        shutdown = getattr(self._app, 'shutdown', None)
+        if shutdown is not None:
+            shutdown()
+
+    def _serve_connection(self, connection, keep):
+        """Serve the requests of a connection until it must be closed or waits for the next request."""
+        connection.sock.settimeout(self._keep_alive_timeout)
+        try:
+            while True:
+                if not self._serve_request(connection):
+                    break
+                if self._stopping:
+                    break
+                if not connection.buffer:
+                    keep(connection)
+                    return
+        except OSError:
+            pass
+        except Exception:
+            traceback.print_exc()
+        connection.sock.close()
+
+    def _serve_request(self, connection):
+        """Serve the next request of a connection and return wheter the connection may be kept open."""
+        try:
+            head = connection.read_head(self._max_header_size)
+            if head is None:
+                return False
+            method, target, version, headers = parse_request_head(head)
+            if header_value(headers, 'Transfer-Encoding') is not None:
+                if header_value(headers, 'Transfer-Encoding').lower() != 'chunked':
+                    raise HTTPError(501)
+                body, size = read_chunked_body(connection, self._max_body_size)
+                headers = [(name, value) for name, value in headers
+                           if name.lower() not in ('transfer-encoding', 'content-length')]
+                headers.append(('Content-Length', str(size)))
+            else:
+                try:
+                    content_length = int(header_value(headers, 'Content-Length') or 0)
+                except ValueError:
+                    raise HTTPBadRequest()
+                if content_length < 0:
+                    raise HTTPBadRequest()
+                if self._max_body_size is not None and content_length > self._max_body_size:
+                    raise HTTPRequestEntityTooLarge()
+                body = RequestBody(connection, content_length)
+        except HTTPError as error:
+            connection.send(error_response(error.status))
+            return False
+        if header_value(headers, 'Expect') == '100-continue' and version == 'HTTP/1.1':
+            connection.send(b'HTTP/1.1 100 Continue\r\n\r\n')
+        environ = request_environ(method, target, version, headers, (self._host, self._port), connection.client, body,
+                                  self._workers > 1)
+        framer = ResponseFramer(method, version, keep_alive(version, headers) and not self._stopping)
+        if not self.run_app(environ, framer, connection.send, connection.sock):
+            return False
+        if isinstance(body, RequestBody):
+            return framer.keep_alive and body.drain(65536)
+        body.close()
+        return framer.keep_alive
+
+    def run_app(self, environ, framer, send, sock=None):
+        """Call the app for a WSGI environment and send its response, and return wheter it was sent completely.
+
+        A FileWrapper, or one wrapped in a TaskIterator, is sent with sendfile when the socket is given and the response
+        has a 'Content-Length' header, from the current position of the file and for exactly that many bytes.
+        """
+        response_head = []
+        sent = []
+
+        def start_response(status, headerlist, exc_info=None):
+            if exc_info is not None and sent:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_head[:] = [status, headerlist]
+            return write
+
+        def write(data):
+            if not sent:
+                sent.append(True)
+                send(framer.head(*response_head) + framer.body(data))
+            else:
+                send(framer.body(data))
+
+        try:
+            result = self._app(environ, start_response)
+        except Exception:
+            traceback.print_exc()
+            send(error_response(500))
+            return False
+        file_wrapper = getattr(result, 'app_iter', result)
+        content_length = header_value(response_head[1], 'Content-Length') if response_head else None
+        try:
+            if (isinstance(file_wrapper, FileWrapper) and sock is not None and not sent and
+                    hasattr(file_wrapper.file, 'fileno') and content_length is not None):
+                sent.append(True)
+                send(framer.head(*response_head))
+                if framer.body_allowed:
+                    sock.sendfile(file_wrapper.file, file_wrapper.file.tell(), int(content_length))
+            else:
+                for data in result:
+                    if data:
+                        write(data)
+                if not sent:
+                    write(b'')
+            send(framer.end())
+            return True
+        except OSError:
+            return False
+        except Exception:
+            traceback.print_exc()
+            if not sent:
+                send(error_response(500))
+            return False
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+
+class _ClosingIterator:
+    """Iterator over the rest of a WSGI response iterable, whose close method closes the iterable."""
+
+    def __init__(self, iterator, result):
+        """Set the iterator and the iterable."""
+        self._iterator = iterator
+        self.close = getattr(result, 'close', lambda: None)
+
+    def __iter__(self):
+        """Return the iterator."""
+        return self._iterator
+
+class AsyncioServer:
+    """Single-process HTTP/1.1 server that handles connections with asyncio, so idle keep-alive connections cost only a
+    coroutine.
+
+    Pipelined requests are answered in order. A WSGI application runs in a pool of threads, and the chunks of its
+    response are sent as they are produced, waiting for the client to read them. An ASGIApplication, or any other ASGI
+    application, runs in the event loop. Request bodies are read before the application is called, so their size is
+    bounded. SIGTERM and SIGINT shut the server down gracefully.
+    """
+
+    def __init__(self, app, host='127.0.0.1', port=8000, threads=None, keep_alive_timeout=5, max_header_size=65536,
+                 max_body_size=10 * 1024 * 1024, graceful_timeout=30):
+        """Set the options of the server.
+
+        app -- WSGI or ASGI application.
+        host -- string that specifies the address the server binds to. '127.0.0.1' by default.
+        port -- integer that specifies the port the server binds to. 8000 by default.
+        threads -- integer that specifies the number of threads that run a WSGI application. None uses the default of
+                   ThreadPoolExecutor. None by default.
+        keep_alive_timeout -- number that specifies for how many seconds an idle connection is kept open. 5 by default.
+        max_header_size -- integer that specifies the maximum size in bytes of the head of a request. 65536 by default.
+        max_body_size -- integer that specifies the maximum size in bytes of a request body. 10 MiB by default.
+        graceful_timeout -- number that specifies for how many seconds requests in progress may finish on shutdown. 30
+                            by default.
+        """
+        self._app = app
+        self._asgi = inspect.iscoroutinefunction(app) or inspect.iscoroutinefunction(getattr(app, '__call__', None))
+        self._host = host
+        self._port = port
+        self._threads = threads
+        self._keep_alive_timeout = keep_alive_timeout
+        self._max_header_size = max_header_size
+        self._max_body_size = max_body_size
+        self._graceful_timeout = graceful_timeout
+        self._executor = None
+        self._connections = {}
+        self._stopping = None
+
+    async def _read_body(self, reader, headers):
+        """Return the request body, or raise an HTTPError."""
+        transfer_encoding = header_value(headers, 'Transfer-Encoding')
+        if transfer_encoding is None:
+            try:
+                content_length = int(header_value(headers, 'Content-Length') or 0)
+            except ValueError:
+                raise HTTPBadRequest()
+            if content_length < 0:
+                raise HTTPBadRequest()
+            if content_length > self._max_body_size:
+                raise HTTPRequestEntityTooLarge()
+            return await reader.readexactly(content_length) if content_length else b''
+        if transfer_encoding.lower() != 'chunked':
+            raise HTTPError(501)
+        chunks = []
+        size = 0
+        while True:
+            try:
+                chunk_size = int((await reader.readline()).split(b';')[0].strip(), 16)
+            except ValueError:
+                raise HTTPBadRequest()
+            if chunk_size == 0:
+                break
+            size += chunk_size
+            if size > self._max_body_size:
+                raise HTTPRequestEntityTooLarge()
+            chunks.append(await reader.readexactly(chunk_size))
+            if await reader.readexactly(2) != b'\r\n':
+                raise HTTPBadRequest()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        return b''.join(chunks)
+
+    def _start_wsgi(self, environ):
+        """Call the WSGI application and return its status, headers, the data passed to write and its iterable."""
+        response_head = []
+        written = []
+
+        def start_response(status, headerlist, exc_info=None):
+            if exc_info is not None and written:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_head[:] = [status, headerlist]
+            return written.append
+
+        result = self._app(environ, start_response)
+        if not response_head and not isinstance(result, list):
+            iterator = iter(result)
+            first = next(iterator, b'')
+            written.append(first)
+            return response_head[0], response_head[1], written, _ClosingIterator(iterator, result)
+        return response_head[0], response_head[1], written, result
+
+    async def _run_wsgi(self, environ, framer, writer):
+        """Run the WSGI application and send its response, and return wheter it was sent completely."""
+        loop = asyncio.get_running_loop()
+        try:
+            status, headerlist, written, result = await loop.run_in_executor(self._executor, self._start_wsgi, environ)
+        except Exception:
+            traceback.print_exc()
+            writer.write(error_response(500))
+            return False
+        try:
+            writer.write(framer.head(status, headerlist))
+            for data in written:
+                writer.write(framer.body(data))
+            if isinstance(result, list):
+                for data in result:
+                    writer.write(framer.body(data))
+            else:
+                iterator = iter(result)
+                while True:
+                    await writer.drain()
+                    data = await loop.run_in_executor(self._executor, next, iterator, None)
+                    if data is None:
+                        break
+                    writer.write(framer.body(data))
+            writer.write(framer.end())
+            await writer.drain()
+            return True
+        except Exception:
+            traceback.print_exc()
+            return False
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(self._executor, close)
+
+    async def _run_asgi(self, method, target, version, headers, body, client, framer, writer):
+        """Run the ASGI application and send its response, and return wheter it was sent completely."""
+        path, _, query_string = target.partition('?')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': version[5:],
+            'method': method,
+            'scheme': 'http',
+            'path': unquote_to_bytes(path).decode('utf-8', 'replace'),
+            'raw_path': path.encode('latin-1'),
+            'query_string': query_string.encode('latin-1'),
+            'root_path': '',
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+            'server': (self._host, self._port),
+            'client': client,
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        complete = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await self._stopping.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status = '%d %s' % (message['status'], responses.get(message['status'], ''))
+                headerlist = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in message['headers']]
+                writer.write(framer.head(status, headerlist))
+            elif message['type'] == 'http.response.body':
+                writer.write(framer.body(message.get('body', b'')))
+                if not message.get('more_body', False):
+                    writer.write(framer.end())
+                    complete.append(True)
+                await writer.drain()
+
+        try:
+            await self._app(scope, receive, send)
+        except Exception:
+            traceback.print_exc()
+            if not complete:
+                writer.write(error_response(500))
+            return False
+        return bool(complete)
+
+    async def _handle_connection(self, reader, writer):
+        """Serve the requests of a connection until it is closed."""
+        client = writer.get_extra_info('peername')
+        client = client[:2] if client else ('', 0)
+        try:
+            while not self._stopping.is_set():
+                self._connections[writer] = True
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self._keep_alive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(error_response(431))
+                    break
+                finally:
+                    self._connections[writer] = False
+                try:
+                    method, target, version, headers = parse_request_head(head[:-4].lstrip(b'\r\n'))
+                    if header_value(headers, 'Expect') == '100-continue' and version == 'HTTP/1.1':
+                        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+                    body = await self._read_body(reader, headers)
+                    if header_value(headers, 'Transfer-Encoding') is not None:
+                        headers = [(name, value) for name, value in headers
+                                   if name.lower() not in ('transfer-encoding', 'content-length')]
+                        headers.append(('Content-Length', str(len(body))))
+                except HTTPError as error:
+                    writer.write(error_response(error.status))
+                    break
+                framer = ResponseFramer(method, version, keep_alive(version, headers) and not self._stopping.is_set())
+                if self._asgi:
+                    sent = await self._run_asgi(method, target, version, headers, body, client, framer, writer)
+                else:
+                    environ = request_environ(method, target, version, headers, (self._host, self._port), client,
+                                              io.BytesIO(body))
+                    sent = await self._run_wsgi(environ, framer, writer)
+                if not sent or not framer.keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def serve(self):
+        """Serve connections until a SIGTERM or SIGINT is received, then wait for the requests in progress."""
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._executor = ThreadPoolExecutor(self._threads, thread_name_prefix='whodat')
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, self._stopping.set)
+        server = await asyncio.start_server(self._handle_connection, self._host, self._port,
+                                            limit=self._max_header_size, backlog=1024)
+        try:
+            await self._stopping.wait()
+        finally:
+            server.close()
+            for writer, idle in list(self._connections.items()):
+                if idle:
+                    writer.close()
+            deadline = loop.time() + self._graceful_timeout
+            while self._connections and loop.time() < deadline:
+                await asyncio.sleep(0.05)
+            self._executor.shutdown(wait=False)
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(signum)
+            shutdown = getattr(self._app, 'shutdown', None)
+            if shutdown is not None:
+                await loop.run_in_executor(None, shutdown)
+
+    def serve_forever(self):
+        """Run the server in a new event loop."""
+        asyncio.run(self.serve())
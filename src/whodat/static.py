@@ -0,0 +1,145 @@
+import mimetypes
+import os
+import threading
+
+from collections import OrderedDict
+from email.utils import formatdate
+from whodat.http import *
+from whodat.http import _not_modified
+
+# precompressed siblings, in order of preference, and the extensions of their files
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+class StaticFile:
+    """Metadata of a file served by StaticFiles."""
+
+    def __init__(self, filename, content_type, size, mtime):
+        """Set the metadata of a file and precompute its validators."""
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.mtime = mtime
+        self.etag = '"%x-%x"' % (int(mtime), size)
+        self.last_modified = formatdate(mtime, usegmt=True)
+        self.encodings = {}
+
+class StaticFiles:
+    """Serve the files of a directory.
+
+    The directory is indexed once, so each request costs a dict lookup instead of filesystem calls, and only indexed
+    files can be served, which rejects any path that tries to escape the directory. Small files are kept in an LRU cache
+    bounded by their total size.
+    """
+
+    def __init__(self, directory, cache_size=16 * 1024 * 1024, max_cached_file_size=256 * 1024, rescan=False):
+        """Set attributes and index the directory.
+
+        directory -- string that specifies the directory of the static files.
+        cache_size -- integer that specifies the maximum size in bytes of the files kept in memory. 0 disables the
+                      cache. 16 MiB by default.
+        max_cached_file_size -- integer that specifies the size in bytes above which a file is streamed from disk
+                                instead of being cached. 256 KiB by default.
+        rescan -- bool that specifies wheter the directory is indexed again when a file is missing or has changed, which
+                  is useful while developing. False by default.
+        """
+        self._directory = directory
+        self._cache_size = cache_size
+        self._max_cached_file_size = max_cached_file_size
+        self._rescan = rescan
+        self._cache = OrderedDict()
+        self._cached_size = 0
+        self._lock = threading.Lock()
+        self._index = {}
+        self.scan()
+
+    def _static_file(self, filename, content_type=None):
+        """Return the StaticFile of a file."""
+        stat = os.stat(filename)
+        if content_type is None:
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return StaticFile(filename, content_type, stat.st_size, stat.st_mtime)
+
+    def scan(self):
+        """Index the files of the directory."""
+        filenames = set()
+        for dirpath, dirnames, files in os.walk(self._directory):
+            filenames.update(os.path.join(dirpath, name) for name in files)
+        index = {}
+        for filename in filenames:
+            if any(filename.endswith(extension) and filename[:-len(extension)] in filenames
+                   for encoding, extension in ENCODINGS):
+                continue
+            static_file = self._static_file(filename)
+            for encoding, extension in ENCODINGS:
+                if filename + extension in filenames:
+                    static_file.encodings[encoding] = self._static_file(filename + extension, static_file.content_type)
+            path = os.path.relpath(filename, self._directory).replace(os.sep, '/')
+            index[path] = static_file
+        with self._lock:
+            self._index = index
+            self._cache.clear()
+            self._cached_size = 0
+
+    def lookup(self, path):
+        """Return the StaticFile for a path relative to the directory, or None."""
+        static_file = self._index.get(path)
+        if self._rescan:
+            try:
+                stat = os.stat(static_file.filename) if static_file else None
+            except OSError:
+                stat = None
+            if stat is None or (stat.st_size, stat.st_mtime) != (static_file.size, static_file.mtime):
+                self.scan()
+                static_file = self._index.get(path)
+        return static_file
+
+    def _read(self, static_file):
+        """Return the content of a file from the cache, or None if it is too large to be cached."""
+        if static_file.size > self._max_cached_file_size or static_file.size > self._cache_size:
+            return None
+        with self._lock:
+            body = self._cache.get(static_file.filename)
+            if body is not None:
+                self._cache.move_to_end(static_file.filename)
+                return body
+        with open(static_file.filename, 'rb') as file:
+            body = file.read()
+        with self._lock:
+            if static_file.filename not in self._cache:
+                self._cache[static_file.filename] = body
+                self._cached_size += len(body)
+                while self._cached_size > self._cache_size:
+                    filename, evicted = self._cache.popitem(last=False)
+                    self._cached_size -= len(evicted)
+        return body
+
+    def response(self, request, path):
+        """Return an HTTPResponse for a path relative to the directory, or None if there is no such file.
+
+        A precompressed sibling, such as 'style.css.gz' for 'style.css', is served when the request accepts its
+        encoding.
+        """
+        static_file = self.lookup(path)
+        if static_file is None:
+            return None
+        headerlist = []
+        if static_file.encodings:
+            headerlist.append(('Vary', 'Accept-Encoding'))
+            if request.headers.get('Accept-Encoding') is not None:
+                offers = [encoding for encoding, extension in ENCODINGS if encoding in static_file.encodings]
+                encoding = request.best_accept_encoding(offers + ['identity'])
+                if encoding in static_file.encodings:
+                    static_file = static_file.encodings[encoding]
+                    headerlist.append(('Content-Encoding', encoding))
+        headerlist.append(('ETag', static_file.etag))
+        headerlist.append(('Last-Modified', static_file.last_modified))
+        if _not_modified(request, static_file.etag, static_file.last_modified):
+            return HTTPResponse('', 304, headerlist=headerlist)
+        try:
+            body = self._read(static_file)
+            if body is None:
+                return FileResponse(static_file.filename, static_file.content_type, headerlist=headerlist)
+        except OSError:
+            return None
+        return HTTPResponse(body, content_type=static_file.content_type, charset=None,
+                            headerlist=[('Content-Type', static_file.content_type)] + headerlist)
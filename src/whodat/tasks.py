@@ -0,0 +1,94 @@
+import threading
+import traceback
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+def _run_task(function, args, kwargs):
+    """Call a task, printing the traceback of any exception it raises."""
+    try:
+        function(*args, **kwargs)
+    except Exception:
+        traceback.print_exc()
+
+class TaskExecutor:
+    """Bounded pool that runs the tasks added to requests and responses once the responses are sent.
+
+    At most max_pending tasks wait or run at once. Submitting another one blocks until one finishes, which slows down
+    the threads serving requests instead of letting the queue grow without bound.
+    """
+
+    def __init__(self, max_workers=4, max_pending=256, processes=False):
+        """Set the options of the pool, which is started on the first task.
+
+        max_workers -- integer that specifies the number of threads or processes that run tasks. 4 by default.
+        max_pending -- integer that specifies the maximum number of tasks waiting or running. 256 by default.
+        processes -- bool that specifies wheter tasks run in processes instead of threads, in which case they and their
+                     arguments must be picklable. False by default.
+        """
+        self._max_workers = max_workers
+        self._processes = processes
+        self._semaphore = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._shutdown = False
+
+    def _pool(self):
+        """Return the pool, starting it if needed."""
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('Cannot run tasks after shutdown')
+            if self._executor is None:
+                if self._processes:
+                    self._executor = ProcessPoolExecutor(self._max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(self._max_workers, thread_name_prefix='whodat-task')
+            return self._executor
+
+    def submit(self, function, args=(), kwargs=None):
+        """Run a task in the pool, waiting while max_pending tasks are waiting or running, and return its Future."""
+        self._semaphore.acquire()
+        try:
+            future = self._pool().submit(_run_task, function, args, kwargs or {})
+        except BaseException:
+            self._semaphore.release()
+            raise
+        future.add_done_callback(lambda future: self._semaphore.release())
+        return future
+
+    def run(self, tasks):
+        """Run a sequence of (function, args, kwargs) tasks in the pool."""
+        for function, args, kwargs in tasks:
+            self.submit(function, args, kwargs)
+
+    def shutdown(self, wait=True):
+        """Stop accepting tasks and, if wait is True, wait until the pending ones finish."""
+        with self._lock:
+            self._shutdown = True
+            executor = self._executor
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+class TaskIterator:
+    """WSGI response iterable that runs tasks when the server closes it, after the response is sent."""
+
+    app_iter = property(lambda self: self._app_iter)
+
+    def __init__(self, app_iter, executor, tasks):
+        """Set the response iterable, the TaskExecutor and the sequence of (function, args, kwargs) tasks."""
+        self._app_iter = app_iter
+        self._executor = executor
+        self._tasks = tasks
+
+    def __iter__(self):
+        """Return an iterator over the response iterable."""
+        return iter(self._app_iter)
+
+    def close(self):
+        """Close the response iterable and run the tasks."""
+        try:
+            close = getattr(self._app_iter, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            tasks, self._tasks = self._tasks, ()
+            self._executor.run(tasks)
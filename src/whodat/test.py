@@ -1,3 +1,5 @@
+import asyncio
+
 from whodat.http import *
 
 class Client:
@@ -20,37 +22,85 @@ class Client:
         """Return an string representation of the client cookies using the HTTP header format."""
         return ';'.join(['%s=%s' % (key, value) for key, value in self._cookies.items()])
 
+    def _handle_request(self, request):
+        """Return the HTTPResponse of the app for a request."""
+        return self._app.handle_request(request)
+
     def get(self, path):
         """Handle a GET request."""
-        request = HTTPRequest.get(path_info=path, headers={'HTTP_COOKIE': self.http_cookies()})
-        response = self._app.handle_request(request)
+        request = self._app._request_class.get(path_info=path, headers={'HTTP_COOKIE': self.http_cookies()})
+        response = self._handle_request(request)
         self.set_cookies(response)
         return response
 
     def post(self, path, params=None):
         """Handle a POST request."""
-        request = HTTPRequest.post(path_info=path, params=params, headers={'HTTP_COOKIE': self.http_cookies()})
-        response = self._app.handle_request(request)
+        request = self._app._request_class.post(path_info=path, params=params,
+                                                headers={'HTTP_COOKIE': self.http_cookies()})
+        response = self._handle_request(request)
         self.set_cookies(response)
         return response
 
     def put(self, path, params=None):
         """Handle a PUT request."""
-        request = HTTPRequest.put(path_info=path, params=params, headers={'HTTP_COOKIE': self.http_cookies()})
-        response = self._app.handle_request(request)
+        request = self._app._request_class.put(path_info=path, params=params,
+                                               headers={'HTTP_COOKIE': self.http_cookies()})
+        response = self._handle_request(request)
         self.set_cookies(response)
         return response
 
     def delete(self, path):
         """Handle a DELETE request."""
-        request = HTTPRequest.delete(path_info=path, headers={'HTTP_COOKIE': self.http_cookies()})
-        response = self._app.handle_request(request)
+        request = self._app._request_class.delete(path_info=path, headers={'HTTP_COOKIE': self.http_cookies()})
+        response = self._handle_request(request)
         self.set_cookies(response)
         return response
 
     def head(self, path):
         """Handle a HEAD request."""
-        request = HTTPRequest.head(path_info=path, headers={'HTTP_COOKIE': self.http_cookies()})
-        response = self._app.handle_request(request)
+        request = self._app._request_class.head(path_info=path, headers={'HTTP_COOKIE': self.http_cookies()})
+        response = self._handle_request(request)
         self.set_cookies(response)
         return response
+
+class ASGIClient(Client):
+    """HTTP client for ASGIApplication, which sends requests through the ASGI interface."""
+
+    def _handle_request(self, request):
+        """Return an HTTPResponse with the status, headers and body sent by the app for a request."""
+        environ = request.environ
+        content_length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(content_length) if content_length else b''
+        headers = [(key[5:].replace('_', '-').lower().encode('latin-1'), value.encode('latin-1'))
+                   for key, value in environ.items() if key.startswith('HTTP_')]
+        if environ.get('CONTENT_TYPE'):
+            headers.append((b'content-type', environ['CONTENT_TYPE'].encode('latin-1')))
+        if content_length:
+            headers.append((b'content-length', str(content_length).encode('latin-1')))
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': environ['REQUEST_METHOD'],
+            'scheme': environ['wsgi.url_scheme'],
+            'path': environ['PATH_INFO'].encode('latin-1').decode('utf-8'),
+            'query_string': environ.get('QUERY_STRING', '').encode('latin-1'),
+            'root_path': environ.get('SCRIPT_NAME', ''),
+            'headers': headers,
+            'server': (environ['SERVER_NAME'], int(environ['SERVER_PORT'])),
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self._app(scope, receive, send))
+        start = sent[0]
+        headerlist = [(key.decode('latin-1').title(), value.decode('latin-1')) for key, value in start['headers']
+                      if key != b'content-length']
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        return HTTPResponse(body, start['status'], headerlist=headerlist)
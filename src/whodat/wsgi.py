@@ -1,22 +1,62 @@
 import inspect
-import mimetypes
-import os
 import traceback
 
+from whodat.extension import *
 from whodat.handler import *
 from whodat.http import *
+from whodat.routing import *
+from whodat.static import *
+from whodat.tasks import *
 
 class WSGIApplication:
     """WSGI application interface."""
 
-    def __init__(self, debug, controllers=None, error_handler=None, extensions=None, static_url=None, static_dir=None):
-        """Set attributes, inspect controllers to find Handlers and initialize extensions."""
+    def __init__(self, debug, controllers=None, error_handler=None, extensions=None, static_url=None, static_dir=None,
+                 trailing_slash='redirect', route_cache_size=0, max_body_size=None, max_part_size=None,
+                 request_class=HTTPRequest, serve_static=False, task_workers=4, max_pending_tasks=256,
+                 task_processes=False):
+        """Set attributes, inspect controllers to find Handlers and initialize extensions.
+
+        trailing_slash -- string that specifies what happens to a request whose path only matches a Handler once a
+                          slash is appended. 'redirect' answers with a 302 redirect, 'permanent' answers with a 301
+                          redirect and 'strict' answers with a 404 error. 'redirect' by default.
+        route_cache_size -- integer that specifies how many resolved paths are kept in an LRU cache. 0 disables the
+                            cache. 0 by default.
+        max_body_size -- integer that specifies the maximum request body size in bytes. Requests that announce a larger
+                         body are rejected with a 413 error before it is read. Handlers may set their own limit. None
+                         does not limit the body size. None by default.
+        max_part_size -- integer that specifies the maximum multipart part size in bytes. Handlers may set their own
+                         limit. None does not limit the part size. None by default.
+        request_class -- class that specifies the request implementation, HTTPRequest or NativeHTTPRequest.
+                         HTTPRequest by default.
+        serve_static -- bool that specifies wheter the files in static_dir are served under static_url when debug is
+                        False. They are always served in debug mode, where the directory is indexed again when files
+                        change. False by default.
+        task_workers -- integer that specifies the number of threads or processes that run the tasks added to requests
+                        and responses after the responses are sent. 4 by default.
+        max_pending_tasks -- integer that specifies the maximum number of tasks waiting or running. Serving a request
+                             with tasks blocks while the limit is reached. 256 by default.
+        task_processes -- bool that specifies wheter tasks run in processes instead of threads. False by default.
+        """
+        if trailing_slash not in ('strict', 'redirect', 'permanent'):
+            raise ValueError('Invalid trailing_slash mode: %s' % trailing_slash)
         self._debug = debug
         self._error_handler = error_handler() if error_handler else ErrorHandler()
         self._extensions = extensions or []
+        self._pipelines = {}
         self._static_url = static_url
-        self._static_dir = static_dir
-        self._routes = {}
+        if static_url and static_dir and (debug or serve_static):
+            self._static_files = StaticFiles(static_dir, rescan=debug)
+        else:
+            self._static_files = None
+        self._trailing_slash = trailing_slash
+        self._max_body_size = max_body_size
+        self._max_part_size = max_part_size
+        self._request_class = request_class
+        self._tasks = TaskExecutor(task_workers, max_pending_tasks, task_processes)
+        self._router = Router()
+        self._route_cache = RouteCache(self._router, route_cache_size) if route_cache_size > 0 else None
+        self._resolve = self._route_cache.resolve if self._route_cache else self._router.resolve
         for controller in controllers or []:
             for name, obj in inspect.getmembers(controller):
                 if isinstance(obj, Handler):
@@ -26,40 +66,113 @@ class WSGIApplication:
 
     def add_handler(self, handler):
         """Add a Handler to this application."""
-        self._routes[handler._url_regex] = handler
+        self._router.add(handler)
+        if self._route_cache:
+            self._route_cache.clear()
+
+    def _pipeline(self, handler):
+        """Return the tuples of extensions whose process_request and process_response are called for a Handler.
+
+        They are built on the first request to each Handler, from the extensions that override each hook and whose
+        routes include the Handler's URL pattern.
+        """
+        pipeline = self._pipelines.get(handler)
+        if pipeline is None:
+            extensions = [extension for extension in self._extensions
+                          if extension.routes is None or handler._url_pattern in extension.routes]
+            pipeline = (tuple(extension for extension in extensions if overrides(extension, 'process_request')),
+                        tuple(extension for extension in extensions if overrides(extension, 'process_response')))
+            self._pipelines[handler] = pipeline
+        return pipeline
+
+    def route_cache_info(self):
+        """Return a dict with the statistics of the route cache, or None if it is disabled."""
+        return self._route_cache.info() if self._route_cache else None
+
+    def _route(self, request):
+        """Return the Handler and the arguments for the request, return an HTTPResponse that answers it without a
+        Handler, or raise an HTTPError."""
+        route = self._resolve(request.path)
+        if route is REDIRECT:
+            if self._trailing_slash != 'strict':
+                return HTTPRedirect(request.path + '/', self._trailing_slash == 'permanent')
+        elif route is not None:
+            handler, args = route
+            max_body_size = self._max_body_size if handler._max_body_size is None else handler._max_body_size
+            if max_body_size is not None:
+                if request.content_length is not None and request.content_length > max_body_size:
+                    raise HTTPRequestEntityTooLarge()
+                request.max_body_size = max_body_size
+            max_part_size = self._max_part_size if handler._max_part_size is None else handler._max_part_size
+            if max_part_size is not None:
+                request.max_part_size = max_part_size
+            request.handler = handler
+            return route
+        if self._static_files and request.path.startswith(self._static_url):
+            response = self._static_files.response(request, request.path[len(self._static_url):])
+            if response is not None:
+                return response
+        raise HTTPNotFound()
+
+    def _handle_error(self, error):
+        """Return the HTTPResponse of the error handler for an exception."""
+        if not isinstance(error, HTTPError):
+            if self._debug:
+                traceback.print_exc()
+            error = HTTPInternalServerError()
+        return self._error_handler(error)
+
+    def _handle_exception(self, request, exception):
+        """Return the HTTPResponse of the first extension whose process_exception returns one for an exception, or
+        the HTTPResponse of the error handler."""
+        handler = request.handler
+        if handler is not None:
+            for extension in self._extensions:
+                if extension.routes is not None and handler._url_pattern not in extension.routes:
+                    continue
+                if overrides(extension, 'process_exception'):
+                    response = extension.process_exception(request, exception)
+                    if response is not None:
+                        return response
+        return self._handle_error(exception)
 
     def handle_request(self, request):
         """Return an HTTPResponse or redirect the request by appending a slash to its path."""
         try:
-            for (url_regex, handler) in self._routes.items():
-                match = url_regex.match(request.path)
-                if match is not None:
-                    for extension in self._extensions:
-                        extension.process_request(request)
-                    response = handler(request, *match.groups())
-                    for extension in self._extensions:
-                        extension.process_response(request, response)
-                    return response
-            for (url_regex, handler) in self._routes.items():
-                match = url_regex.match(request.path + '/')
-                if match is not None:
-                    return HTTPRedirect(request.path + '/')
-            if self._debug and self._static_url and self._static_dir and request.path.startswith(self._static_url):
-                static_filename = os.path.join(self._static_dir, request.path[len(self._static_url):])
-                try:
-                    with open(static_filename, 'rb') as static_file:
-                        content_type, charset = mimetypes.guess_type(static_filename)
-                        return HTTPResponse(static_file.read(), content_type=content_type, charset=charset)
-                except:
-                    pass
-            raise HTTPNotFound()
+            route = self._route(request)
+            if isinstance(route, HTTPResponse):
+                return route
+            handler, args = route
+            request_extensions, response_extensions = self._pipeline(handler)
+            response = None
+            for extension in request_extensions:
+                response = extension.process_request(request)
+                if response is not None:
+                    break
+            if response is None:
+                response = self._move_tasks(request, handler(request, *args))
+            for extension in response_extensions:
+                response = extension.process_response(request, response) or response
+            return response
         except Exception as error:
-            if not isinstance(error, HTTPError):
-                if self._debug:
-                    traceback.print_exc()
-                error = HTTPInternalServerError()
-            return self._error_handler(error)
+            return self._handle_exception(request, error)
+
+    def _move_tasks(self, request, response):
+        """Move the tasks of a Handler's HTTPResponse to the request, so they run even if an extension replaces the
+        response, and return the response."""
+        if response.tasks:
+            request.tasks = list(request.tasks) + response.tasks
+            response.tasks = ()
+        return response
+
+    def shutdown(self, wait=True):
+        """Stop accepting tasks and, if wait is True, wait until the pending ones finish."""
+        self._tasks.shutdown(wait)
 
     def __call__(self, environ, start_response):
         """WSGI interface."""
-        return self.handle_request(HTTPRequest(environ))(environ, start_response)
+        request = self._request_class(environ)
+        response = self.handle_request(request)
+        app_iter = response(environ, start_response)
+        tasks = list(request.tasks) + list(response.tasks)
+        return TaskIterator(app_iter, self._tasks, tasks) if tasks else app_iter
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+import unittest
+
+from whodat.asgi import *
+from whodat.handler import *
+from whodat.http import *
+from whodat.test import *
+
+### Handlers ###
+
+@url('/')
+class RootHandler:
+    def get(self, request):
+        return 'get %s' % threading.current_thread().name
+
+    def post(self, request):
+        return 'post %s' % request.POST.get('name', '')
+
+@url('/async/_/')
+class AsyncHandler:
+    tasks = []
+
+    async def get(self, request, arg):
+        await asyncio.sleep(0)
+        return HTTPResponse('async %s %s' % (arg, request.GET.get('page', '')))
+
+    async def put(self, request, arg):
+        return {'name': request.POST.get('name')}
+
+    async def delete(self, request, arg):
+        request.add_task(AsyncHandler.tasks.append, arg)
+        return 'deleted'
+
+@url('/stream/')
+class StreamHandler:
+    def get(self, request):
+        for i in range(3):
+            yield '%d' % i
+
+@url('/upload/', max_body_size=10)
+class UploadHandler:
+    def post(self, request):
+        return '%d' % len(request.stream.read())
+
+@url('/error/')
+class ErrorHandler:
+    async def get(self, request):
+        return 1 / 0
+
+### Tests ###
+
+def call(app, scope, messages=None):
+    """Run an ASGI app for a scope and return the messages it sends."""
+    messages = list(messages or [{'type': 'http.request', 'body': b'', 'more_body': False}])
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+class ASGIApplicationTest(unittest.TestCase):
+    def setUp(self):
+        self.app = ASGIApplication(False, max_threads=2, max_body_size=100)
+        for handler in (RootHandler, AsyncHandler, StreamHandler, UploadHandler, ErrorHandler):
+            self.app.add_handler(handler)
+        self.client = ASGIClient(self.app)
+
+    def scope(self, method, path, headers=None):
+        return {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'headers': headers or []}
+
+    def test_sync(self):
+        response = self.client.get('/')
+        self.assertTrue(response.text.startswith('get whodat'))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.content_type, 'text/html')
+
+        response = self.client.post('/', {'name': 'gold'})
+        self.assertEqual(response.text, 'post gold')
+
+    def test_async(self):
+        response = self.client.get('/async/gold/')
+        self.assertEqual(response.text, 'async gold ')
+        response = self.client.put('/async/gold/', {'name': 'corn'})
+        self.assertEqual(response.text, '{"name":"corn"}')
+        self.assertEqual(response.content_type, 'application/json')
+
+    def test_async_through_wsgi(self):
+        response = self.app.handle_request(HTTPRequest.get(path_info='/async/gold/', query_string='page=2'))
+        self.assertEqual(response.text, 'async gold 2')
+
+    def test_streaming(self):
+        sent = call(self.app, self.scope('GET', '/stream/'))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertNotIn(b'content-length', dict(sent[0]['headers']))
+        self.assertEqual([message['body'] for message in sent[1:]], [b'0', b'1', b'2', b''])
+        self.assertEqual([message.get('more_body', False) for message in sent[1:]], [True, True, True, False])
+
+    def test_head(self):
+        sent = call(self.app, self.scope('HEAD', '/async/gold/'))
+        self.assertEqual(dict(sent[0]['headers'])[b'content-length'], b'11')
+        self.assertEqual(b''.join(message.get('body', b'') for message in sent[1:]), b'')
+
+    def test_body_size(self):
+        messages = [{'type': 'http.request', 'body': b'x' * 8, 'more_body': True},
+                    {'type': 'http.request', 'body': b'x' * 8, 'more_body': False}]
+        sent = call(self.app, self.scope('POST', '/upload/'), messages)
+        self.assertEqual(sent[0]['status'], 413)
+
+        messages = [{'type': 'http.request', 'body': b'x' * 4, 'more_body': True},
+                    {'type': 'http.request', 'body': b'x' * 4, 'more_body': False}]
+        sent = call(self.app, self.scope('POST', '/upload/', [(b'content-length', b'8')]), messages)
+        self.assertEqual(sent[1]['body'], b'8')
+
+    def test_body_without_length(self):
+        for request_class in (HTTPRequest, NativeHTTPRequest):
+            app = ASGIApplication(False, request_class=request_class)
+            app.add_handler(RootHandler)
+            messages = [{'type': 'http.request', 'body': b'name=go', 'more_body': True},
+                        {'type': 'http.request', 'body': b'ld', 'more_body': False}]
+            headers = [(b'content-type', b'application/x-www-form-urlencoded')]
+            sent = call(app, self.scope('POST', '/', headers), messages)
+            self.assertEqual(sent[1]['body'], b'post gold')
+
+    def test_tasks(self):
+        AsyncHandler.tasks[:] = []
+        self.assertEqual(self.client.delete('/async/gold/').text, 'deleted')
+        self.app.shutdown()
+        self.assertEqual(AsyncHandler.tasks, ['gold'])
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/error/').status, '500 Internal Server Error')
+        self.assertEqual(self.client.get('/missing/').status, '404 Not Found')
+        self.assertEqual(self.client.delete('/').status, '405 Method Not Allowed')
+        response = self.client.get('/async/gold')
+        self.assertEqual(response.status, '302 Found')
+        self.assertTrue(dict(response.headerlist)['Location'].endswith('/async/gold/'))
+
+    def test_lifespan(self):
+        sent = call(self.app, {'type': 'lifespan'}, [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+        self.assertEqual(sent, [{'type': 'lifespan.startup.complete'}, {'type': 'lifespan.shutdown.complete'}])
+
+    def test_scope_environ(self):
+        scope = {'type': 'http', 'method': 'GET', 'path': '/ç/', 'query_string': b'a=1', 'scheme': 'https',
+                 'server': ('example.com', 443), 'client': ('10.0.0.1', 1234),
+                 'headers': [(b'content-type', b'text/plain'), (b'accept', b'text/html'), (b'accept', b'*/*')]}
+        environ = scope_environ(scope, None)
+        self.assertEqual(environ['PATH_INFO'], '/ç/'.encode('utf-8').decode('latin-1'))
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['SERVER_PORT'], '443')
+        self.assertEqual(environ['REMOTE_ADDR'], '10.0.0.1')
+        self.assertEqual(HTTPRequest(environ).url, 'https://example.com/%C3%A7/?a=1')
+
+if __name__ == '__main__':
+    unittest.main()
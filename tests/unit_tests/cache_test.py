@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from whodat.cache import *
+from whodat.handler import *
+from whodat.http import *
+from whodat.wsgi import *
+
+### Handlers ###
+
+calls = []
+
+@url('/', cache_ttl=60)
+class RootHandler:
+    def get(self, request):
+        calls.append(request.path)
+        return 'root %s' % request.GET.get('page', '')
+
+    def post(self, request):
+        calls.append(request.path)
+        return 'post'
+
+@url('/uncached/')
+class UncachedHandler:
+    def get(self, request):
+        calls.append(request.path)
+        return 'uncached'
+
+@url('/cookie/', cache_ttl=60)
+class CookieHandler:
+    def get(self, request):
+        calls.append(request.path)
+        response = HTTPResponse('cookie')
+        response.set_cookie('session', 'abc')
+        return response
+
+@url('/language/', cache_ttl=60)
+class LanguageHandler:
+    def get(self, request):
+        calls.append(request.path)
+        return request.headers.get('Accept-Language', '')
+
+### Tests ###
+
+class CacheExtensionTest(unittest.TestCase):
+    def setUp(self):
+        del calls[:]
+        self.cache = CacheExtension(vary=['Accept-Language'])
+        self.app = WSGIApplication(False, extensions=[self.cache])
+        for handler in (RootHandler, UncachedHandler, CookieHandler, LanguageHandler):
+            self.app.add_handler(handler)
+
+    def get(self, path, query_string='', headers=None):
+        return self.app.handle_request(HTTPRequest.get(path_info=path, query_string=query_string, headers=headers))
+
+    def test_hit(self):
+        self.assertEqual(self.get('/').text, 'root ')
+        response = self.get('/')
+        self.assertEqual(response.text, 'root ')
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.content_type, 'text/html')
+        self.assertEqual(response.content_length, 5)
+        self.assertEqual(calls, ['/'])
+        self.assertEqual(self.cache.info(), {'hits': 1, 'misses': 1, 'size': 1, 'max_size': 1024})
+
+    def test_key(self):
+        self.assertEqual(self.get('/', 'page=1').text, 'root 1')
+        self.assertEqual(self.get('/', 'page=2').text, 'root 2')
+        self.assertEqual(self.get('/', 'page=1').text, 'root 1')
+        self.assertEqual(calls, ['/', '/'])
+
+        self.assertEqual(self.get('/language/', headers={'HTTP_ACCEPT_LANGUAGE': 'en'}).text, 'en')
+        self.assertEqual(self.get('/language/', headers={'HTTP_ACCEPT_LANGUAGE': 'de'}).text, 'de')
+        self.assertEqual(self.get('/language/', headers={'HTTP_ACCEPT_LANGUAGE': 'en'}).text, 'en')
+        self.assertEqual(calls, ['/', '/', '/language/', '/language/'])
+
+    def test_not_cached(self):
+        self.get('/uncached/')
+        self.get('/uncached/')
+        self.get('/cookie/')
+        self.get('/cookie/')
+        self.app.handle_request(HTTPRequest.post(path_info='/'))
+        self.app.handle_request(HTTPRequest.post(path_info='/'))
+        self.assertEqual(len(calls), 6)
+
+    def test_ttl(self):
+        cache = CacheExtension(ttl=60)
+        app = WSGIApplication(False, extensions=[cache])
+        app.add_handler(UncachedHandler)
+        app.handle_request(HTTPRequest.get(path_info='/uncached/'))
+        app.handle_request(HTTPRequest.get(path_info='/uncached/'))
+        self.assertEqual(calls, ['/uncached/'])
+
+        backend = MemoryCacheBackend()
+        backend.set('/', '', ('200 OK', [], b''), -1)
+        self.assertIsNone(backend.get('/', ''))
+
+    def test_invalidate(self):
+        self.get('/', 'page=1')
+        self.get('/', 'page=2')
+        self.get('/language/')
+        self.cache.invalidate('/')
+        self.assertEqual(self.cache.info()['size'], 1)
+        self.get('/', 'page=1')
+        self.assertEqual(calls, ['/', '/', '/language/', '/'])
+
+        self.cache.clear()
+        self.assertEqual(self.cache.info()['size'], 0)
+
+    def test_eviction(self):
+        backend = MemoryCacheBackend(max_size=2)
+        backend.set('/a/', '', ('200 OK', [], b'a'), 60)
+        backend.set('/b/', '', ('200 OK', [], b'b'), 60)
+        backend.get('/a/', '')
+        backend.set('/c/', '', ('200 OK', [], b'c'), 60)
+        self.assertIsNotNone(backend.get('/a/', ''))
+        self.assertIsNone(backend.get('/b/', ''))
+        self.assertEqual(backend.size(), 2)
+
+class SQLiteCacheBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'cache.db')
+        self.backend = SQLiteCacheBackend(self.filename, max_size=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared(self):
+        value = ('200 OK', [('Content-Type', 'text/html; charset=UTF-8')], b'abc')
+        self.backend.set('/', 'page=1', value, 60)
+        self.assertEqual(SQLiteCacheBackend(self.filename).get('/', 'page=1'), value)
+        self.assertIsNone(self.backend.get('/', 'page=2'))
+
+    def test_expiry_and_eviction(self):
+        self.backend.set('/a/', '', ('200 OK', [], b'a'), -1)
+        self.assertIsNone(self.backend.get('/a/', ''))
+        self.backend.set('/b/', '', ('200 OK', [], b'b'), 10)
+        self.backend.set('/c/', '', ('200 OK', [], b'c'), 20)
+        self.backend.set('/d/', '', ('200 OK', [], b'd'), 30)
+        self.assertEqual(self.backend.size(), 2)
+        self.assertIsNone(self.backend.get('/b/', ''))
+
+    def test_invalidate(self):
+        self.backend.set('/', 'page=1', ('200 OK', [], b'1'), 60)
+        self.backend.set('/', 'page=2', ('200 OK', [], b'2'), 60)
+        self.backend.invalidate('/')
+        self.assertEqual(self.backend.size(), 0)
+
+    def test_extension(self):
+        del calls[:]
+        app = WSGIApplication(False, extensions=[CacheExtension(self.backend)])
+        app.add_handler(RootHandler)
+        app.handle_request(HTTPRequest.get(path_info='/'))
+        self.assertEqual(app.handle_request(HTTPRequest.get(path_info='/')).text, 'root ')
+        self.assertEqual(calls, ['/'])
+
+if __name__ == '__main__':
+    unittest.main()
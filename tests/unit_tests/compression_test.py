@@ -0,0 +1,122 @@
+import gzip
+import unittest
+import zlib
+
+from whodat.compression import *
+from whodat.handler import *
+from whodat.http import *
+from whodat.wsgi import *
+
+### Handlers ###
+
+@url('/')
+class TextHandler:
+    def get(self, request):
+        return 'whodat ' * 100
+
+@url('/short/')
+class ShortHandler:
+    def get(self, request):
+        return 'whodat'
+
+@url('/image/')
+class ImageHandler:
+    def get(self, request):
+        return HTTPResponse(b'\x00' * 1000, content_type='image/png')
+
+@url('/stream/')
+class StreamHandler:
+    def get(self, request):
+        return (chunk for chunk in ['whodat ' * 100, 'whodat ' * 100])
+
+@url('/etag/')
+class ETagHandler:
+    def get(self, request):
+        return HTTPResponse('whodat ' * 100, headerlist=[('Content-Type', 'text/html'), ('ETag', '"abc"')])
+
+@url('/frozen/')
+class FrozenHandler:
+    response = FrozenResponse('whodat ' * 100)
+
+    def get(self, request):
+        return self.response
+
+### Tests ###
+
+class CompressionExtensionTest(unittest.TestCase):
+    def setUp(self):
+        self.app = WSGIApplication(False, extensions=[CompressionExtension()])
+        for handler in (TextHandler, ShortHandler, ImageHandler, StreamHandler, ETagHandler, FrozenHandler):
+            self.app.add_handler(handler)
+
+    def get(self, path, accept_encoding='gzip, deflate'):
+        headers = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding else {}
+        return self.app.handle_request(HTTPRequest.get(path_info=path, headers=headers))
+
+    def test_gzip(self):
+        response = self.get('/')
+        self.assertIn(('Content-Encoding', 'gzip'), response.headerlist)
+        self.assertIn(('Vary', 'Accept-Encoding'), response.headerlist)
+        self.assertEqual(response.content_type, 'text/html')
+        self.assertEqual(response.content_length, len(response.body))
+        self.assertEqual(gzip.decompress(response.body), ('whodat ' * 100).encode('utf-8'))
+
+    def test_deflate(self):
+        response = self.get('/', 'deflate')
+        self.assertIn(('Content-Encoding', 'deflate'), response.headerlist)
+        self.assertEqual(zlib.decompress(response.body), ('whodat ' * 100).encode('utf-8'))
+
+    def test_not_accepted(self):
+        for accept_encoding in (None, 'br', 'gzip;q=0, deflate;q=0'):
+            response = self.get('/', accept_encoding)
+            self.assertNotIn('Content-Encoding', dict(response.headerlist))
+            self.assertIn(('Vary', 'Accept-Encoding'), response.headerlist)
+            self.assertEqual(response.text, 'whodat ' * 100)
+
+    def test_min_size(self):
+        response = self.get('/short/')
+        self.assertNotIn('Content-Encoding', dict(response.headerlist))
+        self.assertEqual(response.text, 'whodat')
+
+    def test_content_type(self):
+        response = self.get('/image/')
+        self.assertNotIn('Content-Encoding', dict(response.headerlist))
+        self.assertNotIn('Vary', dict(response.headerlist))
+
+    def test_streaming(self):
+        response = self.get('/stream/')
+        self.assertTrue(response.streaming)
+        self.assertIsNone(response.content_length)
+        chunks = list(response.app_iter)
+        self.assertEqual(len(chunks), 3)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(chunks[0]), ('whodat ' * 100).encode('utf-8'))
+        self.assertEqual(gzip.decompress(b''.join(chunks)), ('whodat ' * 200).encode('utf-8'))
+
+    def test_etag(self):
+        response = self.get('/etag/')
+        self.assertIn(('ETag', 'W/"abc"'), response.headerlist)
+
+    def test_frozen(self):
+        response = self.get('/frozen/')
+        self.assertEqual(gzip.decompress(response.body), ('whodat ' * 100).encode('utf-8'))
+        response = self.get('/frozen/', None)
+        self.assertIn(('Vary', 'Accept-Encoding'), response.headerlist)
+        self.assertNotIn('Vary', dict(FrozenHandler.response.headerlist))
+
+    def test_head(self):
+        response = self.app.handle_request(HTTPRequest.head(path_info='/', headers={'HTTP_ACCEPT_ENCODING': 'gzip'}))
+        self.assertNotIn('Content-Encoding', dict(response.headerlist))
+        self.assertIn(('Vary', 'Accept-Encoding'), response.headerlist)
+        self.assertEqual(response.content_length, 700)
+
+        response = self.app.handle_request(HTTPRequest.head(path_info='/frozen/'))
+        self.assertIn(('Vary', 'Accept-Encoding'), response.headerlist)
+        self.assertEqual(response.content_length, 700)
+        self.assertEqual(response.body, b'')
+
+    def test_invalid_encoding(self):
+        self.assertRaises(ValueError, CompressionExtension, encodings=('br',))
+
+if __name__ == '__main__':
+    unittest.main()
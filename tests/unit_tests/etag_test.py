@@ -0,0 +1,109 @@
+import unittest
+
+from whodat.etag import *
+from whodat.handler import *
+from whodat.http import *
+from whodat.wsgi import *
+
+### Handlers ###
+
+@url('/')
+class RootHandler:
+    def get(self, request):
+        return 'whodat'
+
+    def post(self, request):
+        return 'whodat'
+
+@url('/tagged/')
+class TaggedHandler:
+    def get(self, request):
+        headerlist = [('Content-Type', 'text/html'), ('ETag', '"v1"'),
+                      ('Last-Modified', 'Sun, 15 Nov 2015 20:54:39 GMT'), ('Cache-Control', 'max-age=60')]
+        return HTTPResponse('whodat', headerlist=headerlist)
+
+@url('/stream/')
+class StreamHandler:
+    def get(self, request):
+        yield 'whodat'
+
+@url('/frozen/')
+class FrozenHandler:
+    response = FrozenResponse('whodat')
+
+    def get(self, request):
+        return self.response
+
+### Tests ###
+
+class ETagExtensionTest(unittest.TestCase):
+    def setUp(self):
+        self.app = WSGIApplication(False, extensions=[ETagExtension()])
+        for handler in (RootHandler, TaggedHandler, StreamHandler, FrozenHandler):
+            self.app.add_handler(handler)
+
+    def get(self, path, **headers):
+        return self.app.handle_request(HTTPRequest.get(path_info=path, headers=headers))
+
+    def test_etag(self):
+        etag = dict(self.get('/').headerlist)['ETag']
+        self.assertRegex(etag, r'^"[0-9a-f]{16}"$')
+        self.assertEqual(dict(self.get('/').headerlist)['ETag'], etag)
+
+        app = WSGIApplication(False, extensions=[ETagExtension(weak=True)])
+        app.add_handler(RootHandler)
+        self.assertEqual(dict(app.handle_request(HTTPRequest.get(path_info='/')).headerlist)['ETag'], 'W/' + etag)
+
+    def test_if_none_match(self):
+        etag = dict(self.get('/').headerlist)['ETag']
+        response = self.get('/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status, '304 Not Modified')
+        self.assertEqual(response.body, b'')
+        self.assertEqual(response.headerlist, [('ETag', etag)])
+
+        self.assertEqual(self.get('/', HTTP_IF_NONE_MATCH='"other", W/' + etag).status, '304 Not Modified')
+        self.assertEqual(self.get('/', HTTP_IF_NONE_MATCH='"other"').status, '200 OK')
+
+    def test_handler_etag(self):
+        response = self.get('/tagged/', HTTP_IF_NONE_MATCH='"v1"')
+        self.assertEqual(response.status, '304 Not Modified')
+        self.assertIn(('Cache-Control', 'max-age=60'), response.headerlist)
+        self.assertNotIn('Content-Type', dict(response.headerlist))
+
+        request = HTTPRequest.head(path_info='/tagged/', headers={'HTTP_IF_NONE_MATCH': '"v1"'})
+        response = self.app.handle_request(request)
+        self.assertEqual(response.status, '304 Not Modified')
+
+    def test_head(self):
+        for path in ('/', '/frozen/'):
+            etag = dict(self.get(path).headerlist)['ETag']
+            response = self.app.handle_request(HTTPRequest.head(path_info=path))
+            self.assertEqual(dict(response.headerlist)['ETag'], etag)
+            self.assertEqual(response.content_length, 6)
+            self.assertEqual(response.body, b'')
+            request = HTTPRequest.head(path_info=path, headers={'HTTP_IF_NONE_MATCH': etag})
+            self.assertEqual(self.app.handle_request(request).status, '304 Not Modified')
+
+    def test_frozen(self):
+        etag = dict(self.get('/frozen/').headerlist)['ETag']
+        self.assertEqual(self.get('/frozen/', HTTP_IF_NONE_MATCH=etag).status, '304 Not Modified')
+        self.assertNotIn('ETag', dict(FrozenHandler.response.headerlist))
+
+    def test_if_modified_since(self):
+        response = self.get('/tagged/', HTTP_IF_MODIFIED_SINCE='Sun, 15 Nov 2015 20:54:39 GMT')
+        self.assertEqual(response.status, '304 Not Modified')
+        response = self.get('/tagged/', HTTP_IF_MODIFIED_SINCE='Sat, 14 Nov 2015 20:54:39 GMT')
+        self.assertEqual(response.status, '200 OK')
+        response = self.get('/', HTTP_IF_MODIFIED_SINCE='Sun, 15 Nov 2015 20:54:39 GMT')
+        self.assertEqual(response.status, '200 OK')
+
+    def test_skipped(self):
+        response = self.get('/stream/', HTTP_IF_NONE_MATCH='*')
+        self.assertNotIn('ETag', dict(response.headerlist))
+        self.assertEqual(response.text, 'whodat')
+
+        response = self.app.handle_request(HTTPRequest.post(path_info='/'))
+        self.assertNotIn('ETag', dict(response.headerlist))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
+import asyncio
 import unittest
 
+from whodat.asgi import *
 from whodat.handler import *
 from whodat.http import *
 
@@ -31,6 +33,51 @@ class StrHandler:
     def post(self, request):
         return 'post'
 
+@url('/stream/')
+class StreamHandler:
+    def get(self, request):
+        yield 'get '
+        yield b'stream'
+
+@url('/lazy/')
+class LazyHandler:
+    rendered = []
+
+    def get(self, request):
+        self.rendered.append(True)
+        yield 'rendered'
+
+@url('/head/')
+class HeadHandler:
+    def get(self, request):
+        return 'get'
+
+    def head(self, request):
+        return HTTPResponse(content_type='text/plain')
+
+@url('/frozen/')
+class FrozenHandler:
+    response = FrozenResponse('frozen')
+
+    def get(self, request):
+        return self.response
+
+@url('/json/')
+class JSONHandler:
+    def get(self, request):
+        return {'method': 'get'}
+
+    def post(self, request):
+        return ['post']
+
+@url('/dav/')
+class DAVHandler:
+    def get(self, request):
+        return 'get'
+
+    def propfind(self, request):
+        return 'propfind'
+
 class FirePolice(ErrorHandler):
     def error404(self, http_error):
         return HTTPResponse('404', status=http_error.status)
@@ -38,85 +85,190 @@ class FirePolice(ErrorHandler):
     def error5xx(self, http_error):
         return HTTPResponse('5xx', status=http_error.status)
 
+class CookiePolice(ErrorHandler):
+    def error(self, http_error):
+        response = super(CookiePolice, self).error(http_error)
+        response.set_cookie('error', str(http_error.status))
+        return response
+
+class SharedResponses(ErrorHandler):
+    response = HTTPResponse('405', status=405)
+    frozen = FrozenResponse('4xx', status=400)
+
+    def error405(self, http_error):
+        return self.response
+
+    def error4xx(self, http_error):
+        return self.frozen
+
 ### Tests ###
 
 class HandlerTest(unittest.TestCase):
-    def test_url_regex(self):
-        self.assertEqual(RootHandler._url_regex.pattern, r'^\/$')
-        self.assertEqual(OneArgHandler._url_regex.pattern, r'^\/one\/([^/]+)\/$')
-        self.assertEqual(TwoArgsHandler._url_regex.pattern, r'^\/two\/([^/]+)\/([^/]+)\/$')
+    def handle(self, handler, request, *args):
+        return handler(request, *args)
 
     def test_get(self):
-        response = RootHandler(HTTPRequest.get())
+        response = self.handle(RootHandler, HTTPRequest.get())
         self.assertEqual(response.text, 'get')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
-        response = OneArgHandler(HTTPRequest.get(), 'one')
+        response = self.handle(OneArgHandler, HTTPRequest.get(), 'one')
         self.assertEqual(response.text, 'one')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
-        response = TwoArgsHandler(HTTPRequest.get(), 'one', 'two')
+        response = self.handle(TwoArgsHandler, HTTPRequest.get(), 'one', 'two')
         self.assertEqual(response.text, 'one, two')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
-        response = StrHandler(HTTPRequest.get())
+        response = self.handle(StrHandler, HTTPRequest.get())
         self.assertEqual(response.text, 'get')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
+    def test_stream(self):
+        response = self.handle(StreamHandler, HTTPRequest.get())
+        self.assertTrue(response.streaming)
+        self.assertEqual(response.text, 'get stream')
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.content_type, 'text/html')
+
+        response = self.handle(StreamHandler, HTTPRequest.head())
+        self.assertEqual(response.text, '')
+
     def test_post(self):
-        response = RootHandler(HTTPRequest.post())
+        response = self.handle(RootHandler, HTTPRequest.post())
         self.assertEqual(response.text, 'post')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
-        response = StrHandler(HTTPRequest.post())
+        response = self.handle(StrHandler, HTTPRequest.post())
         self.assertEqual(response.text, 'post')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
     def test_head(self):
-        response = RootHandler(HTTPRequest.head())
+        response = self.handle(RootHandler, HTTPRequest.head())
         self.assertEqual(response.text, '')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
-        response = OneArgHandler(HTTPRequest.head(), 'one')
+        response = self.handle(OneArgHandler, HTTPRequest.head(), 'one')
         self.assertEqual(response.text, '')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
-        response = TwoArgsHandler(HTTPRequest.head(), 'one', 'two')
+        response = self.handle(TwoArgsHandler, HTTPRequest.head(), 'one', 'two')
         self.assertEqual(response.text, '')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
-        response = StrHandler(HTTPRequest.head())
+        response = self.handle(StrHandler, HTTPRequest.head())
         self.assertEqual(response.text, '')
         self.assertEqual(response.status, '200 OK')
         self.assertEqual(response.content_type, 'text/html')
         self.assertEqual(response.charset, 'UTF-8')
 
+    def test_head_content_length(self):
+        response = self.handle(RootHandler, HTTPRequest.head())
+        self.assertEqual(response.content_length, 3)
+        self.assertIn(('Content-Length', '3'), response.headerlist)
+
+    def test_head_method(self):
+        response = self.handle(HeadHandler, HTTPRequest.head())
+        self.assertEqual(response.text, '')
+        self.assertEqual(response.content_type, 'text/plain')
+        self.assertEqual(self.handle(HeadHandler, HTTPRequest.get()).text, 'get')
+
+    def test_head_lazy_body(self):
+        response = self.handle(LazyHandler, HTTPRequest.head())
+        self.assertEqual(response.text, '')
+        self.assertEqual(LazyHandler.rendered, [])
+
+    def test_head_frozen(self):
+        response = self.handle(FrozenHandler, HTTPRequest.head())
+        self.assertEqual(response.text, '')
+        self.assertEqual(response.content_length, 6)
+        self.assertEqual(self.handle(FrozenHandler, HTTPRequest.get()).text, 'frozen')
+
+    def test_json(self):
+        response = self.handle(JSONHandler, HTTPRequest.get())
+        self.assertIsInstance(response, JSONResponse)
+        self.assertEqual(response.body, b'{"method":"get"}')
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertEqual(self.handle(JSONHandler, HTTPRequest.post()).body, b'["post"]')
+
+        response = self.handle(JSONHandler, HTTPRequest.head())
+        self.assertEqual(response.body, b'')
+        self.assertEqual(response.content_length, 16)
+
+    def test_options(self):
+        request = HTTPRequest.get(headers={'REQUEST_METHOD': 'OPTIONS'})
+        response = self.handle(RootHandler, request)
+        self.assertEqual(response.text, '')
+        self.assertEqual(response.status, '200 OK')
+        self.assertIn(('Allow', 'GET, HEAD, POST, OPTIONS'), response.headerlist)
+
+        response = self.handle(OneArgHandler, request, 'one')
+        self.assertIn(('Allow', 'GET, HEAD, OPTIONS'), response.headerlist)
+
+    def test_extension_methods(self):
+        response = self.handle(DAVHandler, HTTPRequest.get(headers={'REQUEST_METHOD': 'PROPFIND'}))
+        self.assertEqual(response.text, 'propfind')
+
+        response = self.handle(DAVHandler, HTTPRequest.get(headers={'REQUEST_METHOD': 'OPTIONS'}))
+        self.assertIn(('Allow', 'GET, HEAD, OPTIONS, PROPFIND'), response.headerlist)
+        self.assertRaises(HTTPMethodNotAllowed, self.handle, DAVHandler,
+                          HTTPRequest.get(headers={'REQUEST_METHOD': 'CONVERT_ARGS'}))
+
     def test_method_not_allowed(self):
-        self.assertRaises(HTTPMethodNotAllowed, RootHandler, HTTPRequest.put())
-        self.assertRaises(HTTPMethodNotAllowed, RootHandler, HTTPRequest.delete())
+        self.assertRaises(HTTPMethodNotAllowed, self.handle, RootHandler, HTTPRequest.put())
+        self.assertRaises(HTTPMethodNotAllowed, self.handle, RootHandler, HTTPRequest.delete())
+
+        try:
+            self.handle(RootHandler, HTTPRequest.put())
+        except HTTPMethodNotAllowed as error:
+            self.assertEqual(error.headerlist, [('Allow', 'GET, HEAD, POST, OPTIONS')])
+
+class ASGIHandlerTest(HandlerTest):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = ASGIApplication(False, max_threads=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app._executor.shutdown()
+
+    def handle(self, handler, request, *args):
+        return asyncio.run(self.app._call_handler(handler, request, args))
 
 class urlTest(unittest.TestCase):
     def test_decorator(self):
         self.assertTrue(isinstance(RootHandler, Handler))
 
+    def test_url_regex(self):
+        self.assertEqual(RootHandler._url_regex.pattern, r'^\/$')
+        self.assertEqual(OneArgHandler._url_regex.pattern, r'^\/one\/([^/]+)\/$')
+        self.assertEqual(TwoArgsHandler._url_regex.pattern, r'^\/two\/([^/]+)\/([^/]+)\/$')
+
+    def test_convert_args(self):
+        handler = Handler('/post/<int>/_/')
+        self.assertEqual(handler._url_regex.match('/post/42/title/').groups(), ('42', 'title'))
+        self.assertIsNone(handler._url_regex.match('/post/abc/title/'))
+        self.assertEqual(handler.convert_args(('42', 'title')), (42, 'title'))
+        self.assertEqual(OneArgHandler.convert_args(('one',)), ('one',))
+
 class ErrorHandlerTest(unittest.TestCase):
     def test_specific_error_handler(self):
         response = FirePolice()(HTTPNotFound())
@@ -133,5 +285,34 @@ class ErrorHandlerTest(unittest.TestCase):
         self.assertEqual(response.text, 'Error 405')
         self.assertEqual(response.status, '405 Method Not Allowed')
 
+    def test_error_headers(self):
+        response = FirePolice()(HTTPMethodNotAllowed('GET, HEAD'))
+        self.assertIn(('Allow', 'GET, HEAD'), response.headerlist)
+
+    def test_frozen_error_responses(self):
+        response = ErrorHandler()(HTTPNotFound())
+        self.assertIsInstance(response, FrozenResponse)
+        self.assertIs(ErrorHandler()(HTTPNotFound()), response)
+        self.assertEqual(response.text, 'Error 404')
+        self.assertNotIsInstance(ErrorHandler()(HTTPMethodNotAllowed('GET')), FrozenResponse)
+
+        response = ErrorHandler().error(HTTPNotFound())
+        self.assertNotIsInstance(response, FrozenResponse)
+        response.set_cookie('seen', '1')
+        self.assertNotIsInstance(CookiePolice()(HTTPNotFound()), FrozenResponse)
+
+    def test_error_headers_copy(self):
+        for i in range(3):
+            response = SharedResponses()(HTTPMethodNotAllowed('GET'))
+            self.assertEqual(response.headerlist.count(('Allow', 'GET')), 1)
+        self.assertNotIn(('Allow', 'GET'), SharedResponses.response.headerlist)
+
+        error = HTTPBadRequest()
+        error.headerlist = [('X-Error', 'yes')]
+        response = SharedResponses()(error)
+        self.assertIn(('X-Error', 'yes'), response.headerlist)
+        self.assertEqual(response.text, '4xx')
+        self.assertNotIn(('X-Error', 'yes'), SharedResponses.frozen.headerlist)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,110 +1,129 @@
 import cgi
+import io
+import json
 import unittest
 
 from whodat.http import *
+from whodat.multipart import *
 
 class HTTPRequestTest(unittest.TestCase):
+    request_class = HTTPRequest
+
     def test_method(self):
-        request = HTTPRequest.get()
+        request = self.request_class.get()
         self.assertEqual(request.method, 'GET')
 
-        request = HTTPRequest.head()
+        request = self.request_class.head()
         self.assertEqual(request.method, 'HEAD')
 
-        request = HTTPRequest.post()
+        request = self.request_class.post()
         self.assertEqual(request.method, 'POST')
 
-        request = HTTPRequest.put()
+        request = self.request_class.put()
         self.assertEqual(request.method, 'PUT')
 
-        request = HTTPRequest.delete()
+        request = self.request_class.delete()
         self.assertEqual(request.method, 'DELETE')
 
     def test_http_version(self):
-        request = HTTPRequest.get()
+        request = self.request_class.get()
         self.assertEqual(request.http_version, 'HTTP/1.1')
 
-        request = HTTPRequest.get(http_version='HTTP/1.0')
+        request = self.request_class.get(http_version='HTTP/1.0')
         self.assertEqual(request.http_version, 'HTTP/1.0')
 
     def test_charset(self):
-        request = HTTPRequest.get()
+        request = self.request_class.get()
         self.assertEqual(request.charset, 'UTF-8')
 
     def test_host_name(self):
-        request = HTTPRequest.get(server_name='localhost', server_port=8000)
+        request = self.request_class.get(server_name='localhost', server_port=8000)
         self.assertEqual(request.host_name, 'http://localhost:8000')
 
-        request = HTTPRequest.get(server_name='google.com', server_port=80)
+        request = self.request_class.get(server_name='google.com', server_port=80)
         self.assertEqual(request.host_name, 'http://google.com')
 
     def test_host_port(self):
-        request = HTTPRequest.get(server_port=8000)
+        request = self.request_class.get(server_port=8000)
         self.assertEqual(request.host_port, 8000)
 
     def test_host(self):
-        request = HTTPRequest.get(server_name='localhost', server_port=8000)
+        request = self.request_class.get(server_name='localhost', server_port=8000)
         self.assertEqual(request.host, 'localhost:8000')
 
-        request = HTTPRequest.get(server_name='google.com', server_port=80)
+        request = self.request_class.get(server_name='google.com', server_port=80)
         self.assertEqual(request.host, 'google.com:80')
 
     def test_path(self):
-        request = HTTPRequest.get(script_name='', path_info='/post/delete')
+        request = self.request_class.get(script_name='', path_info='/post/delete')
         self.assertEqual(request.path, '/post/delete')
 
-        request = HTTPRequest.get(script_name='/post/delete', path_info='')
+        request = self.request_class.get(script_name='/post/delete', path_info='')
         self.assertEqual(request.path, '/post/delete')
 
-        request = HTTPRequest.get(script_name='/wiki', path_info='/post/delete')
+        request = self.request_class.get(script_name='/wiki', path_info='/post/delete')
         self.assertEqual(request.path, '/wiki/post/delete')
 
     def test_query_string(self):
-        request = HTTPRequest.get(query_string='abc=def&123=456')
+        request = self.request_class.get(query_string='abc=def&123=456')
         self.assertEqual(request.query_string, 'abc=def&123=456')
 
     def test_url(self):
-        request = HTTPRequest.get(server_name='google.com', server_port=80, script_name='/wiki',
+        request = self.request_class.get(server_name='google.com', server_port=80, script_name='/wiki',
                                   path_info='/post/delete', query_string='abc=def', url_scheme='https')
         self.assertEqual(request.url, 'https://google.com:80/wiki/post/delete?abc=def')
 
     def test_body(self):
-        request = HTTPRequest.post()
+        request = self.request_class.post()
         self.assertEqual(request.body, b'')
 
-        request = HTTPRequest.post(params={'abc': 'def'})
+        request = self.request_class.post(params={'abc': 'def'})
         self.assertEqual(request.body, b'abc=def')
 
-        request = HTTPRequest.post(params={'abc': 'def', '123': '456'})
+        request = self.request_class.post(params={'abc': 'def', '123': '456'})
         self.assertIn(b'123=456', request.body)
         self.assertIn(b'abc=def', request.body)
 
     def test_text(self):
-        request = HTTPRequest.post()
+        request = self.request_class.post()
         self.assertEqual(request.text, '')
 
-        request = HTTPRequest.post(params={'abc': 'def'})
+        request = self.request_class.post(params={'abc': 'def'})
         self.assertEqual(request.text, 'abc=def')
 
-        request = HTTPRequest.post(params={'abc': 'def', '123': '456'})
+        request = self.request_class.post(params={'abc': 'def', '123': '456'})
         self.assertIn('123=456', request.text)
         self.assertIn('abc=def', request.text)
 
+    def test_stream(self):
+        request = self.request_class.post(params={'abc': 'def'})
+        self.assertEqual(request.content_length, 7)
+        self.assertEqual(request.stream.read(3), b'abc')
+        self.assertEqual(b''.join(request.stream), b'=def')
+        self.assertEqual(request.stream.read(), b'')
+
+        request = self.request_class.post(params={'abc': 'def'})
+        request.max_body_size = 3
+        self.assertRaises(HTTPRequestEntityTooLarge, lambda: request.stream)
+
+        request = self.request_class.get()
+        self.assertEqual(request.stream.read(), b'')
+
     def test_GET(self):
-        request = HTTPRequest.get(query_string='abc=def&123=456')
+        request = self.request_class.get(query_string='abc=def&123=456')
         self.assertEqual(request.GET['abc'], 'def')
         self.assertEqual(request.GET['123'], '456')
 
     def test_POST(self):
-        request = HTTPRequest.post(params={'abc': 'def', '123': '456'})
+        request = self.request_class.post(params={'abc': 'def', '123': '456'})
         self.assertEqual(request.POST['abc'], 'def')
         self.assertEqual(request.POST['123'], '456')
 
-        request = HTTPRequest.post(params={'file': ('filename', b'content')})
+        request = self.request_class.post(params={'file': ('filename', b'content')})
         self.assertTrue(isinstance(request.POST['file'], cgi.FieldStorage))
 
     def test_headers(self):
-        request = HTTPRequest.get(headers={'HTTP_CONNECTION': 'keep-alive',
+        request = self.request_class.get(headers={'HTTP_CONNECTION': 'keep-alive',
                                            'HTTP_USER_AGENT': 'Mozilla/5.0',
                                            'HTTP_ACCEPT': 'text/html,text/xhtml;q=0.9',
                                            'HTTP_ACCEPT_ENCODING': 'gzip,deflate,sdch',
@@ -115,33 +134,66 @@ class HTTPRequestTest(unittest.TestCase):
         self.assertEqual(request.headers['Accept-Encoding'], 'gzip,deflate,sdch')
         self.assertEqual(request.headers['Accept-Language'], 'en-US,en;q=0.8,de;q=0.6')
 
-        request = HTTPRequest.post()
+        request = self.request_class.post()
         self.assertEqual(request.headers['Content-Type'], 'application/x-www-form-urlencoded')
 
-        request = HTTPRequest.post(params={'file': ('filename', b'content')})
+        request = self.request_class.post(params={'file': ('filename', b'content')})
         self.assertIn('multipart/form-data; boundary=', request.headers['Content-Type'])
 
     def test_cookies(self):
-        request = HTTPRequest.get(headers={'HTTP_COOKIE': 'abc=def; 123=456'})
+        request = self.request_class.get(headers={'HTTP_COOKIE': 'abc=def; 123=456'})
         self.assertEqual(request.cookies['abc'], 'def')
         self.assertEqual(request.cookies['123'], '456')
 
     def test_accept(self):
-        request = HTTPRequest.get(headers={'HTTP_ACCEPT': 'text/html,text/xhtml;q=0.9'})
+        request = self.request_class.get(headers={'HTTP_ACCEPT': 'text/html,text/xhtml;q=0.9'})
         self.assertEqual(request.accept, ['text/html', 'text/xhtml'])
 
     def test_accept_charset(self):
-        request = HTTPRequest.get(headers={'HTTP_ACCEPT_CHARSET': 'iso-8859-5,unicode-1-1;q=0.8'})
+        request = self.request_class.get(headers={'HTTP_ACCEPT_CHARSET': 'iso-8859-5,unicode-1-1;q=0.8'})
         self.assertEqual(request.accept_charset, ['iso-8859-5', 'iso-8859-1', 'unicode-1-1'])
 
     def test_accept_encoding(self):
-        request = HTTPRequest.get(headers={'HTTP_ACCEPT_ENCODING': 'gzip,deflate,sdch'})
+        request = self.request_class.get(headers={'HTTP_ACCEPT_ENCODING': 'gzip,deflate,sdch'})
         self.assertEqual(request.accept_encoding, ['gzip', 'deflate', 'sdch'])
 
     def test_accept_language(self):
-        request = HTTPRequest.get(headers={'HTTP_ACCEPT_LANGUAGE': 'en-US,en;q=0.8,de;q=0.6'})
+        request = self.request_class.get(headers={'HTTP_ACCEPT_LANGUAGE': 'en-US,en;q=0.8,de;q=0.6'})
         self.assertEqual(request.accept_language, ['en-US', 'en', 'de'])
 
+    def test_best_accept(self):
+        request = self.request_class.get(headers={'HTTP_ACCEPT': 'text/html,application/json;q=0.9',
+                                                  'HTTP_ACCEPT_CHARSET': 'utf-8',
+                                                  'HTTP_ACCEPT_ENCODING': 'gzip;q=0.5,br',
+                                                  'HTTP_ACCEPT_LANGUAGE': 'en-US,en;q=0.8,de;q=0.6'})
+        self.assertEqual(request.best_accept(['application/json', 'text/html']), 'text/html')
+        self.assertEqual(request.best_accept(['image/png'], 'text/plain'), 'text/plain')
+        self.assertEqual(request.best_accept_charset(['latin-1', 'UTF-8']), 'UTF-8')
+        self.assertEqual(request.best_accept_encoding(['gzip', 'br']), 'br')
+        self.assertEqual(request.best_accept_language(['de', 'en']), 'en')
+
+        request = self.request_class.get()
+        self.assertEqual(request.best_accept(['application/json', 'text/html']), 'application/json')
+
+class NativeHTTPRequestTest(HTTPRequestTest):
+    request_class = NativeHTTPRequest
+
+    def test_slots(self):
+        request = self.request_class.get(path_info='/path/')
+        self.assertEqual(request.path, '/path/')
+        self.assertEqual(request.__dict__, {})
+
+    def test_POST(self):
+        request = self.request_class.post(params={'abc': 'def', '123': '456'})
+        self.assertEqual(request.POST['abc'], 'def')
+        self.assertEqual(request.POST['123'], '456')
+
+        request = self.request_class.post(params={'file': ('filename', b'content'), 'name': 'ç'})
+        self.assertIsInstance(request.POST['file'], MultipartPart)
+        self.assertEqual(request.POST['file'].filename, 'filename')
+        self.assertEqual(request.POST['file'].value, b'content')
+        self.assertEqual(request.POST['name'], 'ç')
+
 class HTTPResponseTest(unittest.TestCase):
     def test_body(self):
         response = HTTPResponse(body='abc123')
@@ -150,6 +202,53 @@ class HTTPResponseTest(unittest.TestCase):
         response = HTTPResponse(body=b'abc123')
         self.assertEqual(response.body, b'abc123')
 
+    def test_bytes_body(self):
+        response = HTTPResponse(body=b'abc123')
+        self.assertEqual(response.headerlist, [('Content-Type', 'text/html; charset=UTF-8'), ('Content-Length', '6')])
+        self.assertEqual(response.charset, 'UTF-8')
+
+        response = HTTPResponse(body=b'abc123', content_type='image/png')
+        self.assertEqual(response.headerlist, [('Content-Type', 'image/png'), ('Content-Length', '6')])
+        self.assertIsNone(response.charset)
+
+        response = HTTPResponse(body=b'abc123', content_type='application/xml', charset='latin-1')
+        self.assertEqual(response.content_type, 'application/xml')
+        self.assertEqual(response.charset, 'latin-1')
+
+        for content_type in ['text/plain', 'application/json', 'application/atom+xml', 'image/svg+xml', 'image/png',
+                             'text/plain; charset=latin-1']:
+            for charset in ['UTF-8', 'latin-1', None]:
+                response = HTTPResponse(b'abc123', 200, content_type, charset)
+                webob_response = HTTPResponse(b'abc123', 201, content_type, charset)
+                self.assertEqual(dict(response.headerlist)['Content-Type'],
+                                 dict(webob_response.headerlist)['Content-Type'])
+
+    def test_streaming_body(self):
+        response = HTTPResponse(body=(chunk for chunk in ['abc', b'123', 'ç']))
+        self.assertTrue(response.streaming)
+        self.assertIsNone(response.content_length)
+        self.assertNotIn('Content-Length', dict(response.headerlist))
+        self.assertEqual(list(response.app_iter), [b'abc', b'123', 'ç'.encode('utf-8')])
+
+        response = HTTPResponse(body=iter(['abc', '123']))
+        self.assertEqual(response.body, b'abc123')
+        self.assertFalse(HTTPResponse(body='abc').streaming)
+
+    def test_close(self):
+        closed = []
+
+        def generate():
+            try:
+                yield 'abc'
+                yield '123'
+            finally:
+                closed.append(True)
+
+        response = HTTPResponse(body=generate())
+        self.assertEqual(next(response.app_iter), b'abc')
+        response.close()
+        self.assertEqual(closed, [True])
+
     def test_text(self):
         response = HTTPResponse(body='abc123')
         self.assertEqual(response.text, 'abc123')
@@ -206,6 +305,180 @@ class HTTPResponseTest(unittest.TestCase):
         response.delete_cookie('a')
         self.assertTrue(dict(response.headerlist)['Set-Cookie'].startswith('a=; Max-Age=0; Path=/'))
 
+class JSONResponseTest(unittest.TestCase):
+    def test_body(self):
+        response = JSONResponse({'abc': [1, 2.5, None, 'ç']})
+        self.assertEqual(json.loads(response.body.decode('utf-8')), {'abc': [1, 2.5, None, 'ç']})
+        self.assertEqual(response.content_type, 'application/json')
+        self.assertEqual(response.content_length, len(response.body))
+        self.assertFalse(response.streaming)
+
+        response = JSONResponse([], 201, [('Cache-Control', 'no-cache')])
+        self.assertEqual(response.body, b'[]')
+        self.assertEqual(response.status, '201 Created')
+        self.assertIn(('Cache-Control', 'no-cache'), response.headerlist)
+
+    def test_encoder(self):
+        response = JSONResponse({'abc': 1}, encoder=lambda data: b'encoded')
+        self.assertEqual(response.body, b'encoded')
+
+    def test_stream(self):
+        response = JSONResponse(({'id': i} for i in range(100)), chunk_size=100)
+        self.assertTrue(response.streaming)
+        self.assertIsNone(response.content_length)
+        chunks = list(response.app_iter)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(b''.join(chunks).decode('utf-8')), [{'id': i} for i in range(100)])
+
+        self.assertEqual(JSONResponse(iter([])).body, b'[]')
+
+    def test_stream_close(self):
+        closed = []
+
+        def generate():
+            try:
+                yield 1
+                yield 2
+            finally:
+                closed.append(True)
+
+        response = JSONResponse(generate(), chunk_size=1)
+        self.assertEqual(next(response.app_iter), b'[1')
+        response.close()
+        self.assertEqual(closed, [True])
+
+class FrozenResponseTest(unittest.TestCase):
+    def call(self, response, method='GET'):
+        started = []
+        body = response({'REQUEST_METHOD': method}, lambda status, headerlist: started.append((status, headerlist)))
+        return started[0][0], started[0][1], b''.join(body)
+
+    def test(self):
+        response = FrozenResponse('abc123', headerlist=[('Cache-Control', 'max-age=60')])
+        self.assertEqual(response.body, b'abc123')
+        self.assertEqual(response.text, 'abc123')
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.content_length, 6)
+        self.assertFalse(response.streaming)
+        self.assertEqual(self.call(response), ('200 OK', [('Cache-Control', 'max-age=60'), ('Content-Length', '6')],
+                                               b'abc123'))
+        self.assertEqual(self.call(response), self.call(response))
+
+        response = FrozenResponse('Error 404', 404, 'text/plain')
+        self.assertEqual(response.status, '404 Not Found')
+        self.assertEqual(response.content_type, 'text/plain')
+        self.assertEqual(response.charset, 'UTF-8')
+
+    def test_head(self):
+        response = FrozenResponse('abc123')
+        self.assertEqual(response.head.body, b'')
+        self.assertEqual(response.head.content_length, 6)
+        self.assertIs(response.head, response.head)
+        self.assertEqual(self.call(response, 'HEAD')[2], b'')
+        self.assertIn(('Content-Length', '6'), self.call(response, 'HEAD')[1])
+
+    def test_frozen(self):
+        response = FrozenResponse('abc123')
+        self.assertRaises(TypeError, response.set_cookie, 'abc', 'def')
+        self.assertRaises(TypeError, response.cache_expires, 5)
+        self.assertRaises(TypeError, response.discard_body)
+        self.assertRaises(TypeError, response.add_task, print)
+        self.assertIsInstance(response.headerlist, tuple)
+        self.assertRaises(TypeError, FrozenResponse, iter(['abc']))
+
+    def test_thaw(self):
+        response = FrozenResponse('abc123', headerlist=[('Cache-Control', 'max-age=60')]).thaw()
+        response.set_cookie('abc', 'def')
+        self.assertEqual(response.body, b'abc123')
+        self.assertEqual(response.headerlist, [('Cache-Control', 'max-age=60'), ('Content-Length', '6'),
+                                               ('Set-Cookie', 'abc=def; Path=/')])
+
+class FileResponseTest(unittest.TestCase):
+    def call(self, response, **environ):
+        environ.setdefault('REQUEST_METHOD', 'GET')
+        started = []
+        app_iter = response(environ, lambda status, headerlist: started.append((status, headerlist)))
+        try:
+            return started[0][0], dict(started[0][1]), b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    def test_body(self):
+        response = FileResponse(io.BytesIO(b'abc123'), chunk_size=2)
+        self.assertEqual(response.content_type, 'application/octet-stream')
+        self.assertEqual(response.content_length, 6)
+        self.assertEqual(response.body, b'abc123')
+
+    def test_file_wrapper(self):
+        file = io.BytesIO(b'abc123')
+        wrapped = []
+
+        def file_wrapper(file, chunk_size):
+            wrapped.append(file)
+            return iter([file.read()])
+
+        status, headers, body = self.call(FileResponse(file), **{'wsgi.file_wrapper': file_wrapper})
+        self.assertEqual(wrapped, [file])
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Length'], '6')
+        self.assertEqual(headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(body, b'abc123')
+
+    def test_range(self):
+        status, headers, body = self.call(FileResponse(io.BytesIO(b'abc123')), HTTP_RANGE='bytes=1-3')
+        self.assertEqual(status, '206 Partial Content')
+        self.assertEqual(headers['Content-Range'], 'bytes 1-3/6')
+        self.assertEqual(headers['Content-Length'], '3')
+        self.assertEqual(body, b'bc1')
+
+        status, headers, body = self.call(FileResponse(io.BytesIO(b'abc123')), HTTP_RANGE='bytes=4-')
+        self.assertEqual(headers['Content-Range'], 'bytes 4-5/6')
+        self.assertEqual(body, b'23')
+
+        status, headers, body = self.call(FileResponse(io.BytesIO(b'abc123')), HTTP_RANGE='bytes=-2')
+        self.assertEqual(headers['Content-Range'], 'bytes 4-5/6')
+        self.assertEqual(body, b'23')
+
+        status, headers, body = self.call(FileResponse(io.BytesIO(b'abc123')), HTTP_RANGE='bytes=0-1,3-4')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'abc123')
+
+    def test_range_not_satisfiable(self):
+        file = io.BytesIO(b'abc123')
+        status, headers, body = self.call(FileResponse(file), HTTP_RANGE='bytes=6-')
+        self.assertEqual(status, '416 Requested Range Not Satisfiable')
+        self.assertEqual(headers['Content-Range'], 'bytes */6')
+        self.assertEqual(body, b'')
+        self.assertTrue(file.closed)
+
+    def test_if_range(self):
+        response = FileResponse(io.BytesIO(b'abc123'), headerlist=[('ETag', '"abc"')])
+        status, headers, body = self.call(response, HTTP_RANGE='bytes=1-3', HTTP_IF_RANGE='"def"')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(body, b'abc123')
+
+        response = FileResponse(io.BytesIO(b'abc123'), headerlist=[('ETag', '"abc"')])
+        status, headers, body = self.call(response, HTTP_RANGE='bytes=1-3', HTTP_IF_RANGE='"abc"')
+        self.assertEqual(status, '206 Partial Content')
+
+        response = FileResponse(io.BytesIO(b'abc123'), content_type='text/plain', headerlist=[('ETag', '"abc"')])
+        status, headers, body = self.call(response, HTTP_RANGE='bytes=1-3', HTTP_IF_RANGE='text/plain')
+        self.assertEqual(status, '200 OK')
+
+        date = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        response = FileResponse(io.BytesIO(b'abc123'), headerlist=[('Last-Modified', date)])
+        status, headers, body = self.call(response, HTTP_RANGE='bytes=1-3', HTTP_IF_RANGE=date)
+        self.assertEqual(status, '206 Partial Content')
+
+    def test_head(self):
+        file = io.BytesIO(b'abc123')
+        status, headers, body = self.call(FileResponse(file), REQUEST_METHOD='HEAD', HTTP_RANGE='bytes=1-3')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Length'], '6')
+        self.assertEqual(body, b'')
+        self.assertTrue(file.closed)
+
 class HTTPRedirectTest(unittest.TestCase):
     def test(self):
         response = HTTPRedirect('http://www.google.com')
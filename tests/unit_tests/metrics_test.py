@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from whodat.handler import *
+from whodat.http import *
+from whodat.metrics import *
+from whodat.wsgi import *
+
+### Handlers ###
+
+@url('/')
+class RootHandler:
+    def get(self, request):
+        return HTTPResponse('get')
+
+@url('/item/_/')
+class ItemHandler:
+    def get(self, request, item):
+        if item == 'missing':
+            raise HTTPNotFound()
+        if item == 'broken':
+            return 1 / 0
+        return HTTPResponse(item)
+
+### Tests ###
+
+class MetricsExtensionTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsExtension(buckets=(0.5, 1))
+        self.app = WSGIApplication(False, extensions=[self.metrics])
+        self.app.add_handler(RootHandler)
+        self.app.add_handler(ItemHandler)
+
+    def get(self, path):
+        return self.app.handle_request(HTTPRequest.get(path_info=path))
+
+    def test_counters(self):
+        self.get('/')
+        self.get('/item/gold/')
+        self.get('/item/missing/')
+        self.get('/item/broken/')
+        rows = self.metrics.snapshot()
+        self.assertEqual(rows['/'][:2], [0, 1])
+        self.assertEqual(rows['/item/_/'][:2], [0, 3])
+        self.assertEqual(rows['/item/_/'][3:8], [0, 1, 0, 1, 1])
+        self.assertEqual(rows['/item/_/'][8:], [3, 0, 0])
+
+    def test_render(self):
+        self.get('/')
+        self.get('/item/missing/')
+        response = self.get('/metrics')
+        self.assertEqual(response.content_type, 'text/plain')
+        lines = response.text.splitlines()
+        self.assertIn('# TYPE whodat_requests_total counter', lines)
+        self.assertIn('whodat_requests_total{route="/",status="2xx"} 1', lines)
+        self.assertIn('whodat_requests_total{route="/item/_/",status="4xx"} 1', lines)
+        self.assertIn('whodat_requests_in_flight{route="/"} 0', lines)
+        self.assertIn('whodat_request_duration_seconds_bucket{route="/",le="0.5"} 1', lines)
+        self.assertIn('whodat_request_duration_seconds_bucket{route="/",le="+Inf"} 1', lines)
+        self.assertIn('whodat_request_duration_seconds_count{route="/"} 1', lines)
+
+    def test_directory(self):
+        directory = tempfile.mkdtemp()
+        try:
+            metrics = MetricsExtension(directory=directory)
+            app = WSGIApplication(False, extensions=[metrics])
+            app.add_handler(RootHandler)
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    app.handle_request(HTTPRequest.get(path_info='/'))
+                    request = HTTPRequest.get(path_info='/')
+                    request.handler = RootHandler
+                    metrics.process_request(request)
+                    metrics.flush()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+            app.handle_request(HTTPRequest.get(path_info='/'))
+            rows = metrics.collect()
+            self.assertEqual(rows['/'][:2], [0, 2])
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import io
+import unittest
+
+from whodat.http import *
+from whodat.multipart import *
+
+BODY = (b'preamble\r\n'
+        b'--xyz\r\n'
+        b'Content-Disposition: form-data; name="title"\r\n'
+        b'\r\n'
+        b'golden corn\r\n'
+        b'--xyz\r\n'
+        b'Content-Disposition: form-data; name="file"; filename="corn.txt"\r\n'
+        b'Content-Type: text/plain\r\n'
+        b'\r\n'
+        b'--xy\r\n' + b'corn' * 100 + b'\r\n'
+        b'--xyz--\r\n'
+        b'epilogue')
+
+class MultipartParserTest(unittest.TestCase):
+    def test_parts(self):
+        for chunk_size in (1, 7, 65536):
+            parts = list(MultipartParser(io.BytesIO(BODY), 'xyz', chunk_size=chunk_size))
+            self.assertEqual(len(parts), 2)
+            self.assertEqual(parts[0].name, 'title')
+            self.assertEqual(parts[0].filename, None)
+            self.assertEqual(parts[0].value, b'golden corn')
+            self.assertEqual(parts[1].name, 'file')
+            self.assertEqual(parts[1].filename, 'corn.txt')
+            self.assertEqual(parts[1].content_type, 'text/plain')
+            self.assertEqual(parts[1].value, b'--xy\r\n' + b'corn' * 100)
+            self.assertEqual(parts[1].size, 406)
+
+    def test_spool(self):
+        parts = list(MultipartParser(io.BytesIO(BODY), 'xyz', spool_size=100))
+        self.assertEqual(parts[1].file.tell(), 0)
+        self.assertEqual(parts[1].file.read(), b'--xy\r\n' + b'corn' * 100)
+
+    def test_max_part_size(self):
+        parts = iter(MultipartParser(io.BytesIO(BODY), 'xyz', max_part_size=100))
+        self.assertEqual(next(parts).value, b'golden corn')
+        self.assertRaises(HTTPRequestEntityTooLarge, next, parts)
+
+    def test_truncated(self):
+        self.assertRaises(HTTPBadRequest, list, MultipartParser(io.BytesIO(BODY[:150]), 'xyz'))
+
+    def test_request(self):
+        request = HTTPRequest.post(params={'title': 'golden corn', 'file': ('corn.txt', b'corn')})
+        parts = {part.name: part for part in request.multipart()}
+        self.assertEqual(parts['title'].value, b'golden corn')
+        self.assertEqual(parts['file'].filename, 'corn.txt')
+        self.assertEqual(parts['file'].value, b'corn')
+
+        request = HTTPRequest.post(params={'title': 'golden corn'})
+        self.assertRaises(HTTPBadRequest, request.multipart)
+
+if __name__ == '__main__':
+    unittest.main()
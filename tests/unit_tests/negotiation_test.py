@@ -0,0 +1,51 @@
+import unittest
+
+from whodat.negotiation import *
+
+class ParseAcceptTest(unittest.TestCase):
+    def test_parse_accept(self):
+        self.assertEqual(parse_accept('text/html, text/xhtml;q=0.9,*/*;q=bad'),
+                         (('text/html', 1.0), ('text/xhtml', 0.9), ('*/*', 0.0)))
+        self.assertEqual(parse_accept(''), ())
+
+    def test_accept_values(self):
+        self.assertEqual(accept_values('en;q=0.8,de;q=0.9,fr,es;q=0'), ('fr', 'de', 'en'))
+        self.assertEqual(accept_values('iso-8859-5,unicode-1-1;q=0.8', 'iso-8859-1'),
+                         ('iso-8859-5', 'iso-8859-1', 'unicode-1-1'))
+        self.assertEqual(accept_values('*;q=0.5', 'iso-8859-1'), ('*',))
+        self.assertEqual(accept_values(None), ())
+
+    def test_cache(self):
+        parse_accept.cache_clear()
+        parse_accept('gzip, br')
+        parse_accept('gzip, br')
+        self.assertEqual(parse_accept.cache_info().hits, 1)
+        self.assertEqual(parse_accept.cache_info().misses, 1)
+
+class BestMatchTest(unittest.TestCase):
+    def test_accept(self):
+        header = 'text/html;q=0.9,application/json,text/*;q=0.5,*/*;q=0.1'
+        self.assertEqual(best_match(header, ['text/html', 'application/json']), 'application/json')
+        self.assertEqual(best_match(header, ['text/plain', 'text/html']), 'text/html')
+        self.assertEqual(best_match(header, ['text/plain', 'image/png']), 'text/plain')
+        self.assertEqual(best_match(header, ['image/png']), 'image/png')
+        self.assertEqual(best_match('text/html', ['image/png'], default='text/html'), 'text/html')
+        self.assertEqual(best_match('text/*, text/plain;q=0', ['text/plain']), None)
+        self.assertEqual(best_match(None, ['image/png', 'text/html']), 'image/png')
+
+    def test_language(self):
+        header = 'en-US,en;q=0.8,de;q=0.6'
+        self.assertEqual(best_match(header, ['de', 'en-GB'], 'language'), 'en-GB')
+        self.assertEqual(best_match(header, ['de', 'en-US'], 'language'), 'en-US')
+        self.assertEqual(best_match(header, ['fr'], 'language'), None)
+
+    def test_encoding(self):
+        self.assertEqual(best_match('gzip;q=0.5, br', ['gzip', 'br'], 'encoding'), 'br')
+        self.assertEqual(best_match('deflate', ['gzip', 'identity'], 'encoding'), 'identity')
+        self.assertEqual(best_match('*;q=0', ['gzip', 'identity'], 'encoding'), None)
+
+    def test_charset(self):
+        self.assertEqual(best_match('utf-8, iso-8859-1;q=0.5', ['ISO-8859-1', 'UTF-8'], 'charset'), 'UTF-8')
+
+if __name__ == '__main__':
+    unittest.main()
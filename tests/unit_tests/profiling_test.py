@@ -0,0 +1,133 @@
+import cProfile
+import marshal
+import os
+import pstats
+import tempfile
+import unittest
+
+from whodat.handler import *
+from whodat.http import *
+from whodat.profiling import *
+from whodat.wsgi import *
+
+### Handlers ###
+
+def fibonacci(n):
+    return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+@url('/')
+class RootHandler:
+    def get(self, request):
+        return HTTPResponse('%d' % fibonacci(10))
+
+@url('/error/')
+class ErrorHandler:
+    def get(self, request):
+        return 1 / 0
+
+### Tests ###
+
+class ProfilerExtensionTest(unittest.TestCase):
+    def app(self, profiler):
+        app = WSGIApplication(False, extensions=[profiler])
+        app.add_handler(RootHandler)
+        app.add_handler(ErrorHandler)
+        return app
+
+    def test_disabled(self):
+        profiler = ProfilerExtension()
+        app = self.app(profiler)
+        request = HTTPRequest.get(path_info='/')
+        app.handle_request(request)
+        self.assertFalse(hasattr(request, 'profile'))
+        self.assertEqual(profiler.routes_profiled(), [])
+        self.assertIsNone(profiler.stats())
+
+    def test_sampling(self):
+        profiler = ProfilerExtension(sample_rate=1)
+        app = self.app(profiler)
+        app.handle_request(HTTPRequest.get(path_info='/'))
+        app.handle_request(HTTPRequest.get(path_info='/error/'))
+        self.assertEqual(profiler.routes_profiled(), ['/', '/error/'])
+        functions = [function[2] for function in profiler.stats('/').stats]
+        self.assertIn('fibonacci', functions)
+        profiler.set_sample_rate(0)
+        profiler.reset()
+        app.handle_request(HTTPRequest.get(path_info='/'))
+        self.assertEqual(profiler.routes_profiled(), [])
+
+    def test_disabled_while_profiling(self):
+        profiler = ProfilerExtension(sample_rate=1)
+        request = HTTPRequest.get(path_info='/')
+        request.handler = RootHandler
+        profiler.process_request(request)
+        profiler.set_sample_rate(0)
+        profiler.process_response(request, HTTPResponse())
+        self.assertIsNone(request.profile)
+        self.assertEqual(profiler.routes_profiled(), ['/'])
+
+    def test_header(self):
+        profiler = ProfilerExtension(secret='s3cret')
+        app = self.app(profiler)
+        app.handle_request(HTTPRequest.get(path_info='/', headers={'HTTP_X_WHODAT_PROFILE': 'wrong'}))
+        self.assertEqual(profiler.routes_profiled(), [])
+        app.handle_request(HTTPRequest.get(path_info='/', headers={'HTTP_X_WHODAT_PROFILE': 's3cret'}))
+        self.assertEqual(profiler.routes_profiled(), ['/'])
+
+    def test_header_encoding(self):
+        profiler = ProfilerExtension(secret='s3cret')
+        app = self.app(profiler)
+        response = app.handle_request(HTTPRequest.get(path_info='/', headers={'HTTP_X_WHODAT_PROFILE': '\u20ac'}))
+        self.assertEqual(response.status, '200 OK')
+        response = app.handle_request(HTTPRequest.get(path_info='/', headers={'HTTP_X_WHODAT_PROFILE': '\xe9'}))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(profiler.routes_profiled(), [])
+
+    def test_profiler_active(self):
+        profiler = ProfilerExtension(sample_rate=1)
+        app = self.app(profiler)
+        active = cProfile.Profile()
+        active.enable()
+        try:
+            response = app.handle_request(HTTPRequest.get(path_info='/'))
+        finally:
+            active.disable()
+        self.assertEqual(response.status, '200 OK')
+
+    def test_collapsed(self):
+        profiler = ProfilerExtension(sample_rate=1)
+        app = self.app(profiler)
+        app.handle_request(HTTPRequest.get(path_info='/'))
+        lines = profiler.collapsed().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(line.startswith('/;') for line in lines))
+        self.assertTrue(any('fibonacci (profiling_test.py:' in line for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+
+    def test_dump_stats(self):
+        profiler = ProfilerExtension(sample_rate=1)
+        app = self.app(profiler)
+        app.handle_request(HTTPRequest.get(path_info='/'))
+        filename = os.path.join(tempfile.mkdtemp(), 'root.pstats')
+        profiler.dump_stats(filename, '/')
+        self.assertIn('fibonacci', [function[2] for function in pstats.Stats(filename).stats])
+        os.remove(filename)
+
+    def test_endpoint(self):
+        profiler = ProfilerExtension(secret='s3cret', path='/profile/')
+        app = self.app(profiler)
+        headers = {'HTTP_X_WHODAT_PROFILE': 's3cret'}
+        app.handle_request(HTTPRequest.get(path_info='/', headers=headers))
+        self.assertEqual(app.handle_request(HTTPRequest.get(path_info='/profile/')).status, '404 Not Found')
+        response = app.handle_request(HTTPRequest.get(path_info='/profile/', headers=headers))
+        self.assertIn('fibonacci', response.text)
+        response = app.handle_request(HTTPRequest.get(path_info='/profile/', query_string='format=pstats',
+                                                      headers=headers))
+        self.assertIn('fibonacci', [function[2] for function in marshal.loads(response.body)])
+        response = app.handle_request(HTTPRequest.get(path_info='/profile/', query_string='format=collapsed&route=/',
+                                                      headers=headers))
+        self.assertIn('fibonacci', response.text)
+        self.assertEqual(profiler.routes_profiled(), ['/'])
+
+if __name__ == '__main__':
+    unittest.main()
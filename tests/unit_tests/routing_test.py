@@ -0,0 +1,183 @@
+import unittest
+import uuid
+
+from whodat.handler import *
+from whodat.routing import *
+
+### Handlers ###
+
+@url('/')
+class RootHandler:
+    def get(self, request):
+        return 'root'
+
+@url('/one/_/')
+class OneArgHandler:
+    def get(self, request, one):
+        return one
+
+@url('/one/two/')
+class OneTwoHandler:
+    def get(self, request):
+        return 'one two'
+
+@url('/two/_/_/')
+class TwoArgsHandler:
+    def get(self, request, one, two):
+        return '%s, %s' % (one, two)
+
+@url('/prefix_/')
+class PrefixHandler:
+    def get(self, request, suffix):
+        return suffix
+
+@url('/post/<int>/')
+class PostHandler:
+    def get(self, request, post_id):
+        return str(post_id)
+
+@url('/user/<uuid>/<slug>/')
+class UserHandler:
+    def get(self, request, user_id, name):
+        return name
+
+@url('/files/<path>')
+class FileHandler:
+    def get(self, request, file_path):
+        return file_path
+
+### Tests ###
+
+class RouterTest(unittest.TestCase):
+    def setUp(self):
+        self.router = Router()
+        for handler in (RootHandler, OneArgHandler, OneTwoHandler, TwoArgsHandler, PrefixHandler):
+            self.router.add(handler)
+
+    def test_literal(self):
+        self.assertEqual(self.router.match('/'), (RootHandler, ()))
+
+    def test_placeholders(self):
+        self.assertEqual(self.router.match('/one/gold/'), (OneArgHandler, ('gold',)))
+        self.assertEqual(self.router.match('/two/gold/corn/'), (TwoArgsHandler, ('gold', 'corn')))
+        self.assertEqual(self.router.match('/prefixgold/'), (PrefixHandler, ('gold',)))
+
+    def test_order(self):
+        self.assertEqual(self.router.match('/one/two/'), (OneArgHandler, ('two',)))
+
+        router = Router()
+        router.add(OneTwoHandler)
+        router.add(OneArgHandler)
+        self.assertEqual(router.match('/one/two/'), (OneTwoHandler, ()))
+        self.assertEqual(router.match('/one/three/'), (OneArgHandler, ('three',)))
+
+    def test_no_match(self):
+        self.assertIsNone(self.router.match('/one/gold'))
+        self.assertIsNone(self.router.match('/two/gold/'))
+        self.assertIsNone(self.router.match('/three/'))
+        self.assertIsNone(Router().match('/'))
+
+    def test_resolve(self):
+        self.assertEqual(self.router.resolve('/one/gold/'), (OneArgHandler, ('gold',)))
+        self.assertEqual(self.router.resolve(''), REDIRECT)
+        self.assertEqual(self.router.resolve('/one/gold'), REDIRECT)
+        self.assertEqual(self.router.resolve('/two/gold/corn'), REDIRECT)
+        self.assertEqual(self.router.resolve('/prefixgold'), REDIRECT)
+        self.assertIsNone(self.router.resolve('/two/gold'))
+        self.assertIsNone(self.router.resolve('/one'))
+        self.assertIsNone(Router().resolve(''))
+
+    def test_add_after_match(self):
+        self.assertIsNone(self.router.match('/three/'))
+
+        @url('/three/')
+        class ThreeHandler:
+            def get(self, request):
+                return 'three'
+
+        self.router.add(ThreeHandler)
+        self.assertEqual(self.router.match('/three/'), (ThreeHandler, ()))
+
+    def test_same_as_scan(self):
+        for path in ('/', '', '/one/', '/one/gold/', '/one/two/', '/two/a/b/', '/two/a/b/c/', '/prefix/', '/prefixa/',
+                     '/one/gold/\n', '/three/'):
+            self.assertEqual(self.router.match(path), self.router.scan(path))
+
+class TypedPlaceholderTest(unittest.TestCase):
+    def setUp(self):
+        self.router = Router()
+        for handler in (PostHandler, UserHandler, FileHandler, OneArgHandler):
+            self.router.add(handler)
+
+    def test_int(self):
+        self.assertEqual(self.router.match('/post/42/'), (PostHandler, (42,)))
+        self.assertIsNone(self.router.match('/post/abc/'))
+        self.assertIsNone(self.router.match('/post/-1/'))
+        self.assertEqual(self.router.resolve('/post/42'), REDIRECT)
+        self.assertIsNone(self.router.resolve('/post/abc'))
+
+    def test_uuid(self):
+        user_id = '12345678-1234-5678-1234-567812345678'
+        self.assertEqual(self.router.match('/user/%s/john-doe/' % user_id),
+                         (UserHandler, (uuid.UUID(user_id), 'john-doe')))
+        self.assertIsNone(self.router.match('/user/1234/john-doe/'))
+        self.assertIsNone(self.router.match('/user/%s/john.doe/' % user_id))
+
+    def test_path(self):
+        self.assertEqual(self.router.match('/files/a/b/c.txt'), (FileHandler, ('a/b/c.txt',)))
+        self.assertIsNone(self.router.match('/files/'))
+
+    def test_order(self):
+        router = Router()
+        router.add(FileHandler)
+        router.add(Handler('/files/_'))
+        self.assertEqual(router.match('/files/a'), (FileHandler, ('a',)))
+
+        router = Router()
+        router.add(Handler('/files/_'))
+        router.add(FileHandler)
+        self.assertEqual(router.match('/files/a')[1], ('a',))
+        self.assertEqual(router.match('/files/a/b'), (FileHandler, ('a/b',)))
+
+    def test_unknown_type(self):
+        self.assertRaises(ValueError, Handler, '/post/<float>/')
+
+class RouteCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.router = Router()
+        self.router.add(RootHandler)
+        self.router.add(OneArgHandler)
+        self.cache = RouteCache(self.router, 2)
+
+    def test_resolve(self):
+        self.assertEqual(self.cache.resolve('/one/gold/'), (OneArgHandler, ('gold',)))
+        self.assertEqual(self.cache.resolve('/one/gold/'), (OneArgHandler, ('gold',)))
+        self.assertEqual(self.cache.resolve('/one/gold'), REDIRECT)
+        self.assertIsNone(self.cache.resolve('/gold/'))
+        self.assertIsNone(self.cache.resolve('/gold/'))
+        self.assertEqual(self.cache.info(), {'hits': 2, 'misses': 3, 'size': 2, 'max_size': 2})
+
+    def test_eviction(self):
+        self.cache.resolve('/')
+        self.cache.resolve('/one/a/')
+        self.cache.resolve('/')
+        self.cache.resolve('/one/b/')
+        self.cache.resolve('/')
+        self.cache.resolve('/one/a/')
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(self.cache.misses, 4)
+
+    def test_clear(self):
+        self.assertIsNone(self.cache.resolve('/one/two/three/'))
+
+        @url('/one/two/three/')
+        class ThreeHandler:
+            def get(self, request):
+                return 'three'
+
+        self.router.add(ThreeHandler)
+        self.cache.clear()
+        self.assertEqual(self.cache.resolve('/one/two/three/'), (ThreeHandler, ()))
+
+if __name__ == '__main__':
+    unittest.main()
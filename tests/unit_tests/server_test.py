@@ -0,0 +1,220 @@
+import os
+import signal
+import socket
+import time
+import unittest
+
+from whodat.asgi import *
+from whodat.handler import *
+from whodat.http import *
+from whodat.server import *
+from whodat.wsgi import *
+
+### Handlers ###
+
+@url('/')
+class RootHandler:
+    def get(self, request):
+        return HTTPResponse('Hello')
+
+    def post(self, request):
+        return HTTPResponse(request.body)
+
+@url('/stream')
+class StreamHandler:
+    def get(self, request):
+        return iter([b'ab', b'cd'])
+
+@url('/file')
+class FileHandler:
+    tasks = []
+
+    def get(self, request):
+        request.add_task(FileHandler.tasks.append, 'sent')
+        file = open(__file__, 'rb')
+        file.seek(int(request.GET.get('offset', 0)))
+        return FileResponse(file)
+
+### Tests ###
+
+class ParseRequestHeadTest(unittest.TestCase):
+    def test_parse(self):
+        method, target, version, headers = parse_request_head(b'GET /a?b=1 HTTP/1.1\r\nHost: x\r\nX-A:  1 ')
+        self.assertEqual((method, target, version), ('GET', '/a?b=1', 'HTTP/1.1'))
+        self.assertEqual(headers, [('Host', 'x'), ('X-A', '1')])
+
+    def test_malformed(self):
+        self.assertRaises(HTTPBadRequest, parse_request_head, b'GET /\r\nHost: x')
+        self.assertRaises(HTTPBadRequest, parse_request_head, b'GET / HTTP/1.1\r\nHost x')
+        self.assertRaises(HTTPError, parse_request_head, b'GET / HTTP/2.0')
+        self.assertRaises(HTTPBadRequest, parse_request_head,
+                          b'POST / HTTP/1.1\r\nContent-Length: 1\r\nContent-Length: 1')
+        self.assertRaises(HTTPBadRequest, parse_request_head, b'POST / HTTP/1.1\r\nContent-Length: 1, 2')
+
+    def test_underscore_headers(self):
+        headers = [('X_Forwarded_For', '6.6.6.6'), ('Content_Length', '99'), ('X-Real-IP', '1.2.3.4')]
+        environ = request_environ('GET', '/', 'HTTP/1.1', headers, ('localhost', 80), ('127.0.0.1', 1), None)
+        self.assertNotIn('HTTP_X_FORWARDED_FOR', environ)
+        self.assertNotIn('CONTENT_LENGTH', environ)
+        self.assertEqual(environ['HTTP_X_REAL_IP'], '1.2.3.4')
+
+    def test_keep_alive(self):
+        self.assertTrue(keep_alive('HTTP/1.1', []))
+        self.assertFalse(keep_alive('HTTP/1.1', [('Connection', 'close')]))
+        self.assertFalse(keep_alive('HTTP/1.0', []))
+        self.assertTrue(keep_alive('HTTP/1.0', [('Connection', 'Keep-Alive')]))
+
+class ResponseFramerTest(unittest.TestCase):
+    def test_content_length(self):
+        framer = ResponseFramer('GET', 'HTTP/1.1', True)
+        head = framer.head('200 OK', [('Content-Length', '5')])
+        self.assertNotIn(b'chunked', head)
+        self.assertEqual(framer.body(b'Hello'), b'Hello')
+        self.assertEqual(framer.end(), b'')
+        self.assertTrue(framer.keep_alive)
+
+    def test_chunked(self):
+        framer = ResponseFramer('GET', 'HTTP/1.1', True)
+        self.assertIn(b'Transfer-Encoding: chunked\r\n', framer.head('200 OK', []))
+        self.assertEqual(framer.body(b'Hello'), b'5\r\nHello\r\n')
+        self.assertEqual(framer.end(), b'0\r\n\r\n')
+
+    def test_http_10(self):
+        framer = ResponseFramer('GET', 'HTTP/1.0', True)
+        self.assertIn(b'Connection: close\r\n', framer.head('200 OK', []))
+        self.assertFalse(framer.keep_alive)
+
+    def test_head(self):
+        framer = ResponseFramer('HEAD', 'HTTP/1.1', True)
+        self.assertNotIn(b'chunked', framer.head('200 OK', []))
+        self.assertEqual(framer.body(b'Hello'), b'')
+        self.assertTrue(framer.keep_alive)
+
+class PreforkServerTest(unittest.TestCase):
+    @classmethod
+    def server(cls, port):
+        app = WSGIApplication(True)
+        app.add_handler(RootHandler)
+        app.add_handler(StreamHandler)
+        app.add_handler(FileHandler)
+        return PreforkServer(app, port=port, workers=2, threads=2, graceful_timeout=5)
+
+    @classmethod
+    def setUpClass(cls):
+        probe = socket.socket()
+        probe.bind(('127.0.0.1', 0))
+        cls.port = probe.getsockname()[1]
+        probe.close()
+        server = cls.server(cls.port)
+        cls.pid = os.fork()
+        if cls.pid == 0:
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        for i in range(50):
+            try:
+                socket.create_connection(('127.0.0.1', cls.port)).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.kill(cls.pid, signal.SIGTERM)
+        os.waitpid(cls.pid, 0)
+
+    def request(self, sock, data, count=1):
+        sock.sendall(data)
+        received = b''
+        while received.count(b'HTTP/1.1 ') < count or not received.endswith((b'Hello', b'0\r\n\r\n', b'abc')):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            received += chunk
+        return received
+
+    def test_keep_alive(self):
+        with socket.create_connection(('127.0.0.1', self.port)) as sock:
+            self.assertTrue(self.request(sock, b'GET / HTTP/1.1\r\nHost: x\r\n\r\n').endswith(b'\r\n\r\nHello'))
+            self.assertTrue(self.request(sock, b'GET / HTTP/1.1\r\nHost: x\r\n\r\n').endswith(b'\r\n\r\nHello'))
+
+    def test_pipelining(self):
+        with socket.create_connection(('127.0.0.1', self.port)) as sock:
+            response = self.request(sock, b'GET / HTTP/1.1\r\nHost: x\r\n\r\n' * 2, 2)
+            self.assertEqual(response.count(b'Hello'), 2)
+
+    def test_chunked(self):
+        with socket.create_connection(('127.0.0.1', self.port)) as sock:
+            response = self.request(sock, b'GET /stream HTTP/1.1\r\nHost: x\r\n\r\n')
+            self.assertIn(b'Transfer-Encoding: chunked\r\n', response)
+            self.assertTrue(response.endswith(b'\r\n\r\n2\r\nab\r\n2\r\ncd\r\n0\r\n\r\n'))
+            request = b'POST / HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabc\r\n0\r\n\r\n'
+            self.assertTrue(self.request(sock, request).endswith(b'\r\n\r\nabc'))
+
+    def test_file(self):
+        with open(__file__, 'rb') as file:
+            content = file.read()
+        with socket.create_connection(('127.0.0.1', self.port)) as sock:
+            for offset in (0, 10):
+                sock.sendall(b'GET /file?offset=%d HTTP/1.1\r\nHost: x\r\n\r\n' % offset)
+                received = b''
+                while not received.endswith(content[offset:]):
+                    chunk = sock.recv(65536)
+                    if not chunk:
+                        break
+                    received += chunk
+                self.assertIn(b'content-length: %d\r\n' % (len(content) - offset), received.lower())
+                self.assertTrue(received.endswith(b'\r\n\r\n' + content[offset:]))
+
+    def test_connection_close(self):
+        with socket.create_connection(('127.0.0.1', self.port)) as sock:
+            response = self.request(sock, b'GET / HTTP/1.0\r\n\r\n')
+            self.assertIn(b'Connection: close\r\n', response)
+            self.assertEqual(sock.recv(10), b'')
+
+    def test_bad_request(self):
+        with socket.create_connection(('127.0.0.1', self.port)) as sock:
+            sock.sendall(b'GARBAGE\r\n\r\n')
+            self.assertTrue(sock.recv(65536).startswith(b'HTTP/1.1 400 '))
+
+    def test_header_too_large(self):
+        with socket.create_connection(('127.0.0.1', self.port)) as sock:
+            sock.sendall(b'GET / HTTP/1.1\r\nX-A: ' + b'a' * 70000 + b'\r\n\r\n')
+            self.assertTrue(sock.recv(65536).startswith(b'HTTP/1.1 431 '))
+
+class AsyncioServerTest(PreforkServerTest):
+    @classmethod
+    def server(cls, port):
+        app = WSGIApplication(True)
+        app.add_handler(RootHandler)
+        app.add_handler(StreamHandler)
+        app.add_handler(FileHandler)
+        return AsyncioServer(app, port=port, threads=2, max_body_size=1024, graceful_timeout=5)
+
+    def test_body_too_large(self):
+        with socket.create_connection(('127.0.0.1', self.port)) as sock:
+            sock.sendall(b'POST / HTTP/1.1\r\nHost: x\r\nContent-Length: 2048\r\n\r\n')
+            self.assertTrue(sock.recv(65536).startswith(b'HTTP/1.1 413 '))
+
+class AsyncioASGIServerTest(PreforkServerTest):
+    @classmethod
+    def server(cls, port):
+        app = ASGIApplication(True)
+        app.add_handler(RootHandler)
+        app.add_handler(StreamHandler)
+        app.add_handler(FileHandler)
+        return AsyncioServer(app, port=port, graceful_timeout=5)
+
+class AsyncioServerAppTest(unittest.TestCase):
+    def test_asgi_detection(self):
+        async def app(scope, receive, send):
+            pass
+
+        self.assertTrue(AsyncioServer(app)._asgi)
+        self.assertTrue(AsyncioServer(ASGIApplication(False))._asgi)
+        self.assertFalse(AsyncioServer(WSGIApplication(False))._asgi)
+        self.assertFalse(AsyncioServer(lambda environ, start_response: [])._asgi)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from email.utils import formatdate
+from whodat.http import *
+from whodat.static import *
+
+class StaticFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, 'css'))
+        self.write('css/style.css', b'body { color: red; }')
+        self.write('css/style.css.gz', gzip.compress(b'body { color: red; }'))
+        self.write('big.txt', b'x' * 100)
+        self.static_files = StaticFiles(self.directory, cache_size=64, max_cached_file_size=32)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, path, content):
+        with open(os.path.join(self.directory, path), 'wb') as file:
+            file.write(content)
+
+    def test_index(self):
+        static_file = self.static_files.lookup('css/style.css')
+        self.assertEqual(static_file.content_type, 'text/css')
+        self.assertEqual(static_file.size, 20)
+        self.assertEqual(sorted(static_file.encodings), ['gzip'])
+        self.assertIsNone(self.static_files.lookup('css/style.css.gz'))
+        self.assertIsNone(self.static_files.lookup('css/missing.css'))
+
+    def test_response(self):
+        response = self.static_files.response(HTTPRequest.get(), 'css/style.css')
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.body, b'body { color: red; }')
+        self.assertEqual(response.content_type, 'text/css')
+        self.assertIsNone(response.charset)
+        self.assertIn(('Vary', 'Accept-Encoding'), response.headerlist)
+        self.assertIn(('ETag', self.static_files.lookup('css/style.css').etag), response.headerlist)
+
+        response = self.static_files.response(HTTPRequest.get(), 'big.txt')
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(response.content_type, 'text/plain')
+        self.assertEqual(response.body, b'x' * 100)
+
+    def test_path_traversal(self):
+        self.assertIsNone(self.static_files.response(HTTPRequest.get(), '../' + os.path.basename(self.directory)))
+        self.assertIsNone(self.static_files.response(HTTPRequest.get(), 'css/../../etc/passwd'))
+        self.assertIsNone(self.static_files.response(HTTPRequest.get(), '/etc/passwd'))
+
+    def test_not_modified(self):
+        static_file = self.static_files.lookup('css/style.css')
+        request = HTTPRequest.get(headers={'HTTP_IF_NONE_MATCH': static_file.etag})
+        response = self.static_files.response(request, 'css/style.css')
+        self.assertEqual(response.status, '304 Not Modified')
+        self.assertEqual(response.body, b'')
+
+        request = HTTPRequest.get(headers={'HTTP_IF_NONE_MATCH': '"other"'})
+        self.assertEqual(self.static_files.response(request, 'css/style.css').status, '200 OK')
+
+        request = HTTPRequest.get(headers={'HTTP_IF_MODIFIED_SINCE': formatdate(static_file.mtime + 60, usegmt=True)})
+        self.assertEqual(self.static_files.response(request, 'css/style.css').status, '304 Not Modified')
+
+        request = HTTPRequest.get(headers={'HTTP_IF_MODIFIED_SINCE': formatdate(static_file.mtime - 60, usegmt=True)})
+        self.assertEqual(self.static_files.response(request, 'css/style.css').status, '200 OK')
+
+    def test_precompressed(self):
+        request = HTTPRequest.get(headers={'HTTP_ACCEPT_ENCODING': 'gzip, deflate'})
+        response = self.static_files.response(request, 'css/style.css')
+        self.assertIn(('Content-Encoding', 'gzip'), response.headerlist)
+        self.assertEqual(response.content_type, 'text/css')
+        self.assertEqual(gzip.decompress(response.body), b'body { color: red; }')
+
+        request = HTTPRequest.get(headers={'HTTP_ACCEPT_ENCODING': 'br'})
+        response = self.static_files.response(request, 'css/style.css')
+        self.assertNotIn('Content-Encoding', dict(response.headerlist))
+        self.assertEqual(response.body, b'body { color: red; }')
+
+    def test_cache(self):
+        self.static_files.response(HTTPRequest.get(), 'css/style.css')
+        self.write('css/style.css', b'body { color: blue; }')
+        self.assertEqual(self.static_files.response(HTTPRequest.get(), 'css/style.css').body, b'body { color: red; }')
+
+    def test_rescan(self):
+        static_files = StaticFiles(self.directory, rescan=True)
+        self.assertIsNone(static_files.lookup('new.txt'))
+        self.write('new.txt', b'new')
+        self.assertEqual(static_files.response(HTTPRequest.get(), 'new.txt').body, b'new')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import threading
+import unittest
+
+from whodat.tasks import *
+
+### Tests ###
+
+class TaskExecutorTest(unittest.TestCase):
+    def test_submit(self):
+        executor = TaskExecutor(2)
+        results = []
+        executor.submit(results.append, (1,)).result()
+        executor.submit(lambda **kwargs: results.append(kwargs), kwargs={'a': 2}).result()
+        self.assertEqual(results, [1, {'a': 2}])
+        executor.shutdown()
+
+    def test_exception(self):
+        executor = TaskExecutor(1)
+        self.assertIsNone(executor.submit(lambda: 1 / 0).result())
+        executor.shutdown()
+
+    def test_backpressure(self):
+        executor = TaskExecutor(1, max_pending=1)
+        release = threading.Event()
+        executor.submit(release.wait)
+        submitted = threading.Event()
+        thread = threading.Thread(target=lambda: (executor.submit(lambda: None), submitted.set()))
+        thread.start()
+        self.assertFalse(submitted.wait(0.2))
+        release.set()
+        self.assertTrue(submitted.wait(5))
+        thread.join()
+        executor.shutdown()
+
+    def test_shutdown(self):
+        executor = TaskExecutor(1)
+        results = []
+        executor.run([(results.append, (i,), {}) for i in range(10)])
+        executor.shutdown()
+        self.assertEqual(results, list(range(10)))
+        self.assertRaises(RuntimeError, executor.submit, results.append, (10,))
+
+    def test_task_iterator(self):
+        executor = TaskExecutor(1)
+        results = []
+        app_iter = TaskIterator([b'body'], executor, [(results.append, (1,), {})])
+        self.assertEqual(list(app_iter), [b'body'])
+        self.assertEqual(app_iter.app_iter, [b'body'])
+        self.assertEqual(results, [])
+        app_iter.close()
+        executor.shutdown()
+        self.assertEqual(results, [1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
 
+from whodat.asgi import *
 from whodat.handler import *
 from whodat.http import *
 from whodat.test import *
@@ -67,5 +68,17 @@ class ClientTest(unittest.TestCase):
         response = self.client.get('/')
         self.assertEqual(response.text, 'get, get')
 
+class NativeClientTest(ClientTest):
+    def setUp(self):
+        app = WSGIApplication(True, request_class=NativeHTTPRequest)
+        app.add_handler(RootHandler)
+        self.client = Client(app)
+
+class ASGIClientTest(ClientTest):
+    def setUp(self):
+        app = ASGIApplication(True)
+        app.add_handler(RootHandler)
+        self.client = ASGIClient(app)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,12 @@
+import asyncio
 import unittest
 
 from os.path import dirname, join, realpath
+from whodat.asgi import *
 from whodat.extension import *
 from whodat.handler import *
 from whodat.http import *
+from whodat.test import *
 from whodat.wsgi import *
 
 ### Extensions ###
@@ -18,6 +21,24 @@ class ExtensionA(Extension):
     def process_response(self, request, response):
         setattr(request, 'three', 3)
 
+class ExtensionB(Extension):
+    routes = ['/arg/_/']
+
+    def process_response(self, request, response):
+        setattr(request, 'four', 4)
+
+class ShortCircuitExtension(Extension):
+    def process_request(self, request):
+        return HTTPResponse('short circuit')
+
+class ReplaceExtension(Extension):
+    def process_response(self, request, response):
+        return HTTPResponse('replaced')
+
+class RescueExtension(Extension):
+    def process_exception(self, request, exception):
+        return HTTPResponse('rescued %s' % type(exception).__name__, status=500)
+
 ### Handlers ###
 
 @url('/')
@@ -36,6 +57,32 @@ class ArgHandler:
     def post(self, request, arg):
         return HTTPResponse('post %s' % arg)
 
+@url('/upload/', max_body_size=10)
+class UploadHandler:
+    def post(self, request):
+        return HTTPResponse('%d' % len(request.stream.read()))
+
+@url('/stream/')
+class StreamHandler:
+    closed = False
+
+    def get(self, request):
+        try:
+            for i in range(3):
+                yield '%d' % i
+        finally:
+            StreamHandler.closed = True
+
+@url('/tasks/')
+class TaskHandler:
+    results = []
+
+    def get(self, request):
+        request.add_task(TaskHandler.results.append, 'request')
+        response = HTTPResponse('tasks')
+        response.add_task(TaskHandler.results.append, 'response')
+        return response
+
 @url('/error/')
 class DivisionByZeroHandler:
     def get(self, request):
@@ -51,15 +98,20 @@ class FirePolice(ErrorHandler):
 ### Tests ###
 
 class WSGIApplicationTest(unittest.TestCase):
+    application_class = WSGIApplication
+
+    def handle_request(self, app, request):
+        return app.handle_request(request)
+
     def setUp(self):
-        self.debug_app = WSGIApplication(True, error_handler=FirePolice, extensions=[ExtensionA()],
+        self.debug_app = self.application_class(True, error_handler=FirePolice, extensions=[ExtensionA()],
                                          static_url='/static/',
                                          static_dir=join(dirname(realpath(__file__)), 'resources', 'static'))
         self.debug_app.add_handler(RootHandler)
         self.debug_app.add_handler(ArgHandler)
         self.debug_app.add_handler(DivisionByZeroHandler)
 
-        self.app = WSGIApplication(False, error_handler=FirePolice, extensions=[ExtensionA()])
+        self.app = self.application_class(False, error_handler=FirePolice, extensions=[ExtensionA()])
         self.app.add_handler(RootHandler)
         self.app.add_handler(ArgHandler)
         self.app.add_handler(DivisionByZeroHandler)
@@ -67,73 +119,218 @@ class WSGIApplicationTest(unittest.TestCase):
     def test_extension(self):
         self.assertEqual(self.app.one, 1)
         request = HTTPRequest.get(path_info='/')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(request.two, 2)
         self.assertEqual(request.three, 3)
 
+    def test_pipelines(self):
+        extension_a, extension_b = ExtensionA(), ExtensionB()
+        app = self.application_class(False, extensions=[extension_a, extension_b])
+        app.add_handler(RootHandler)
+        app.add_handler(ArgHandler)
+        self.assertEqual(app._pipeline(RootHandler), ((extension_a,), (extension_a,)))
+        self.assertEqual(app._pipeline(ArgHandler), ((extension_a,), (extension_a, extension_b)))
+
+        request = HTTPRequest.get(path_info='/')
+        self.handle_request(app, request)
+        self.assertFalse(hasattr(request, 'four'))
+        request = HTTPRequest.get(path_info='/arg/gold/')
+        self.handle_request(app, request)
+        self.assertEqual(request.four, 4)
+
+    def test_short_circuit(self):
+        app = self.application_class(False, extensions=[ShortCircuitExtension(), ExtensionA()])
+        app.add_handler(RootHandler)
+        request = HTTPRequest.get(path_info='/')
+        self.assertEqual(self.handle_request(app, request).text, 'short circuit')
+        self.assertFalse(hasattr(request, 'two'))
+        self.assertEqual(request.three, 3)
+
     def test_get(self):
         request = HTTPRequest.get(path_info='/')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(response.text, 'get')
 
         request = HTTPRequest.get(path_info='/arg/gold/')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(response.text, 'get gold')
 
     def test_post(self):
         request = HTTPRequest.post(path_info='/')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(response.text, 'post')
 
         request = HTTPRequest.post(path_info='/arg/gold/')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(response.text, 'post gold')
 
     def test_redirect(self):
         request = HTTPRequest.get(path_info='')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(response.status, '302 Found')
 
         request = HTTPRequest.get(path_info='/arg/gold')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(response.status, '302 Found')
 
+    def test_trailing_slash(self):
+        app = self.application_class(False, error_handler=FirePolice, trailing_slash='permanent')
+        app.add_handler(ArgHandler)
+        request = HTTPRequest.get(path_info='/arg/gold')
+        response = self.handle_request(app, request)
+        self.assertEqual(response.status, '301 Moved Permanently')
+        self.assertIn(('Location', '/arg/gold/'), response.headerlist)
+
+        app = self.application_class(False, error_handler=FirePolice, trailing_slash='strict')
+        app.add_handler(ArgHandler)
+        request = HTTPRequest.get(path_info='/arg/gold')
+        response = self.handle_request(app, request)
+        self.assertEqual(response.status, '404 Not Found')
+
+        self.assertRaises(ValueError, self.application_class, False, trailing_slash='loose')
+
+    def test_route_cache(self):
+        self.assertIsNone(self.app.route_cache_info())
+
+        app = self.application_class(False, error_handler=FirePolice, route_cache_size=10)
+        app.add_handler(ArgHandler)
+        for i in range(3):
+            response = self.handle_request(app, HTTPRequest.get(path_info='/arg/gold/'))
+            self.assertEqual(response.text, 'get gold')
+        response = self.handle_request(app, HTTPRequest.get(path_info='/'))
+        self.assertEqual(response.status, '404 Not Found')
+        self.assertEqual(app.route_cache_info(), {'hits': 2, 'misses': 2, 'size': 2, 'max_size': 10})
+
+        app.add_handler(RootHandler)
+        response = self.handle_request(app, HTTPRequest.get(path_info='/'))
+        self.assertEqual(response.text, 'get')
+
+    def test_max_body_size(self):
+        app = self.application_class(False, error_handler=FirePolice, max_body_size=5)
+        app.add_handler(RootHandler)
+        app.add_handler(UploadHandler)
+        response = self.handle_request(app, HTTPRequest.post(path_info='/', params={'a': 'b'}))
+        self.assertEqual(response.text, 'post')
+        response = self.handle_request(app, HTTPRequest.post(path_info='/', params={'abc': 'def'}))
+        self.assertEqual(response.status, '413 Request Entity Too Large')
+        response = self.handle_request(app, HTTPRequest.post(path_info='/upload/', params={'abc': 'def'}))
+        self.assertEqual(response.text, '7')
+        response = self.handle_request(app, HTTPRequest.post(path_info='/upload/', params={'abc': 'defghijk'}))
+        self.assertEqual(response.status, '413 Request Entity Too Large')
+
+    def test_streaming(self):
+        self.app.add_handler(StreamHandler)
+        statuses = []
+        environ = HTTPRequest.get(path_info='/stream/').environ
+        app_iter = self.app(environ, lambda status, headerlist: statuses.append((status, headerlist)))
+        self.assertEqual(statuses[0][0], '200 OK')
+        self.assertNotIn('Content-Length', dict(statuses[0][1]))
+        self.assertEqual(next(app_iter), b'0')
+        app_iter.close()
+        self.assertTrue(StreamHandler.closed)
+
+    def test_process_exception(self):
+        app = self.application_class(False, error_handler=FirePolice, extensions=[RescueExtension()])
+        app.add_handler(DivisionByZeroHandler)
+        self.assertEqual(self.handle_request(app, HTTPRequest.get(path_info='/error/')).text, 'rescued TypeError')
+        self.assertEqual(self.handle_request(app, HTTPRequest.get(path_info='/gold/')).text, '404')
+
+    def test_tasks(self):
+        for extensions in ([], [ReplaceExtension()]):
+            TaskHandler.results[:] = []
+            app = self.application_class(False, extensions=extensions)
+            app.add_handler(TaskHandler)
+            environ = HTTPRequest.get(path_info='/tasks/').environ
+            app_iter = app(environ, lambda status, headerlist: None)
+            self.assertEqual(TaskHandler.results, [])
+            list(app_iter)
+            app_iter.close()
+            app.shutdown()
+            self.assertEqual(TaskHandler.results, ['request', 'response'])
+
     def test_not_found(self):
         request = HTTPRequest.get(path_info='/gold/')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(response.text, '404')
         self.assertEqual(response.status, '404 Not Found')
 
     def test_internal_server_error(self):
         request = HTTPRequest.get(path_info='/error/')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(response.text, '5xx')
         self.assertEqual(response.status, '500 Internal Server Error')
 
     def test_method_not_allowed(self):
         request = HTTPRequest.put(path_info='/')
-        response = self.app.handle_request(request)
+        response = self.handle_request(self.app, request)
         self.assertEqual(response.text, 'Error 405')
         self.assertEqual(response.status, '405 Method Not Allowed')
+        self.assertIn(('Allow', 'GET, HEAD, POST, OPTIONS'), response.headerlist)
 
     def test_static_file(self):
         with open(join(dirname(realpath(__file__)), 'resources', 'static', 'pixel.png'), 'rb') as static_file:
             request = HTTPRequest.get(path_info='/static/pixel.png')
-            response = self.debug_app.handle_request(request)
+            response = self.handle_request(self.debug_app, request)
             self.assertEqual(response.status, '200 OK')
             self.assertEqual(response.body, static_file.read())
             self.assertEqual(response.content_type, 'image/png')
             self.assertEqual(response.charset, None)
+            self.assertIn('ETag', dict(response.headerlist))
 
             request = HTTPRequest.get(path_info='/static/pixel.jpg')
-            response = self.debug_app.handle_request(request)
+            response = self.handle_request(self.debug_app, request)
             self.assertEqual(response.text, '404')
             self.assertEqual(response.status, '404 Not Found')
 
             request = HTTPRequest.get(path_info='/static/pixel.png')
-            response = self.app.handle_request(request)
+            response = self.handle_request(self.app, request)
             self.assertEqual(response.text, '404')
             self.assertEqual(response.status, '404 Not Found')
 
+    def test_serve_static(self):
+        static_dir = join(dirname(realpath(__file__)), 'resources', 'static')
+        app = self.application_class(False, static_url='/static/', static_dir=static_dir, serve_static=True)
+        response = self.handle_request(app, HTTPRequest.get(path_info='/static/pixel.png'))
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.content_type, 'image/png')
+
+        etag = dict(response.headerlist)['ETag']
+        request = HTTPRequest.get(path_info='/static/pixel.png', headers={'HTTP_IF_NONE_MATCH': etag})
+        response = self.handle_request(app, request)
+        self.assertEqual(response.status, '304 Not Modified')
+
+        response = self.handle_request(app, HTTPRequest.get(path_info='/static/../wsgi_test.py'))
+        self.assertEqual(response.status, '404 Not Found')
+
+class ASGIApplicationTest(WSGIApplicationTest):
+    application_class = ASGIApplication
+
+    def handle_request(self, app, request):
+        content_length = int(request.environ.get('CONTENT_LENGTH') or 0)
+        body = request.environ['wsgi.input'].read(content_length) if content_length else b''
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def receive():
+            return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+        return asyncio.run(app.handle_request_async(request, receive))
+
+    def test_streaming(self):
+        self.app.add_handler(StreamHandler)
+        StreamHandler.closed = False
+        response = ASGIClient(self.app).get('/stream/')
+        self.assertEqual(response.status, '200 OK')
+        self.assertEqual(response.text, '012')
+        self.assertTrue(StreamHandler.closed)
+
+    def test_tasks(self):
+        for extensions in ([], [ReplaceExtension()]):
+            TaskHandler.results[:] = []
+            app = self.application_class(False, extensions=extensions)
+            app.add_handler(TaskHandler)
+            ASGIClient(app).get('/tasks/')
+            app.shutdown()
+            self.assertEqual(TaskHandler.results, ['request', 'response'])
+
 if __name__ == '__main__':
     unittest.main()